@@ -14,13 +14,22 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import urljoin
 
+from asset_index_cache import AssetIndexCache
+from file_utils import atomic_write_bytes, sha1_bytes, verify_bytes
+from mirrors import resolve_url
+from tracing import span, traced
+
 class AssetDownloader:
-    def __init__(self, minecraft_path, progress_callback=None, max_workers=8):
+    def __init__(self, minecraft_path, progress_callback=None, max_workers=8, content_store=None,
+                 peer_fetcher=None):
         self.minecraft_path = Path(minecraft_path)
         self.assets_path = self.minecraft_path / "assets"
         self.assets_path.mkdir(parents=True, exist_ok=True)
+        self.index_cache = AssetIndexCache(self.assets_path)
         self.progress_callback = progress_callback
         self.max_workers = max_workers  # 最大线程数
+        self.content_store = content_store  # 可选的全局共享存储
+        self.peer_fetcher = peer_fetcher  # 可选的局域网同伴缓存
         self.download_queue = queue.Queue()
         self.downloaded_count = 0
         self.total_count = 0
@@ -43,34 +52,35 @@ class AssetDownloader:
             if not index_path.exists():
                 return False, f"资源索引文件不存在: {index_path}"
             
-            # 读取资源索引
-            with open(index_path, 'r', encoding='utf-8') as f:
-                assets_index_data = json.load(f)
+            # 读取资源索引（使用按SHA1缓存的二进制索引，避免每次解析JSON）
+            try:
+                index_view = self.index_cache.load(index_path, assets_index.get('sha1'))
+            except ValueError as e:
+                return False, f"资源索引文件损坏: {e}"
+            with index_view:
+                objects = list(index_view.iter_unique_objects())
             
             # 检查资源文件
-            objects = assets_index_data.get('objects', {})
             total = len(objects)
             missing_files = []
             corrupted_files = []
             checked = 0
+            objects_path = str(self.assets_path / "objects")
             
             if progress_callback:
                 progress_callback(f"检查 {total} 个资源文件", 10)
             
-            for asset_name, asset_info in objects.items():
-                hash_value = asset_info['hash']
-                size = asset_info.get('size', 0)
-                
-                asset_path = self.assets_path / "objects" / hash_value[:2] / hash_value
+            for hash_value, size in objects:
+                asset_path = os.path.join(objects_path, hash_value[:2], hash_value)
                 
                 # 检查文件是否存在
-                if not asset_path.exists():
-                    missing_files.append(asset_name)
+                if not os.path.exists(asset_path):
+                    missing_files.append(hash_value)
                 else:
                     # 检查文件完整性（哈希值）
                     file_hash = self._get_file_hash(asset_path)
                     if file_hash != hash_value:
-                        corrupted_files.append(asset_name)
+                        corrupted_files.append(hash_value)
                 
                 checked += 1
                 progress = 10 + (checked / total) * 90
@@ -104,29 +114,12 @@ class AssetDownloader:
             if progress_callback:
                 progress_callback("开始下载游戏资源", 0)
             
-            assets_index = version_data.get('assetIndex', {})
-            assets_url = assets_index.get('url', '')
-            assets_id = assets_index.get('id', '')
-            
-            if not assets_url:
-                raise Exception("未找到资源索引URL")
-            
-            # 下载资源索引
-            index_path = self.assets_path / "indexes" / f"{assets_id}.json"
-            index_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            if progress_callback:
-                progress_callback("下载资源索引", 10)
+            index_view = self.load_index_view(version_data, progress_callback)
             
-            response = requests.get(assets_url)
-            response.raise_for_status()
-            assets_index_data = response.json()
-            
-            with open(index_path, 'w', encoding='utf-8') as f:
-                json.dump(assets_index_data, f, indent=2)
+            with index_view:
+                objects = list(index_view.iter_unique_objects())
             
             # 准备多线程下载资源文件
-            objects = assets_index_data.get('objects', {})
             total_files = len(objects)
             self.total_count = total_files
             self.downloaded_count = 0
@@ -138,11 +131,10 @@ class AssetDownloader:
             download_tasks = []
             existing_files = 0
             corrupted_files = 0
+            linked_files = 0
+            store = self.content_store
             
-            for asset_name, asset_info in objects.items():
-                hash_value = asset_info['hash']
-                size = asset_info.get('size', 0)
-                
+            for hash_value, size in objects:
                 asset_path = self.assets_path / "objects" / hash_value[:2] / hash_value
                 asset_path.parent.mkdir(parents=True, exist_ok=True)
                 
@@ -152,14 +144,20 @@ class AssetDownloader:
                     current_hash = self._get_file_hash(asset_path)
                     if current_hash == hash_value:
                         existing_files += 1
+                        if store:
+                            store.ingest(asset_path, hash_value)
                         continue  # 文件已存在且完整，跳过下载
                     else:
                         corrupted_files += 1
-                        # 文件存在但损坏，需要重新下载
+                        # 文件存在但损坏，需要重新下载（硬链接时共享存储中的副本也已损坏）
                         print(f"文件损坏，重新下载: {asset_path.name}")
-                else:
-                    # 文件不存在，需要下载
-                    pass
+                        if store:
+                            store.discard(hash_value)
+                elif store and store.materialize(hash_value, asset_path):
+                    # 共享存储中已有该对象，直接链接，无需下载
+                    existing_files += 1
+                    linked_files += 1
+                    continue
                 
                 url = f"https://resources.download.minecraft.net/{hash_value[:2]}/{hash_value}"
                 download_tasks.append((url, asset_path, hash_value))
@@ -168,6 +166,8 @@ class AssetDownloader:
             need_download_count = len(download_tasks)
             
             if progress_callback:
+                if linked_files:
+                    progress_callback(f"从共享存储链接 {linked_files} 个文件", 25)
                 progress_callback(f"跳过 {existing_files} 个已存在文件，需要下载 {need_download_count} 个文件", 30)
             
             if not download_tasks:
@@ -216,6 +216,42 @@ class AssetDownloader:
                 progress_callback(f"资源下载失败: {e}", -1)
             raise Exception(f"下载资源失败: {e}")
     
+    @traced('asset_index')
+    def load_index_view(self, version_data, progress_callback=None):
+        """获取版本资源索引的二进制视图，本地索引缺失或不一致时先下载"""
+        assets_index = version_data.get('assetIndex', {})
+        assets_url = assets_index.get('url', '')
+        assets_id = assets_index.get('id', '')
+        index_sha1 = assets_index.get('sha1')
+        
+        if not assets_url:
+            raise Exception("未找到资源索引URL")
+        
+        # 下载资源索引
+        index_path = self.assets_path / "indexes" / f"{assets_id}.json"
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # 本地索引与清单中的SHA1一致时，跳过下载；二进制缓存存在时也跳过解析
+        if index_sha1 and index_path.exists():
+            try:
+                return self.index_cache.load(index_path, index_sha1)
+            except (ValueError, OSError) as e:
+                print(f"本地资源索引无效，重新下载: {e}")
+        
+        if progress_callback:
+            progress_callback("下载资源索引", 10)
+        
+        response = requests.get(resolve_url(assets_url), timeout=30)
+        response.raise_for_status()
+        raw_index = response.content
+        verify_bytes(raw_index, index_sha1, f"资源索引 {assets_id}")
+        
+        # 按原始字节保存，保持与官方SHA1一致
+        atomic_write_bytes(index_path, raw_index)
+        
+        # 由校验过的原始字节重新生成二进制缓存（覆盖可能存在的旧缓存），后续的检查和下载规划都基于它
+        return self.index_cache.build(index_sha1 or sha1_bytes(raw_index), json.loads(raw_index))
+    
     def _download_file_threaded(self, url, file_path, expected_hash=None):
         """线程安全的文件下载方法"""
         try:
@@ -225,16 +261,28 @@ class AssetDownloader:
                 if current_hash == expected_hash:
                     return True
             
-            # 下载文件
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
+            # 先从局域网同伴获取（已按SHA1校验）
+            if self.peer_fetcher and expected_hash:
+                relative_path = f"assets/objects/{expected_hash[:2]}/{expected_hash}"
+                if self.peer_fetcher.fetch(relative_path, expected_hash, file_path):
+                    if self.content_store:
+                        self.content_store.ingest(file_path, expected_hash)
+                    return True
             
-            # 创建临时文件
-            temp_path = file_path.with_suffix('.tmp')
-            with open(temp_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            # 下载文件
+            with span('download', kind='asset', hash=expected_hash) as download_span:
+                response = requests.get(resolve_url(url), stream=True, timeout=30)
+                response.raise_for_status()
+                
+                # 创建临时文件
+                temp_path = file_path.with_suffix('.tmp')
+                written = 0
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        if chunk:
+                            f.write(chunk)
+                            written += len(chunk)
+                download_span.set('bytes', written)
             
             # 验证文件完整性
             if expected_hash:
@@ -245,6 +293,10 @@ class AssetDownloader:
             
             # 重命名临时文件为正式文件
             os.replace(temp_path, file_path)
+            
+            # 已校验的文件加入共享存储
+            if self.content_store and expected_hash:
+                self.content_store.ingest(file_path, expected_hash)
             return True
             
         except Exception as e:
@@ -256,9 +308,10 @@ class AssetDownloader:
     def _get_file_hash(self, file_path):
         """计算文件SHA1哈希值"""
         hasher = hashlib.sha1()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hasher.update(chunk)
+        with span('hash', path=str(file_path)):
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(4096), b""):
+                    hasher.update(chunk)
         return hasher.hexdigest()
     
     def _download_file(self, url, file_path):
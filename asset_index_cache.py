@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源索引缓存 - 将解析后的资源索引保存为紧凑的二进制格式，可直接内存映射读取
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from file_utils import sha1_bytes
+
+# 文件头: 魔数, 格式版本, 条目数, 名称表偏移, 名称表长度, 索引文件SHA1
+HEADER = struct.Struct('<4sIIII20s')
+# 条目: SHA1摘要(20字节), 文件大小, 名称偏移, 名称长度；按摘要排序
+RECORD = struct.Struct('<20sIII')
+MAGIC = b'ECLA'
+# 版本2起缓存只由校验过的索引生成，旧缓存可能来自损坏的索引，需要重新生成
+FORMAT_VERSION = 2
+
+
+class AssetIndexView:
+    """二进制资源索引的只读视图，遍历时不构造字典"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        try:
+            magic, version, count, names_offset, names_length, source_sha1 = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"无效的资源索引缓存: {self.path}")
+            if names_offset + names_length > len(self._map) or HEADER.size + count * RECORD.size > names_offset:
+                raise ValueError(f"资源索引缓存不完整: {self.path}")
+        except BaseException:
+            # 文件被截断时 unpack_from 抛出 struct.error，已打开的文件和映射必须关闭
+            self.close()
+            raise
+        self.count = count
+        self.names_offset = names_offset
+        self.names_length = names_length
+        self.source_sha1 = source_sha1.hex()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _records(self):
+        start = HEADER.size
+        return RECORD.iter_unpack(self._map[start:start + self.count * RECORD.size])
+
+    def iter_objects(self):
+        """遍历所有条目，产出(摘要字节, 大小)"""
+        for digest, size, _, _ in self._records():
+            yield digest, size
+
+    def iter_unique_objects(self):
+        """遍历去重后的对象（多个名称可能指向同一个对象），产出(十六进制摘要, 大小)"""
+        previous = None
+        for digest, size, _, _ in self._records():
+            if digest != previous:
+                previous = digest
+                yield digest.hex(), size
+
+    def iter_named_objects(self):
+        """遍历(名称, 十六进制摘要, 大小)，供旧版虚拟资源目录使用"""
+        names = self._map
+        base = self.names_offset
+        for digest, size, name_offset, name_length in self._records():
+            name = names[base + name_offset:base + name_offset + name_length].decode('utf-8')
+            yield name, digest.hex(), size
+
+    def total_size(self):
+        """去重后所有对象的总字节数"""
+        return sum(size for _, size in self.iter_unique_objects())
+
+
+class AssetIndexCache:
+    """按资源索引SHA1缓存二进制索引"""
+
+    def __init__(self, assets_path):
+        self.assets_path = Path(assets_path)
+        self.cache_dir = self.assets_path / "indexes" / ".bin"
+
+    def cache_path(self, index_sha1):
+        return self.cache_dir / f"{index_sha1}.bin"
+
+    def get(self, index_sha1):
+        """打开已缓存的二进制索引，不存在或损坏时返回None"""
+        path = self.cache_path(index_sha1)
+        if not index_sha1 or not path.exists():
+            return None
+        try:
+            return AssetIndexView(path)
+        except (ValueError, OSError, struct.error) as e:
+            print(f"资源索引缓存损坏，将重新生成: {e}")
+            return None
+
+    def build(self, index_sha1, index_data):
+        """由解析后的资源索引生成二进制缓存"""
+        objects = index_data.get('objects', {})
+        names = bytearray()
+        records = []
+        for name, info in objects.items():
+            encoded = name.encode('utf-8')
+            records.append((bytes.fromhex(info['hash']), int(info.get('size', 0)), len(names), len(encoded)))
+            names += encoded
+        records.sort()
+
+        names_offset = HEADER.size + len(records) * RECORD.size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_path(index_sha1)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(records), names_offset, len(names),
+                                bytes.fromhex(index_sha1)))
+            for record in records:
+                f.write(RECORD.pack(*record))
+            f.write(names)
+        os.replace(tmp_path, path)
+        return AssetIndexView(path)
+
+    def load(self, index_path, index_sha1=None):
+        """获取索引文件对应的二进制视图，必要时解析JSON并生成缓存
+
+        索引文件总是先按SHA1校验：与 index_sha1 不一致时抛出 ValueError，
+        既不使用也不生成该SHA1的缓存，否则损坏的内容会一直以正确的SHA1留在缓存中
+        """
+        index_path = Path(index_path)
+        with open(index_path, 'rb') as f:
+            raw_index = f.read()
+        actual_sha1 = sha1_bytes(raw_index)
+        if index_sha1 and actual_sha1 != index_sha1:
+            raise ValueError(f"资源索引 {index_path.name} 哈希值不匹配: 期望 {index_sha1}, 实际 {actual_sha1}")
+        view = self.get(actual_sha1)
+        if view is not None:
+            return view
+        return self.build(actual_sha1, json.loads(raw_index))
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟镜像 - 在本机提供合成的版本清单、版本JSON、资源索引、资源对象和依赖库，可配置延迟、带宽和故障
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+class SyntheticTree:
+    """按随机种子确定性生成的版本数据，路径与 mirrors.UPSTREAMS 的镜像布局一致"""
+
+    def __init__(self, seed=0, versions=1, assets=3000, asset_mean_bytes=16 * 1024,
+                 libraries=60, library_mean_bytes=400 * 1024, client_bytes=20 * 1024 * 1024,
+                 shared_asset_ratio=0.8):
+        self.rng = random.Random(seed)
+        self.files = {}  # 镜像路径 -> 内容
+        self.version_ids = []
+        self.asset_count = 0
+        self.asset_bytes = 0
+
+        shared_assets = self._make_assets(int(assets * shared_asset_ratio), asset_mean_bytes)
+        shared_libraries = self._make_libraries(libraries, library_mean_bytes)
+        versions_list = []
+        for index in range(versions):
+            version_id = f"bench-{index + 1}"
+            own_assets = self._make_assets(assets - len(shared_assets), asset_mean_bytes)
+            index_data = {'objects': {}}
+            for name, (hash_value, size) in {**shared_assets, **own_assets}.items():
+                index_data['objects'][name] = {'hash': hash_value, 'size': size}
+            index_bytes = json.dumps(index_data).encode('utf-8')
+            index_sha1 = _sha1(index_bytes)
+            self.files[f"/piston-meta/v1/packages/{index_sha1}/{version_id}.json"] = index_bytes
+
+            client = self._random_bytes(client_bytes)
+            client_sha1 = _sha1(client)
+            self.files[f"/piston-data/v1/objects/{client_sha1}/client.jar"] = client
+
+            version_data = {
+                'id': version_id,
+                'type': 'release',
+                'releaseTime': f"2024-01-{index + 1:02d}T00:00:00+00:00",
+                'mainClass': 'net.minecraft.client.main.Main',
+                'assets': version_id,
+                'assetIndex': {
+                    'id': version_id, 'sha1': index_sha1, 'size': len(index_bytes),
+                    'totalSize': sum(o['size'] for o in index_data['objects'].values()),
+                    'url': f"https://piston-meta.mojang.com/v1/packages/{index_sha1}/{version_id}.json",
+                },
+                'downloads': {'client': {
+                    'sha1': client_sha1, 'size': len(client),
+                    'url': f"https://piston-data.mojang.com/v1/objects/{client_sha1}/client.jar",
+                }},
+                'libraries': shared_libraries,
+            }
+            version_bytes = json.dumps(version_data).encode('utf-8')
+            version_sha1 = _sha1(version_bytes)
+            self.files[f"/piston-meta/v1/packages/{version_sha1}/{version_id}.json"] = version_bytes
+            versions_list.append({
+                'id': version_id, 'type': 'release',
+                'url': f"https://piston-meta.mojang.com/v1/packages/{version_sha1}/{version_id}.json",
+                'time': version_data['releaseTime'], 'releaseTime': version_data['releaseTime'],
+                'sha1': version_sha1, 'complianceLevel': 1,
+            })
+            self.version_ids.append(version_id)
+
+        manifest = {'latest': {'release': self.version_ids[-1], 'snapshot': self.version_ids[-1]},
+                    'versions': list(reversed(versions_list))}
+        self.files["/launchermeta/mc/game/version_manifest_v2.json"] = json.dumps(manifest).encode('utf-8')
+
+    def _random_bytes(self, size):
+        return self.rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+    def _size(self, mean):
+        # 对数正态分布：大多数文件很小，少数文件很大，与真实资源接近
+        return max(1, int(self.rng.lognormvariate(0, 1.2) * mean / 2.05))
+
+    def _make_assets(self, count, mean):
+        assets = {}
+        for _ in range(count):
+            data = self._random_bytes(self._size(mean))
+            hash_value = _sha1(data)
+            self.files[f"/resources/{hash_value[:2]}/{hash_value}"] = data
+            assets[f"minecraft/bench/{self.asset_count}.bin"] = (hash_value, len(data))
+            self.asset_count += 1
+            self.asset_bytes += len(data)
+        return assets
+
+    def _make_libraries(self, count, mean):
+        libraries = []
+        for index in range(count):
+            data = self._random_bytes(self._size(mean))
+            # 第一个库放在com/mojang下，启动准备时的核心库检查才能通过
+            group = 'com.mojang.bench' if index == 0 else 'bench'
+            path = f"{group.replace('.', '/')}/lib{index}/1.0/lib{index}-1.0.jar"
+            self.files[f"/libraries/{path}"] = data
+            libraries.append({
+                'name': f"{group}:lib{index}:1.0",
+                'downloads': {'artifact': {
+                    'path': path, 'sha1': _sha1(data), 'size': len(data),
+                    'url': f"https://libraries.minecraft.net/{path}",
+                }},
+            })
+        return libraries
+
+
+class FakeMirror:
+    """在本机端口上提供 SyntheticTree 的内容
+
+    latency: 每个请求在发送响应头前的延迟（秒）
+    bandwidth: 每个连接的带宽上限（字节/秒），None表示不限制
+    failure_rate: 请求返回503的概率；truncate_rate: 响应中途断开的概率
+    """
+
+    def __init__(self, tree, latency=0.0, bandwidth=None, failure_rate=0.0, truncate_rate=0.0, seed=0):
+        self.tree = tree
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.failure_rate = failure_rate
+        self.truncate_rate = truncate_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.failures = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _MirrorRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mirror = self
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def roll(self, probability):
+        if probability <= 0:
+            return False
+        with self.rng_lock:
+            return self.rng.random() < probability
+
+    def reset_counters(self):
+        with self.lock:
+            self.request_count = 0
+            self.bytes_sent = 0
+            self.failures = 0
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _MirrorRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        mirror = self.server.mirror
+        with mirror.lock:
+            mirror.request_count += 1
+        if mirror.latency:
+            time.sleep(mirror.latency)
+        data = mirror.tree.files.get(self.path.split('?', 1)[0])
+        if data is None:
+            self.send_error(404)
+            return
+        if mirror.roll(mirror.failure_rate):
+            with mirror.lock:
+                mirror.failures += 1
+            self.send_error(503)
+            return
+
+        truncate = mirror.roll(mirror.truncate_rate)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        limit = len(data) // 2 if truncate else len(data)
+        chunk_size = 16384
+        started = time.monotonic()
+        sent = 0
+        while sent < limit:
+            chunk = data[sent:min(sent + chunk_size, limit)]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if mirror.bandwidth:
+                # 按带宽上限计算应当耗费的时间，超前时等待
+                ahead = sent / mirror.bandwidth - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        with mirror.lock:
+            mirror.bytes_sent += sent
+            if truncate:
+                mirror.failures += 1
+        if truncate:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
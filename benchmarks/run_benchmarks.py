@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试 - 在本机模拟镜像上测量下载、校验、依赖检查和启动准备的耗时，结果保存为JSON以便对比
+
+用法:
+    python benchmarks/run_benchmarks.py                      # 默认规模
+    python benchmarks/run_benchmarks.py --scale large --latency-ms 30 --bandwidth-mbps 50
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<之前的结果>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from fake_mirror import FakeMirror, SyntheticTree
+
+import manifest_cache
+from asset_downloader import AssetDownloader
+from dependency_checker import DependencyChecker
+from enhanced_version_manager import EnhancedVersionManager
+from install_planner import InstallPlanner, ThroughputHistory
+from launch_config import LaunchConfig
+from library_manager import LibraryManager
+from mirrors import set_mirror
+
+RESULTS_DIR = BENCH_DIR / "results"
+
+# 合成数据规模：资源数与真实版本（约4000个对象）同一数量级
+SCALES = {
+    'small': {'assets': 500, 'libraries': 20, 'client_bytes': 2 * 1024 * 1024},
+    'default': {'assets': 3000, 'libraries': 60, 'client_bytes': 20 * 1024 * 1024},
+    'large': {'assets': 8000, 'libraries': 120, 'client_bytes': 25 * 1024 * 1024},
+}
+
+
+class BenchmarkRunner:
+    """每个基准的准备工作不计时，只测量run部分"""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = Path(tempfile.mkdtemp(prefix='ecl_bench_'))
+        scale = SCALES[args.scale]
+        print(f"生成合成数据 ({args.scale})...", file=sys.stderr)
+        self.tree = SyntheticTree(seed=args.seed, versions=2, **scale)
+        self.mirror = FakeMirror(self.tree, latency=args.latency_ms / 1000,
+                                 bandwidth=args.bandwidth_mbps * 1024 * 1024 / 8 if args.bandwidth_mbps else None,
+                                 failure_rate=args.failure_rate, truncate_rate=args.truncate_rate,
+                                 seed=args.seed).start()
+        set_mirror(self.mirror.base_url)
+        # 使用独立的清单缓存目录，不影响本机启动器的缓存
+        manifest_cache._shared_cache = manifest_cache.ManifestCache(cache_dir=self.workdir / "manifest_cache")
+        self.version_id = self.tree.version_ids[0]
+        self.results = {}
+        self._game_counter = 0
+
+        # 预先完整安装一份，供校验、依赖检查和启动准备使用
+        self.installed = self.new_game_dir()
+        version_data = EnhancedVersionManager(self.installed).fetch_version_json(self.version_id)
+        planner = self.new_planner(self.installed)
+        failures = planner.execute(planner.plan(self.version_id))
+        if failures:
+            print(f"警告: 预安装有 {len(failures)} 个文件失败", file=sys.stderr)
+        self.version_data = version_data
+        with AssetDownloader(self.installed).load_index_view(version_data) as view:
+            self.asset_objects = list(view.iter_unique_objects())
+
+    def new_game_dir(self):
+        self._game_counter += 1
+        path = self.workdir / f"game{self._game_counter}"
+        path.mkdir()
+        return path
+
+    def new_planner(self, game_dir):
+        return InstallPlanner(EnhancedVersionManager(game_dir), AssetDownloader(game_dir, max_workers=self.args.workers),
+                              LibraryManager(game_dir), max_workers=self.args.workers,
+                              throughput=ThroughputHistory(self.workdir / "throughput.json"))
+
+    def bench(self, name, run, setup=None):
+        """重复运行并记录耗时；run返回附加指标（字典）"""
+        if self.args.only and name not in self.args.only:
+            return
+        samples = []
+        metrics = {}
+        for _ in range(self.args.repeat):
+            context = setup() if setup else None
+            self.mirror.reset_counters()
+            started = time.perf_counter()
+            try:
+                metrics = run(context) or {}
+            except Exception as e:
+                # 注入故障时部分管理器会整体失败，记录下来而不是中止整个测试
+                metrics = {'error': str(e)}
+            samples.append(time.perf_counter() - started)
+            metrics['requests'] = self.mirror.request_count
+            metrics['mirror_bytes'] = self.mirror.bytes_sent
+            metrics['injected_failures'] = self.mirror.failures
+        median = statistics.median(samples)
+        result = {'median_s': median, 'min_s': min(samples), 'max_s': max(samples), 'samples_s': samples}
+        if metrics.get('bytes') and 'error' not in metrics:
+            result['mb_per_s'] = metrics['bytes'] / 1024 / 1024 / median
+        if metrics.get('files') and 'error' not in metrics:
+            result['files_per_s'] = metrics['files'] / median
+        result.update(metrics)
+        self.results[name] = result
+        print(f"{name:<28} {median * 1000:10.1f} ms" + (f"  失败: {metrics['error']}" if 'error' in metrics else ''),
+              file=sys.stderr)
+
+    @staticmethod
+    def measure_written(expected, returned=True):
+        """按磁盘上实际写入的文件统计字节数和文件数；expected为[(路径, 大小)]
+
+        调用返回False或有文件缺失、大小不符时记录错误，避免把失败的运行报告为成功
+        """
+        files = 0
+        written = 0
+        missing = 0
+        for path, size in expected:
+            try:
+                actual = os.path.getsize(path)
+            except OSError:
+                missing += 1
+                continue
+            if size and actual != size:
+                missing += 1
+                continue
+            files += 1
+            written += actual
+        metrics = {'bytes': written, 'files': files}
+        if returned is False:
+            metrics['error'] = "调用返回失败"
+        elif missing:
+            metrics['error'] = f"{missing}/{len(expected)} 个文件未写入"
+        return metrics
+
+    def run_all(self):
+        asset_bytes = sum(size for _, size in self.asset_objects)
+        asset_files = len(self.asset_objects)
+        libraries = self.version_data['libraries']
+
+        def manifest_setup():
+            # 每次使用空的清单缓存，测量下载和解析清单的完整耗时
+            manifest_cache._shared_cache = manifest_cache.ManifestCache(
+                cache_dir=self.workdir / f"manifest_cache_{time.monotonic_ns()}")
+            return EnhancedVersionManager(self.installed)
+        self.bench('manifest_fetch', lambda manager: {'versions': len(manager.get_version_catalog().versions())},
+                   setup=manifest_setup)
+
+        def version_json_setup():
+            game_dir = self.new_game_dir()
+            return EnhancedVersionManager(game_dir)
+        self.bench('version_json', lambda manager: manager.fetch_version_json(self.version_id) and None,
+                   setup=version_json_setup)
+
+        def assets_setup():
+            return AssetDownloader(self.new_game_dir(), max_workers=self.args.workers)
+
+        def download_assets(downloader):
+            returned = downloader.download_assets(self.version_data)
+            objects_path = downloader.assets_path / "objects"
+            return self.measure_written([(objects_path / hash_value[:2] / hash_value, size)
+                                         for hash_value, size in self.asset_objects], returned)
+        self.bench('download_assets', download_assets, setup=assets_setup)
+
+        def libraries_setup():
+            return LibraryManager(self.new_game_dir())
+
+        def download_libraries(manager):
+            returned = manager.download_libraries(self.version_data)
+            return self.measure_written([(manager.libraries_path / info['path'], info.get('size'))
+                                         for info in manager.resolve_libraries(self.version_data)], returned)
+        self.bench('download_libraries', download_libraries, setup=libraries_setup)
+
+        downloader = AssetDownloader(self.installed)
+        self.bench('check_assets_integrity', lambda _: (
+            downloader.check_assets_integrity(self.version_data),
+            {'bytes': asset_bytes, 'files': asset_files})[1])
+
+        checker = DependencyChecker(self.installed)
+        self.bench('dependency_checker', lambda _: checker.check_version_dependencies(self.version_id) and None)
+
+        planner = self.new_planner(self.installed)
+        self.bench('install_plan_noop', lambda _: {'files': asset_files + len(libraries) + 1,
+                                                   'pending': len(planner.plan(self.version_id).files)})
+
+        def execute_setup():
+            game_dir = self.new_game_dir()
+            fresh_planner = self.new_planner(game_dir)
+            return fresh_planner, fresh_planner.plan(self.version_id)
+        def install_execute(context):
+            planner, plan = context
+            failures = planner.execute(plan)
+            metrics = self.measure_written([(planned.path, planned.size) for planned in plan.files])
+            metrics['failed'] = len(failures)
+            if failures and 'error' not in metrics:
+                metrics['error'] = f"{len(failures)} 个文件下载失败"
+            return metrics
+        self.bench('install_execute', install_execute, setup=execute_setup)
+
+        config = LaunchConfig(self.workdir / "config.json")
+        config.update({'java_path': sys.executable, 'game_directory': str(self.installed)})
+        self.bench('launch_plan', lambda _: {'args': len(config.get_launch_arguments(
+            self.version_data, self.version_id, str(self.installed)))})
+
+    def report(self):
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'params': {
+                'scale': self.args.scale, 'seed': self.args.seed, 'repeat': self.args.repeat,
+                'workers': self.args.workers, 'latency_ms': self.args.latency_ms,
+                'bandwidth_mbps': self.args.bandwidth_mbps, 'failure_rate': self.args.failure_rate,
+                'truncate_rate': self.args.truncate_rate,
+            },
+            'tree': {'assets': len(self.asset_objects), 'asset_bytes': sum(s for _, s in self.asset_objects),
+                     'libraries': len(self.version_data['libraries'])},
+            'results': self.results,
+        }
+
+    def close(self):
+        self.mirror.stop()
+        set_mirror('')
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ''
+
+
+def compare(baseline, current):
+    """打印两次结果的中位数耗时对比"""
+    print(f"{'基准':<28} {'基线(ms)':>12} {'当前(ms)':>12} {'变化':>9}")
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        now_ms = result['median_s'] * 1000
+        if base is None:
+            print(f"{name:<28} {'-':>12} {now_ms:12.1f} {'-':>9}")
+            continue
+        base_ms = base['median_s'] * 1000
+        change = (now_ms - base_ms) / base_ms * 100 if base_ms else 0
+        print(f"{name:<28} {base_ms:12.1f} {now_ms:12.1f} {change:+8.1f}%")
+    if baseline.get('params') != current.get('params'):
+        print("注意: 两次运行的参数不同，对比结果仅供参考")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECL 基准测试")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='default')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--bandwidth-mbps', type=float, default=0, help="每个连接的带宽上限，0表示不限制")
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--truncate-rate', type=float, default=0)
+    parser.add_argument('--only', nargs='+', help="只运行指定的基准")
+    parser.add_argument('--output', help="结果文件路径（默认保存到 benchmarks/results/）")
+    parser.add_argument('--compare', help="与之前的结果文件对比")
+    args = parser.parse_args(argv)
+
+    runner = BenchmarkRunner(args)
+    try:
+        runner.run_all()
+        report = runner.report()
+    finally:
+        runner.close()
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{report['git_commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
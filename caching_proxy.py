@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存代理 - 作为局域网镜像转发官方下载地址，磁盘LRU缓存，同一地址的并发请求只访问一次上游
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+from mirrors import upstream_url
+
+DEFAULT_PORT = 25590
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024 * 1024
+# 内容会变化的地址（版本清单）只缓存较短时间，其余地址的内容不可变
+MUTABLE_PATTERN = re.compile(r'/version_manifest[^/]*\.json$')
+MUTABLE_TTL = 300
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+# 地址中带有内容SHA1的文件：资源对象 resources/<前两位>/<sha1>，以及 .../objects/<sha1>/<文件名>
+CONTENT_SHA1_PATTERNS = (
+    re.compile(r'^https://resources\.download\.minecraft\.net/[0-9a-f]{2}/([0-9a-f]{40})$'),
+    re.compile(r'/objects/([0-9a-f]{40})/[^/]+$'),
+)
+
+
+def expected_sha1(url):
+    """地址本身给出的内容SHA1，没有时返回None"""
+    for pattern in CONTENT_SHA1_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
+
+class DiskLRUCache:
+    """以地址的SHA1为文件名的磁盘缓存，总大小超过上限时淘汰最久未使用的条目"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # 键 -> 大小，最近使用的在末尾
+        self.total_bytes = 0
+        self._scan()
+
+    def _scan(self):
+        """启动时按访问时间恢复LRU顺序，清理上次遗留的临时文件"""
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.tmp'):
+                os.remove(entry.path)
+            elif entry.is_file():
+                stat = entry.stat()
+                found.append((stat.st_atime, entry.name, stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return self.cache_dir / key
+
+    def get(self, key, max_age=None):
+        """命中时返回(路径, 大小)并标记为最近使用"""
+        with self.lock:
+            size = self.entries.get(key)
+            if size is None:
+                return None
+            path = self.path_for(key)
+            if max_age is not None:
+                try:
+                    if time.time() - path.stat().st_mtime > max_age:
+                        return None
+                except OSError:
+                    return None
+            self.entries.move_to_end(key)
+        return path, size
+
+    def discard(self, key):
+        """删除一个条目，返回是否存在"""
+        with self.lock:
+            size = self.entries.pop(key, None)
+            if size is None:
+                return False
+            self.total_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+        return True
+
+    def temp_path(self, key):
+        return self.cache_dir / f"{key}.{threading.get_ident()}.tmp"
+
+    def commit(self, key, temp_path):
+        """把下载完成的临时文件加入缓存，必要时淘汰旧条目"""
+        size = os.path.getsize(temp_path)
+        evicted = []
+        with self.lock:
+            os.replace(temp_path, self.path_for(key))
+            old_size = self.entries.pop(key, None)
+            if old_size is not None:
+                self.total_bytes -= old_size
+            self.entries[key] = size
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, old_size = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+                evicted.append(old_key)
+            # 在锁内删除，避免与同名的新条目交错
+            for old_key in evicted:
+                try:
+                    os.remove(self.path_for(old_key))
+                except OSError:
+                    pass
+        return size
+
+
+class CachingProxy:
+    """镜像服务：GET /<名称>/<路径>，名称见 mirrors.UPSTREAMS"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, port=DEFAULT_PORT, host='', timeout=30):
+        self.cache = DiskLRUCache(cache_dir, max_bytes)
+        self.session = requests.Session()
+        self.timeout = timeout
+        self.inflight = {}  # 键 -> 完成事件
+        self.inflight_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'upstream_bytes': 0, 'served_bytes': 0}
+        self.stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _ProxyRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.proxy = self
+        self.port = self.httpd.server_address[1]
+
+    def _count(self, name, value=1):
+        with self.stats_lock:
+            self.stats[name] += value
+
+    def fetch(self, url):
+        """返回缓存中的(路径, 大小)；未命中时下载，同一地址的并发请求等待同一次下载"""
+        key = self.cache.key_for(url)
+        max_age = MUTABLE_TTL if MUTABLE_PATTERN.search(url) else None
+        while True:
+            cached = self.cache.get(key, max_age)
+            if cached is not None:
+                self._count('hits')
+                return cached
+            with self.inflight_lock:
+                event = self.inflight.get(key)
+                leader = event is None
+                if leader:
+                    event = self.inflight[key] = threading.Event()
+            if not leader:
+                self._count('coalesced')
+                event.wait()
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+                continue  # 上一次下载失败，重新尝试
+            try:
+                self._count('misses')
+                return self._download(url, key)
+            finally:
+                with self.inflight_lock:
+                    del self.inflight[key]
+                event.set()
+
+    def invalidate(self, url):
+        """丢弃某个地址的缓存（例如客户端发现内容损坏），下次请求重新从上游下载"""
+        return self.cache.discard(self.cache.key_for(url))
+
+    def _download(self, url, key):
+        """下载到临时文件，内容完整时才加入缓存
+
+        带SHA1的地址边下载边校验；未压缩传输时核对 Content-Length，截断的响应不会进入缓存
+        """
+        temp_path = self.cache.temp_path(key)
+        sha1 = expected_sha1(url)
+        hasher = hashlib.sha1()
+        received = 0
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 404:
+                    raise FileNotFoundError(url)
+                response.raise_for_status()
+                # iter_content 会解压 gzip 等编码，此时长度与 Content-Length 不可比
+                expected_length = None
+                if not response.headers.get('Content-Encoding'):
+                    expected_length = response.headers.get('Content-Length')
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=65536):
+                        if chunk:
+                            f.write(chunk)
+                            received += len(chunk)
+                            if sha1:
+                                hasher.update(chunk)
+            if expected_length is not None and expected_length.isdigit() and received != int(expected_length):
+                raise Exception(f"上游响应不完整: {url} 期望 {expected_length} 字节, 实际 {received} 字节")
+            if sha1 and hasher.hexdigest() != sha1:
+                raise Exception(f"上游内容哈希值不匹配: {url} 期望 {sha1}, 实际 {hasher.hexdigest()}")
+            size = self.cache.commit(key, temp_path)
+        except BaseException:
+            if temp_path.exists():
+                os.remove(temp_path)
+            raise
+        self._count('upstream_bytes', size)
+        return self.cache.path_for(key), size
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _ProxyRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_DELETE(self):
+        """丢弃缓存条目：DELETE /<名称>/<路径>"""
+        url = upstream_url(self.path.split('?', 1)[0])
+        if url is None:
+            self.send_error(404)
+            return
+        self.send_response(204 if self.server.proxy.invalidate(url) else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _serve(self, send_body):
+        proxy = self.server.proxy
+        url = upstream_url(self.path.split('?', 1)[0])
+        if url is None:
+            self.send_error(404)
+            return
+        try:
+            path, size = proxy.fetch(url)
+        except FileNotFoundError:
+            self.send_error(404)
+            return
+        except Exception as e:
+            self.send_error(502, str(e))
+            return
+
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        if range_header:
+            match = RANGE_PATTERN.match(range_header.strip())
+            if match and (match.group(1) or match.group(2)):
+                if match.group(1):
+                    start = int(match.group(1))
+                    if match.group(2):
+                        end = min(int(match.group(2)), size - 1)
+                else:
+                    # bytes=-N 表示最后N个字节
+                    start = max(size - int(match.group(2)), 0)
+                if start > end or start >= size:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f"bytes */{size}")
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                status = 206
+
+        length = end - start + 1 if size else 0
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body:
+            return
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(65536, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except FileNotFoundError:
+            # 发送过程中条目被淘汰，连接已无法恢复，只能断开
+            self.close_connection = True
+            return
+        proxy._count('served_bytes', length - remaining)
+
+    def log_message(self, format, *args):
+        pass
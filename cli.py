@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行入口 - 无界面地安装、校验、修复、清理和启动版本，进度以JSON行输出
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+from install_job import InstallCancelled, InstallJob
+from launch_config import LaunchConfig
+from launcher_services import LauncherServices
+from mirrors import set_mirror
+
+# 与图形界面使用同一个配置文件
+DEFAULT_CONFIG_PATH = Path(__file__).parent / "config.json"
+
+
+class JsonLinesReporter:
+    """把事件逐行写成JSON，多线程共用一个输出流"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        record = {'event': event, 'time': round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def progress_callback(self, version_id):
+        """生成与各管理器兼容的progress_callback(message, percent)"""
+        def callback(message, percent):
+            self.emit('progress', version=version_id, message=message, percent=round(percent, 1))
+        return callback
+
+
+class LauncherCLI:
+    """复用图形界面的各管理器，多个版本并发处理，共享一个下载线程池"""
+
+    def __init__(self, args, reporter=None):
+        self.args = args
+        self.reporter = reporter or JsonLinesReporter()
+        self.config = LaunchConfig(args.config)
+        self.minecraft_path = args.game_dir or self.config.get('game_directory')
+        set_mirror(args.mirror if args.mirror is not None else self.config.get('download_mirror', ''))
+
+        content_store = None
+        store_path = args.store if args.store is not None else self.config.get('shared_store_path', '')
+        if store_path:
+            from content_store import ContentStore
+            content_store = ContentStore(store_path)
+
+        peer_fetcher = None
+        peers = list(self.config.get('lan_peers', [])) + (args.peer or [])
+        if peers or args.discover:
+            from peer_cache import PeerFetcher
+            peer_fetcher = PeerFetcher(peers, discovery=args.discover)
+
+        self.services = LauncherServices(self.minecraft_path, max_workers=args.workers,
+                                         content_store=content_store, peer_fetcher=peer_fetcher)
+        # 正在执行的安装任务，Ctrl+C 时取消并保存状态
+        self.jobs = []
+
+    def for_each_version(self, handler):
+        """并发处理每个版本；下载任务都提交到同一个线程池，总并发数不超过 --workers
+
+        Ctrl+C 时取消所有安装任务（保存状态以便下次继续）并等待它们停止
+        """
+        failed = 0
+        with ThreadPoolExecutor(max_workers=self.args.workers) as download_pool, \
+                ThreadPoolExecutor(max_workers=self.args.jobs) as version_pool:
+            futures = {version_pool.submit(handler, version_id, download_pool): version_id
+                       for version_id in self.args.versions}
+            pending = set(futures)
+            while pending:
+                try:
+                    # 带超时的等待，使主线程能及时响应 Ctrl+C
+                    done, pending = wait(pending, timeout=0.5)
+                except KeyboardInterrupt:
+                    for job in list(self.jobs):
+                        job.cancel()
+                    for future in pending:
+                        future.cancel()
+                    continue
+                for future in done:
+                    version_id = futures[future]
+                    if future.cancelled():
+                        self.reporter.emit('cancelled', version=version_id, completed=0)
+                        failed += 1
+                        continue
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        self.reporter.emit('error', version=version_id, message=str(e))
+                        ok = False
+                    if not ok:
+                        failed += 1
+        self.reporter.emit('summary', command=self.args.command,
+                           versions=len(self.args.versions), failed=failed)
+        return 0 if failed == 0 else 1
+
+    def _install(self, version_id, download_pool, verify):
+        if self.args.dry_run:
+            self._plan(version_id, verify)
+            return True
+        # 上次中断的安装从已完成的文件和 .part 文件继续
+        job = InstallJob.load(version_id, self.minecraft_path)
+        self.jobs.append(job)
+        job.start()
+        started = time.monotonic()
+        try:
+            plan = self._plan(version_id, verify, job)
+            failures = self.services.install_planner.execute(
+                plan, self.reporter.progress_callback(version_id), executor=download_pool, job=job)
+        except InstallCancelled:
+            job.finish(cancelled=True)
+            self.reporter.emit('cancelled', version=version_id, completed=len(job.completed))
+            return False
+        except Exception:
+            job.finish(error=True)
+            raise
+        finally:
+            self.jobs.remove(job)
+        job.finish(failures)
+        self.reporter.emit('done', version=version_id, ok=not failures,
+                           failed=[planned.to_dict() for planned, _ in failures],
+                           seconds=round(time.monotonic() - started, 2))
+        return not failures
+
+    def _plan(self, version_id, verify, job=None):
+        plan = self.services.install_planner.plan(
+            version_id, verify=verify, progress_callback=self.reporter.progress_callback(version_id), job=job)
+        self.reporter.emit('plan', version=version_id, files=len(plan.files), linked=len(plan.linked),
+                           corrupt=plan.corrupt, total_bytes=plan.total_bytes,
+                           shared_bytes=plan.shared_bytes, fetch_bytes=plan.fetch_bytes,
+                           estimated_seconds=round(plan.estimated_seconds, 1))
+        return plan
+
+    def install(self, version_id, download_pool):
+        return self._install(version_id, download_pool, verify=False)
+
+    def repair(self, version_id, download_pool):
+        return self._install(version_id, download_pool, verify=True)
+
+    def verify(self, version_id, download_pool):
+        """完整校验：版本文件、依赖库和资源逐个比对SHA1，不下载、不修改任何文件"""
+        result = self._daemon_verify(version_id)
+        if result is None:
+            plan = self.services.install_planner.plan(
+                version_id, verify=True, progress_callback=self.reporter.progress_callback(version_id),
+                read_only=True)
+            result = plan.verify_result()
+        self.reporter.emit('verify', version=version_id, **result)
+        return result['ok']
+
+    def _daemon_verify(self, version_id):
+        """常驻服务运行且管理同一游戏目录时，由它返回（可能已缓存的）校验结果"""
+        if self.args.no_daemon:
+            return None
+        from launcher_daemon import DaemonClient
+        client = DaemonClient.connect()
+        if client is None:
+            return None
+        try:
+            with client:
+                if Path(client.call('status')['minecraft_path']) != Path(self.minecraft_path):
+                    return None
+                return client.call('verify', version_id=version_id, full=True)
+        except Exception as e:
+            self.reporter.emit('warning', version=version_id, message=f"常驻服务请求失败: {e}")
+            return None
+
+    def daemon(self):
+        import launcher_daemon
+        if self.args.stop or self.args.status:
+            client = launcher_daemon.DaemonClient.connect()
+            if client is None:
+                self.reporter.emit('daemon', running=False)
+                return 1
+            with client:
+                if self.args.stop:
+                    client.call('shutdown')
+                    self.reporter.emit('daemon', running=False, stopped=True)
+                else:
+                    self.reporter.emit('daemon', running=True, **client.call('status'))
+            return 0
+        launcher_daemon.serve(self.args.config, self.minecraft_path)
+        return 0
+
+    def proxy(self):
+        from caching_proxy import CachingProxy
+        proxy = CachingProxy(self.args.cache_dir, int(self.args.max_gb * 1024 ** 3), port=self.args.port)
+        self.reporter.emit('proxy', port=proxy.port, cache_dir=self.args.cache_dir,
+                           cached_bytes=proxy.cache.total_bytes)
+        try:
+            proxy.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            proxy.stop()
+            self.reporter.emit('proxy_stopped', **proxy.stats)
+        return 0
+
+    def gc(self):
+        from garbage_collector import GarbageCollector
+        collector = GarbageCollector(self.minecraft_path)
+        min_age_days = self.args.min_age_days
+        if min_age_days is None:
+            min_age_days = self.config.get('gc_min_age_days', 1)
+        report = collector.collect(dry_run=not self.args.apply, min_age_days=min_age_days,
+                                   keep_library_versions=self.args.keep_library_versions)
+        result = report.to_dict()
+        if not self.args.list_files:
+            result.pop('files')
+        self.reporter.emit('gc', **result)
+        return 1 if report.errors else 0
+
+    def launch(self):
+        from launch_metrics import LaunchTimer, LaunchRecordStore
+
+        version_id = self.args.version
+        timer = LaunchTimer(version_id, LaunchRecordStore(Path(__file__).parent / "launch_records.jsonl"),
+                            launcher_version='cli')
+        version_dir = Path(self.minecraft_path) / "versions" / version_id
+        json_file = version_dir / f"{version_id}.json"
+        if not json_file.exists() or not (version_dir / f"{version_id}.jar").exists():
+            timer.finish('missing_files')
+            raise Exception(f"版本 {version_id} 未安装，请先执行 install")
+        with open(json_file, 'r', encoding='utf-8') as f:
+            version_data = json.load(f)
+
+        instance_name = self.args.instance or self.config.get('current_instance', '')
+        instance_info = None
+        if instance_name:
+            instance_info = self.services.instance_manager.get_instance(instance_name)
+            if instance_info is None:
+                raise Exception(f"实例不存在: {instance_name}")
+        instance_dir = instance_info['path'] if instance_info else None
+        instance_settings = instance_info.get('settings', {}) if instance_info else {}
+
+        with timer.phase('classpath_build'):
+            cmd = self.config.get_launch_arguments(
+                version_data, version_id, self.minecraft_path,
+                instance_directory=instance_dir, instance_settings=instance_settings)
+        timer.jvm_args = LaunchConfig.jvm_arguments(cmd)
+
+        exited = threading.Event()
+        result = {}
+
+        def on_output(line):
+            self.reporter.emit('log', version=version_id, line=line.rstrip('\n'))
+
+        def on_exit(return_code):
+            result['return_code'] = return_code
+            exited.set()
+
+        process_settings = self.config.get_process_settings(version_id, instance_settings)
+        process_manager = self.services.process_manager
+        process_manager.lower_launcher_priority = False
+        if not process_manager.start_process(cmd, cwd=instance_dir or self.minecraft_path,
+                                             callback=on_output, launch_timer=timer,
+                                             priority=process_settings['priority'],
+                                             affinity=process_settings['affinity'],
+                                             exit_callback=on_exit, detached=self.args.detach):
+            return 1
+        self.reporter.emit('launched', version=version_id, pid=process_manager.process.pid)
+        if self.args.detach:
+            return 0
+        exited.wait()
+        self.reporter.emit('exit', version=version_id, return_code=result.get('return_code'))
+        return 0 if result.get('return_code') == 0 else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Easy Minecraft Launcher 命令行")
+    parser.add_argument('--config', default=str(DEFAULT_CONFIG_PATH), help="配置文件路径")
+    parser.add_argument('--game-dir', help="游戏目录（默认使用配置中的目录）")
+    parser.add_argument('--store', help="共享存储路径（默认使用配置中的路径，空字符串表示不使用）")
+    parser.add_argument('--workers', type=int, default=16, help="全局下载并发数")
+    parser.add_argument('--jobs', type=int, default=4, help="同时处理的版本数")
+    parser.add_argument('--peer', action='append', metavar='HOST:PORT', help="优先从该局域网同伴获取文件（可重复）")
+    parser.add_argument('--discover', action='store_true', help="广播发现局域网内的同伴")
+    parser.add_argument('--trace', metavar='FILE', help="记录性能追踪并在退出时导出为Chrome trace JSON")
+    parser.add_argument('--mirror', help="下载镜像地址（默认使用配置中的地址，空字符串表示直接访问官方地址）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('install', "安装版本"), ('repair', "校验并重新下载损坏或缺失的文件")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('versions', nargs='+', metavar='VERSION')
+        sub.add_argument('--dry-run', action='store_true', help="只输出安装计划")
+
+    sub = subparsers.add_parser('verify', help="校验已安装版本的所有文件")
+    sub.add_argument('versions', nargs='+', metavar='VERSION')
+    sub.add_argument('--no-daemon', action='store_true', help="不使用常驻服务，直接校验")
+
+    sub = subparsers.add_parser('daemon', help="在前台运行常驻服务")
+    sub.add_argument('--status', action='store_true', help="查询常驻服务状态")
+    sub.add_argument('--stop', action='store_true', help="停止常驻服务")
+
+    sub = subparsers.add_parser('gc', help="清理未被任何版本引用的资源和依赖库")
+    sub.add_argument('--apply', action='store_true', help="实际删除（默认只统计）")
+    sub.add_argument('--min-age-days', type=float, help="跳过最近N天内修改过的文件")
+    sub.add_argument('--keep-library-versions', type=int, default=0, help="每个库额外保留的旧版本数")
+    sub.add_argument('--list-files', action='store_true', help="输出待删除文件清单")
+
+    sub = subparsers.add_parser('proxy', help="作为局域网下载镜像运行缓存代理")
+    sub.add_argument('--port', type=int, default=25590)
+    sub.add_argument('--cache-dir', default=str(Path.home() / ".amcl_cache" / "proxy"))
+    sub.add_argument('--max-gb', type=float, default=20, help="缓存大小上限（GB）")
+
+    sub = subparsers.add_parser('launch', help="启动版本")
+    sub.add_argument('version')
+    sub.add_argument('--instance', help="使用的实例（默认使用配置中的当前实例）")
+    sub.add_argument('--detach', action='store_true', help="启动后立即返回，不等待游戏退出")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        import tracing
+        tracing.enable_with_export(args.trace)
+    reporter = JsonLinesReporter(sys.stdout)
+    # 各管理器中的print改为输出到stderr，stdout只包含JSON行
+    sys.stdout = sys.stderr
+    try:
+        cli = LauncherCLI(args, reporter)
+        if args.command in ('install', 'repair', 'verify'):
+            return cli.for_each_version(getattr(cli, args.command))
+        if args.command == 'gc':
+            return cli.gc()
+        if args.command == 'daemon':
+            return cli.daemon()
+        if args.command == 'proxy':
+            return cli.proxy()
+        return cli.launch()
+    except Exception as e:
+        reporter.emit('error', message=str(e))
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址共享存储 - 多个游戏目录共享同一份资源文件和依赖库（按SHA1寻址）
+"""
+
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+from file_utils import file_sha1
+
+# 放置文件时依次尝试的方式
+LINK_MODES = ('reflink', 'hardlink', 'symlink', 'copy')
+
+# Linux下的FICLONE ioctl（btrfs、xfs等支持写时复制的文件系统）
+FICLONE = 0x40049409
+
+
+def reflink(src, dst):
+    """写时复制克隆文件，不支持时抛出OSError"""
+    if not sys.platform.startswith('linux'):
+        raise OSError("当前平台不支持reflink")
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def place_file(src, dst, link_modes=LINK_MODES):
+    """按link_modes的顺序把src放到dst，返回实际使用的方式"""
+    src = str(src)
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst.with_name(f"{dst.name}.{threading.get_ident()}.link")
+    for mode in link_modes:
+        try:
+            if tmp_path.exists() or tmp_path.is_symlink():
+                tmp_path.unlink()
+            if mode == 'reflink':
+                reflink(src, tmp_path)
+            elif mode == 'hardlink':
+                os.link(src, tmp_path)
+            elif mode == 'symlink':
+                os.symlink(os.path.abspath(src), tmp_path)
+            else:
+                shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, dst)
+            return mode
+        except (OSError, NotImplementedError):
+            continue
+    if tmp_path.exists():
+        tmp_path.unlink()
+    raise OSError(f"无法放置文件: {src} -> {dst}")
+
+
+class ContentStore:
+    """全局共享存储，objects/<前两位>/<sha1>"""
+
+    def __init__(self, root, link_modes=LINK_MODES):
+        self.root = Path(root)
+        self.objects_path = self.root / "objects"
+        self.link_modes = tuple(link_modes)
+
+    def object_path(self, sha1):
+        return self.objects_path / sha1[:2] / sha1
+
+    def contains(self, sha1):
+        return bool(sha1) and self.object_path(sha1).exists()
+
+    def materialize(self, sha1, dest):
+        """若存储中已有该对象，则链接到dest并返回使用的方式，否则返回None"""
+        if not self.contains(sha1):
+            return None
+        try:
+            return place_file(self.object_path(sha1), dest, self.link_modes)
+        except OSError as e:
+            print(f"从共享存储放置文件失败: {e}")
+            return None
+
+    def discard(self, sha1):
+        """移除存储中的对象（发现其内容损坏时使用）"""
+        try:
+            self.object_path(sha1).unlink()
+            return True
+        except OSError:
+            return False
+
+    def ingest(self, path, sha1, verify=False):
+        """将已校验的文件加入存储（优先硬链接，不占用额外空间）"""
+        if not sha1 or self.contains(sha1):
+            return False
+        path = Path(path)
+        if not path.exists():
+            return False
+        if verify and file_sha1(path) != sha1:
+            return False
+        try:
+            # 存储中的对象必须是真实文件，不能是指向游戏目录的符号链接
+            place_file(path, self.object_path(sha1), ('reflink', 'hardlink', 'copy'))
+            return True
+        except OSError as e:
+            print(f"加入共享存储失败: {e}")
+            return False
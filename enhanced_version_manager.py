@@ -11,59 +11,47 @@ import threading
 from pathlib import Path
 from urllib.parse import urljoin
 
+from manifest_cache import get_manifest_cache
+from local_version_catalog import LocalVersionCatalog
+from file_utils import atomic_write_bytes, file_matches_sha1, verify_bytes
+from mirrors import resolve_url
+from tracing import span
+
 class EnhancedVersionManager:
     def __init__(self, minecraft_path, progress_callback=None):
         self.minecraft_path = Path(minecraft_path)
         self.versions_path = self.minecraft_path / "versions"
         self.versions_path.mkdir(parents=True, exist_ok=True)
         self.progress_callback = progress_callback
+        self.local_catalog = LocalVersionCatalog(self.versions_path)
+    
+    def get_version_manifest(self, force_refresh=False):
+        """获取版本清单（经共享缓存，重复调用不会重新下载）"""
+        try:
+            return get_manifest_cache().get_manifest(force_refresh)
+        except Exception as e:
+            raise Exception(f"获取版本清单失败: {e}")
     
-    def get_version_manifest(self):
-        """获取版本清单"""
+    def get_version_catalog(self, force_refresh=False):
+        """获取版本目录（按ID索引的清单）"""
         try:
-            manifest_url = "https://launchermeta.mojang.com/mc/game/version_manifest.json"
-            response = requests.get(manifest_url)
-            response.raise_for_status()
-            return response.json()
+            return get_manifest_cache().get_catalog(force_refresh)
         except Exception as e:
             raise Exception(f"获取版本清单失败: {e}")
     
     def get_available_versions(self, version_type=None):
         """获取可用的版本列表"""
-        manifest = self.get_version_manifest()
-        versions = []
-        
-        for version in manifest['versions']:
-            if version_type and version['type'] != version_type:
-                continue
-            versions.append({
-                'id': version['id'],
-                'type': version['type'],
-                'release_time': version['releaseTime'],
-                'url': version['url']
-            })
-        
-        return versions
+        catalog = self.get_version_catalog()
+        return [{
+            'id': version['id'],
+            'type': version['type'],
+            'release_time': version['original_data']['releaseTime'],
+            'url': version['url']
+        } for version in catalog.versions(version_type)]
     
     def get_local_versions(self):
-        """获取本地已安装的版本"""
-        versions = []
-        for version_dir in self.versions_path.iterdir():
-            if version_dir.is_dir():
-                json_file = version_dir / f"{version_dir.name}.json"
-                if json_file.exists():
-                    try:
-                        with open(json_file, 'r', encoding='utf-8') as f:
-                            version_data = json.load(f)
-                            versions.append({
-                                'id': version_data.get('id', version_dir.name),
-                                'type': version_data.get('type', 'release'),
-                                'release_time': version_data.get('releaseTime', ''),
-                                'path': str(version_dir)
-                            })
-                    except Exception as e:
-                        print(f"读取版本 {version_dir.name} 信息失败: {e}")
-        return versions
+        """获取本地已安装的版本（只重新解析有变化的版本JSON）"""
+        return self.local_catalog.refresh()
     
     def download_version(self, version_id, progress_callback=None):
         """下载指定版本的Minecraft"""
@@ -71,15 +59,8 @@ class EnhancedVersionManager:
             if progress_callback:
                 progress_callback(f"开始下载版本 {version_id}", 0)
             
-            # 获取版本清单
-            manifest = self.get_version_manifest()
-            
             # 查找指定版本
-            version_info = None
-            for version in manifest['versions']:
-                if version['id'] == version_id:
-                    version_info = version
-                    break
+            version_info = self.get_version_catalog().get(version_id)
             
             if not version_info:
                 raise Exception(f"未找到版本 {version_id}")
@@ -87,22 +68,8 @@ class EnhancedVersionManager:
             if progress_callback:
                 progress_callback(f"获取版本信息", 10)
             
-            # 下载版本JSON文件
-            version_response = requests.get(version_info['url'])
-            version_response.raise_for_status()
-            version_data = version_response.json()
-            
-            # 创建版本目录
             version_dir = self.versions_path / version_id
-            version_dir.mkdir(exist_ok=True)
-            
-            if progress_callback:
-                progress_callback(f"保存版本配置", 20)
-            
-            # 保存版本JSON
-            json_file = version_dir / f"{version_id}.json"
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(version_data, f, indent=2)
+            version_data = self.fetch_version_json(version_id, version_info)
             
             # 下载客户端JAR文件
             client_url = version_data['downloads']['client']['url']
@@ -121,9 +88,38 @@ class EnhancedVersionManager:
                 progress_callback(f"下载失败: {e}", -1)
             raise Exception(f"下载版本 {version_id} 失败: {e}")
     
+    def fetch_version_json(self, version_id, version_info=None):
+        """获取版本JSON：本地文件与清单SHA1一致时直接读取，否则下载校验后保存"""
+        if version_info is None:
+            version_info = self.get_version_catalog().get(version_id)
+            if not version_info:
+                raise Exception(f"未找到版本 {version_id}")
+        
+        # 创建版本目录
+        version_dir = self.versions_path / version_id
+        version_dir.mkdir(exist_ok=True)
+        json_file = version_dir / f"{version_id}.json"
+        
+        if file_matches_sha1(json_file, version_info.get('sha1')):
+            # 本地版本JSON与清单一致，无需重新下载
+            with open(json_file, 'rb') as f:
+                return json.loads(f.read())
+        
+        # 下载版本JSON文件
+        with span('version_json', version=version_id, bytes=0) as json_span:
+            version_response = requests.get(resolve_url(version_info['url']), timeout=30)
+            version_response.raise_for_status()
+            raw_json = version_response.content
+            json_span.set('bytes', len(raw_json))
+        verify_bytes(raw_json, version_info.get('sha1'), f"版本配置 {version_id}")
+        
+        # 按原始字节保存版本JSON
+        atomic_write_bytes(json_file, raw_json)
+        return json.loads(raw_json)
+    
     def _download_file_with_progress(self, url, file_path, progress_callback=None):
         """带进度显示的文件下载"""
-        response = requests.get(url, stream=True)
+        response = requests.get(resolve_url(url), stream=True)
         response.raise_for_status()
         
         total_size = int(response.headers.get('content-length', 0))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件工具 - 原子写入与SHA1校验
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from tracing import span
+
+
+def sha1_bytes(data):
+    """计算字节串的SHA1"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def file_sha1(file_path, chunk_size=65536):
+    """计算文件的SHA1"""
+    hasher = hashlib.sha1()
+    with span('hash', path=str(file_path)):
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def file_matches_sha1(file_path, expected_sha1):
+    """文件存在且SHA1与期望值一致"""
+    if not expected_sha1 or not os.path.exists(file_path):
+        return False
+    try:
+        return file_sha1(file_path) == expected_sha1
+    except OSError:
+        return False
+
+
+def verify_bytes(data, expected_sha1, name=""):
+    """校验数据的SHA1，不一致时抛出异常；未提供期望值时跳过"""
+    if not expected_sha1:
+        return
+    actual = sha1_bytes(data)
+    if actual != expected_sha1:
+        raise Exception(f"{name} 哈希值不匹配: 期望 {expected_sha1}, 实际 {actual}")
+
+
+def atomic_write_bytes(file_path, data):
+    """先写入同目录临时文件再替换，保证目标文件要么是旧内容要么是完整的新内容"""
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=file_path.name + '.', suffix='.tmp', dir=file_path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
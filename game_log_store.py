@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏日志存储 - 将每次启动的游戏输出压缩保存，并建立行偏移索引
+"""
+
+import gzip
+import re
+import struct
+import threading
+import time
+from pathlib import Path
+
+# 索引记录: 块偏移(u64) 压缩长度(u32) 首行行号(u64) 行数(u32)
+INDEX_RECORD = struct.Struct('<QIQI')
+BLOCK_LINES = 512
+FLUSH_INTERVAL = 2.0
+
+
+class GameLogWriter:
+    """单个日志文件的写入器，按块压缩后追加写入
+
+    缓冲区中的行最多停留 FLUSH_INTERVAL 秒，游戏停止输出时由定时器写出。
+    轮转到新分片后调用 on_rotate(新分片路径)，用于检查空间预算。
+    """
+
+    def __init__(self, log_path, max_file_bytes=32 * 1024 * 1024, on_rotate=None):
+        self.log_path = Path(log_path)
+        self.index_path = self.log_path.with_suffix('.idx')
+        self.max_file_bytes = max_file_bytes
+        self.on_rotate = on_rotate
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.line_count = 0
+        self.part = 0
+        self.closed = False
+        self.last_flush = time.monotonic()
+        self._timer = None
+        self._open_part()
+
+    def _open_part(self):
+        """打开当前分片的数据文件和索引文件"""
+        if self.part:
+            stem = self.log_path.name[:-len('.log.gz')]
+            path = self.log_path.with_name(f"{stem}.{self.part}.log.gz")
+        else:
+            path = self.log_path
+        self.current_path = path
+        self.data_file = open(path, 'ab')
+        self.index_file = open(path.with_suffix('.idx'), 'ab')
+        self.offset = self.data_file.tell()
+
+    def append(self, line):
+        """追加一行日志"""
+        with self.lock:
+            if self.closed:
+                return
+            self.buffer.append(line)
+            if len(self.buffer) >= BLOCK_LINES or time.monotonic() - self.last_flush > FLUSH_INTERVAL:
+                self._flush_block()
+            elif self._timer is None:
+                # 之后没有新行时也要按时写出，避免游戏卡住或崩溃时丢失缓冲区
+                self._timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _flush_block(self):
+        self._cancel_timer()
+        if not self.buffer:
+            return
+        data = gzip.compress(("\n".join(self.buffer) + "\n").encode('utf-8'), compresslevel=6)
+        self.data_file.write(data)
+        self.index_file.write(INDEX_RECORD.pack(self.offset, len(data), self.line_count, len(self.buffer)))
+        self.data_file.flush()
+        self.index_file.flush()
+        self.offset += len(data)
+        self.line_count += len(self.buffer)
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+        # 单个文件超过大小上限时轮转到新分片
+        if self.offset >= self.max_file_bytes:
+            self.data_file.close()
+            self.index_file.close()
+            self.part += 1
+            self._open_part()
+            if self.on_rotate:
+                self.on_rotate(self.current_path)
+
+    def flush(self):
+        """立即写出缓冲区中的日志"""
+        with self.lock:
+            if not self.closed:
+                self._flush_block()
+
+    def close(self):
+        """关闭写入器"""
+        with self.lock:
+            if self.closed:
+                return
+            self._flush_block()
+            self.data_file.close()
+            self.index_file.close()
+            self.closed = True
+
+
+class GameLogReader:
+    """日志读取器，借助索引按需解压，无需整体载入内存"""
+
+    def __init__(self, log_path):
+        self.log_path = Path(log_path)
+        self.blocks = []
+        with open(self.log_path.with_suffix('.idx'), 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % INDEX_RECORD.size
+        for fields in INDEX_RECORD.iter_unpack(data[:usable]):
+            self.blocks.append(fields)
+
+    @property
+    def line_count(self):
+        if not self.blocks:
+            return 0
+        _, _, first_line, count = self.blocks[-1]
+        return first_line + count
+
+    def _read_block(self, f, block):
+        offset, length, _, _ = block
+        f.seek(offset)
+        return gzip.decompress(f.read(length)).decode('utf-8', errors='replace').splitlines()
+
+    def read_lines(self, start, count):
+        """读取从start行开始的count行（分页）"""
+        lines = []
+        end = start + count
+        with open(self.log_path, 'rb') as f:
+            for block in self.blocks:
+                _, _, first_line, block_lines = block
+                if first_line + block_lines <= start:
+                    continue
+                if first_line >= end:
+                    break
+                block_data = self._read_block(f, block)
+                lines.extend(block_data[max(start - first_line, 0):end - first_line])
+        return lines
+
+    def tail(self, count=100):
+        """读取最后count行"""
+        return self.read_lines(max(self.line_count - count, 0), count)
+
+    def search(self, pattern, ignore_case=True):
+        """逐块搜索日志，返回(行号, 内容)生成器"""
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        with open(self.log_path, 'rb') as f:
+            for block in self.blocks:
+                first_line = block[2]
+                for i, line in enumerate(self._read_block(f, block)):
+                    if regex.search(line):
+                        yield first_line + i, line
+
+
+class GameLogStore:
+    """按实例组织的日志存储，负责会话创建和空间预算"""
+
+    def __init__(self, log_root, max_total_bytes=256 * 1024 * 1024):
+        self.log_root = Path(log_root)
+        self.max_total_bytes = max_total_bytes
+
+    def instance_dir(self, instance_name):
+        return self.log_root / instance_name
+
+    def open_session(self, instance_name):
+        """为一次启动创建新的日志文件"""
+        log_dir = self.instance_dir(instance_name)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        self.enforce_budget()
+        name = time.strftime("%Y%m%d-%H%M%S")
+        log_path = log_dir / f"{name}.log.gz"
+        suffix = 1
+        while log_path.exists():
+            log_path = log_dir / f"{name}-{suffix}.log.gz"
+            suffix += 1
+        return GameLogWriter(log_path, on_rotate=lambda current: self.enforce_budget(keep=[current]))
+
+    def list_sessions(self, instance_name=None):
+        """列出日志文件（按时间从旧到新）"""
+        root = self.instance_dir(instance_name) if instance_name else self.log_root
+        if not root.exists():
+            return []
+        return sorted(root.rglob("*.log.gz"), key=lambda p: p.stat().st_mtime)
+
+    def open_reader(self, log_path):
+        return GameLogReader(log_path)
+
+    def enforce_budget(self, keep=()):
+        """删除最旧的日志，直到总大小不超过预算；keep 中正在写入的文件不删除"""
+        keep = {Path(path) for path in keep}
+        sessions = self.list_sessions()
+        sizes = {}
+        for path in sessions:
+            index_path = path.with_suffix('.idx')
+            size = path.stat().st_size
+            if index_path.exists():
+                size += index_path.stat().st_size
+            sizes[path] = size
+        total = sum(sizes.values())
+        removed = 0
+        for path in sessions:
+            if total <= self.max_total_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                path.unlink()
+                path.with_suffix('.idx').unlink(missing_ok=True)
+                total -= sizes[path]
+                removed += 1
+            except OSError as e:
+                print(f"删除旧日志失败: {e}")
+        return removed
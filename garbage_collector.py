@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+垃圾回收 - 标记所有已安装版本引用的资源和依赖库，清除不再被引用的文件
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from asset_index_cache import AssetIndexCache
+from local_version_catalog import LocalVersionCatalog
+
+
+def library_paths(library):
+    """库条目可能引用的所有路径（不区分平台，保守标记）"""
+    paths = []
+    downloads = library.get('downloads', {})
+    artifact = downloads.get('artifact')
+    if artifact and artifact.get('path'):
+        paths.append(artifact['path'])
+    for classifier in downloads.get('classifiers', {}).values():
+        if classifier and classifier.get('path'):
+            paths.append(classifier['path'])
+
+    # 没有下载信息时按Maven坐标推导路径（与LibraryManager一致）
+    name = library.get('name', '')
+    parts = name.split(':')
+    if len(parts) >= 3:
+        group = parts[0].replace('.', '/')
+        artifact_id, version = parts[1], parts[2]
+        classifier = parts[3] if len(parts) > 3 else ''
+        extension = parts[4] if len(parts) > 4 else 'jar'
+        file_name = f"{artifact_id}-{version}" + (f"-{classifier}" if classifier else '') + f".{extension}"
+        paths.append(f"{group}/{artifact_id}/{version}/{file_name}")
+        # natives库
+        for native_classifier in library.get('natives', {}).values():
+            native_classifier = native_classifier.replace('${arch}', '64')
+            paths.append(f"{group}/{artifact_id}/{version}/{artifact_id}-{version}-{native_classifier}.jar")
+    return paths
+
+
+class GCReport:
+    """一次回收的结果（试运行时即待删除清单）"""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.files = []
+        self.retained = 0
+        self.errors = []
+
+    def add(self, path, size, kind):
+        self.files.append((str(path), size, kind))
+
+    @property
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.files)
+
+    def summary_by_kind(self):
+        summary = {}
+        for _, size, kind in self.files:
+            count, total = summary.get(kind, (0, 0))
+            summary[kind] = (count + 1, total + size)
+        return summary
+
+    def format_summary(self):
+        """生成可读的摘要"""
+        action = "可清理" if self.dry_run else "已清理"
+        lines = [f"{action} {len(self.files)} 个文件，共 {self.total_bytes / 1024 / 1024:.1f} MB"]
+        for kind, (count, total) in sorted(self.summary_by_kind().items()):
+            lines.append(f"  {kind}: {count} 个文件, {total / 1024 / 1024:.1f} MB")
+        if self.retained:
+            lines.append(f"  因保留策略跳过 {self.retained} 个文件")
+        if self.errors:
+            lines.append(f"  删除失败 {len(self.errors)} 个文件")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'total_bytes': self.total_bytes,
+            'retained': self.retained,
+            'errors': self.errors,
+            'summary': {kind: {'count': c, 'bytes': b} for kind, (c, b) in self.summary_by_kind().items()},
+            'files': [{'path': p, 'size': s, 'kind': k} for p, s, k in self.files],
+        }
+
+
+class GarbageCollector:
+    """标记-清除式回收 assets/objects、assets/indexes 和 libraries"""
+
+    def __init__(self, minecraft_path):
+        self.minecraft_path = Path(minecraft_path)
+        self.assets_path = self.minecraft_path / "assets"
+        self.libraries_path = self.minecraft_path / "libraries"
+        self.versions_path = self.minecraft_path / "versions"
+        self.index_cache = AssetIndexCache(self.assets_path)
+
+    def mark(self):
+        """标记所有已安装版本引用的对象、索引和库，返回(对象哈希集合, 索引ID集合, 索引SHA1集合, 库路径集合)"""
+        objects = set()
+        index_ids = set()
+        index_sha1s = set()
+        libraries = set()
+
+        versions = LocalVersionCatalog(self.versions_path).refresh()
+        if not versions:
+            # 版本目录为空多半是路径错误，此时清除会删掉全部资源
+            raise Exception("未找到任何已安装版本，已中止回收")
+
+        # 版本JSON无法解析时目录不会出现在列表中，同样不能确定它引用的文件
+        listed = {Path(version['path']).name for version in versions}
+        for entry in os.scandir(self.versions_path):
+            if entry.is_dir() and entry.name not in listed and \
+                    os.path.exists(os.path.join(entry.path, f"{entry.name}.json")):
+                raise Exception(f"读取版本 {entry.name} 失败，已中止回收以免误删")
+
+        for version in versions:
+            json_path = Path(version['path']) / f"{Path(version['path']).name}.json"
+            try:
+                with open(json_path, 'rb') as f:
+                    version_data = json.loads(f.read())
+            except Exception as e:
+                raise Exception(f"读取版本 {version['id']} 失败，已中止回收以免误删: {e}")
+
+            for library in version_data.get('libraries', []):
+                libraries.update(library_paths(library))
+
+            asset_index = version_data.get('assetIndex', {})
+            index_id = asset_index.get('id') or version_data.get('assets')
+            if not index_id:
+                continue
+            index_ids.add(index_id)
+            index_path = self.assets_path / "indexes" / f"{index_id}.json"
+            # 索引缺失或损坏时无法知道该版本使用哪些资源，清除会删掉它独有的全部资源
+            if not index_path.exists():
+                raise Exception(f"版本 {version['id']} 的资源索引 {index_id} 不存在，已中止回收以免误删；"
+                                f"请先补全该版本的资源")
+            try:
+                # 使用二进制索引缓存，无需重新解析资源索引JSON；
+                # load 先按版本清单中的SHA1校验索引文件，不一致（损坏或过期）时抛出异常，据此中止回收
+                with self.index_cache.load(index_path, asset_index.get('sha1')) as view:
+                    index_sha1s.add(view.source_sha1)
+                    for digest, _ in view.iter_objects():
+                        objects.add(digest.hex())
+            except Exception as e:
+                raise Exception(f"读取版本 {version['id']} 的资源索引失败，已中止回收以免误删: {e}")
+
+        return objects, index_ids, index_sha1s, libraries
+
+    def collect(self, dry_run=True, min_age_days=0, keep_library_versions=0):
+        """执行回收
+
+        min_age_days: 最近N天内修改过的文件不删除
+        keep_library_versions: 每个库额外保留最新的N个未被引用的版本
+        """
+        report = GCReport(dry_run)
+        objects, index_ids, index_sha1s, libraries = self.mark()
+        cutoff = time.time() - min_age_days * 86400
+
+        candidates = []
+
+        # 资源对象
+        objects_path = self.assets_path / "objects"
+        if objects_path.exists():
+            for entry in self._walk_files(objects_path):
+                if entry.name not in objects:
+                    candidates.append((entry, 'asset'))
+
+        # 资源索引及其二进制缓存
+        indexes_path = self.assets_path / "indexes"
+        if indexes_path.exists():
+            for entry in os.scandir(indexes_path):
+                if entry.is_file() and entry.name.endswith('.json') and entry.name[:-5] not in index_ids:
+                    candidates.append((entry, 'index'))
+        if self.index_cache.cache_dir.exists():
+            for entry in os.scandir(self.index_cache.cache_dir):
+                if entry.is_file() and entry.name[:-4] not in index_sha1s:
+                    candidates.append((entry, 'index_cache'))
+
+        # 依赖库
+        if self.libraries_path.exists():
+            unreferenced = []
+            for entry in self._walk_files(self.libraries_path):
+                relative = Path(entry.path).relative_to(self.libraries_path).as_posix()
+                if relative not in libraries:
+                    unreferenced.append((entry, relative))
+            protected = self._protected_library_versions(unreferenced, keep_library_versions)
+            for entry, relative in unreferenced:
+                if relative.rsplit('/', 1)[0] not in protected:
+                    candidates.append((entry, 'library'))
+                else:
+                    report.retained += 1
+
+        for entry, kind in candidates:
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff:
+                report.retained += 1
+                continue
+            report.add(entry.path, stat.st_size, kind)
+
+        if not dry_run:
+            for path, _, _ in report.files:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    report.errors.append(f"{path}: {e}")
+            self._remove_empty_dirs(objects_path)
+            self._remove_empty_dirs(self.libraries_path)
+
+        return report
+
+    def _walk_files(self, root):
+        stack = [str(root)]
+        while stack:
+            for entry in os.scandir(stack.pop()):
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    yield entry
+
+    def _protected_library_versions(self, unreferenced, keep):
+        """按 group/artifact 分组，保留每组最新的keep个版本目录"""
+        if keep <= 0:
+            return set()
+        groups = {}
+        for entry, relative in unreferenced:
+            version_dir = relative.rsplit('/', 1)[0]
+            artifact_dir = version_dir.rsplit('/', 1)[0]
+            mtime = entry.stat(follow_symlinks=False).st_mtime
+            versions = groups.setdefault(artifact_dir, {})
+            versions[version_dir] = max(versions.get(version_dir, 0), mtime)
+        protected = set()
+        for versions in groups.values():
+            newest = sorted(versions, key=versions.get, reverse=True)[:keep]
+            protected.update(newest)
+        return protected
+
+    def _remove_empty_dirs(self, root):
+        if not Path(root).exists():
+            return
+        for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+            if dirpath != str(root) and not os.listdir(dirpath):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
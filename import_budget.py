@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导入耗时检查 - 解析 python -X importtime 的输出，防止新的顶层导入拖慢启动
+
+用法: python import_budget.py [--module main] [--budget-ms 250]
+超出预算或导入了禁止在启动时加载的模块时返回非零退出码
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# 启动阶段不应被导入的重量级模块（应通过LauncherServices或lazy_import按需加载）
+FORBIDDEN_AT_STARTUP = ['requests', 'urllib3', 'psutil', 'asset_downloader',
+                        'library_manager', 'enhanced_version_manager', 'version_list_manager']
+
+
+def measure_imports(module, runs=3):
+    """多次运行取最小值，返回[(模块名, 自身耗时us, 累计耗时us)]"""
+    best = None
+    program_dir = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            capture_output=True, text=True, cwd=program_dir
+        )
+        if result.returncode != 0:
+            raise Exception(f"导入 {module} 失败:\n{result.stderr}")
+        entries = parse_importtime(result.stderr)
+        total = next((cumulative for name, _, cumulative in entries if name == module), 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    return best[1]
+
+
+def parse_importtime(output):
+    """解析 -X importtime 输出"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            entries.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return entries
+
+
+def check_budget(module, budget_ms, runs=3):
+    """检查导入预算，返回(是否通过, 报告行列表)"""
+    entries = measure_imports(module, runs)
+    report = []
+    passed = True
+
+    total_us = next((cumulative for name, _, cumulative in entries if name == module), 0)
+    report.append(f"导入 {module} 累计耗时: {total_us / 1000:.1f} ms (预算 {budget_ms} ms)")
+    if total_us / 1000 > budget_ms:
+        passed = False
+        report.append("✗ 超出导入耗时预算")
+
+    imported = {name for name, _, _ in entries}
+    forbidden = [name for name in FORBIDDEN_AT_STARTUP if name in imported]
+    if forbidden:
+        passed = False
+        report.append(f"✗ 启动时导入了应延迟加载的模块: {', '.join(forbidden)}")
+
+    report.append("自身耗时最多的模块:")
+    for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[1], reverse=True)[:10]:
+        report.append(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms  {name}")
+    return passed, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查启动器入口的导入耗时")
+    parser.add_argument('--module', default='main', help="要检查的模块")
+    parser.add_argument('--budget-ms', type=float, default=250, help="累计导入耗时预算（毫秒）")
+    parser.add_argument('--runs', type=int, default=3, help="运行次数（取最快一次）")
+    args = parser.parse_args()
+
+    passed, report = check_budget(args.module, args.budget_ms, args.runs)
+    print("\n".join(report))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+安装任务 - 可取消、暂停和恢复的版本安装，状态持久化以便下次从已完成的文件继续
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from file_utils import atomic_write_bytes
+
+DEFAULT_STATE_DIR = Path.home() / ".amcl_cache" / "jobs"
+# 标记完成的文件后最多隔多久写一次状态文件（秒）
+SAVE_INTERVAL = 2.0
+
+
+class InstallCancelled(Exception):
+    """安装任务被取消"""
+
+
+class InstallJob:
+    """一个版本的安装任务
+
+    工作线程在每个文件开始前和每个下载块之后调用 checkpoint()：
+    暂停时在此等待，取消时抛出 InstallCancelled。取消还会撤销线程池中尚未开始的下载。
+    已完成的文件（相对游戏目录的路径）写入状态文件用于显示进度；规划时每个文件仍检查是否存在，
+    暂停期间被删除的文件会重新下载。未下载完的 .part 文件由规划器按 Range 请求续传。
+    """
+
+    def __init__(self, version_id, minecraft_path, state_dir=None):
+        self.version_id = version_id
+        self.minecraft_path = Path(minecraft_path)
+        self.state_path = self.path_for(version_id, minecraft_path, state_dir)
+        self.status = 'pending'
+        self.completed = set()
+        self.failed = 0
+        self.paused_seconds = 0.0
+        self.lock = threading.Lock()
+
+        self._cancel_event = threading.Event()
+        self._running_event = threading.Event()
+        self._running_event.set()
+        self._paused_at = None
+        self._downloads = set()
+        self._last_save = 0.0
+
+    @staticmethod
+    def path_for(version_id, minecraft_path, state_dir=None):
+        key = hashlib.sha1(f"{Path(minecraft_path).resolve()}|{version_id}".encode('utf-8')).hexdigest()[:16]
+        return Path(state_dir or DEFAULT_STATE_DIR) / f"{key}.json"
+
+    @classmethod
+    def load(cls, version_id, minecraft_path, state_dir=None):
+        """读取上次未完成的任务；没有或无法读取时返回新任务"""
+        job = cls(version_id, minecraft_path, state_dir)
+        try:
+            with open(job.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == version_id and data.get('status') != 'completed':
+                job.completed = set(data.get('completed', []))
+                job.failed = data.get('failed', 0)
+                job.status = data.get('status', 'pending')
+        except (OSError, ValueError):
+            pass
+        return job
+
+    @classmethod
+    def unfinished(cls, minecraft_path, state_dir=None):
+        """游戏目录下所有未完成任务的 [(版本, 状态, 已完成文件数)]"""
+        state_dir = Path(state_dir or DEFAULT_STATE_DIR)
+        if not state_dir.exists():
+            return []
+        minecraft_path = str(Path(minecraft_path).resolve())
+        jobs = []
+        for entry in os.scandir(state_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if data.get('minecraft_path') == minecraft_path and data.get('status') != 'completed':
+                jobs.append((data.get('version'), data.get('status'), len(data.get('completed', []))))
+        return jobs
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def paused(self):
+        return not self._running_event.is_set()
+
+    def cancel(self):
+        """取消任务：撤销尚未开始的下载，正在下载的文件在下一个数据块处停止
+
+        与其他计划共用的下载只有在所有使用者都取消后才会停止
+        """
+        self._cancel_event.set()
+        self.resume()
+        with self.lock:
+            downloads = list(self._downloads)
+        for download in downloads:
+            download.cancel()
+
+    def pause(self):
+        with self.lock:
+            if self._running_event.is_set() and self.status == 'running':
+                self._running_event.clear()
+                self._paused_at = time.monotonic()
+                self.status = 'paused'
+        self.save()
+
+    def resume(self):
+        with self.lock:
+            if self._paused_at is not None:
+                self.paused_seconds += time.monotonic() - self._paused_at
+                self._paused_at = None
+            if self.status == 'paused':
+                self.status = 'running'
+            self._running_event.set()
+
+    def wait_resumed(self, timeout=None):
+        """暂停时等待恢复（或取消），返回是否处于运行状态"""
+        return self._running_event.wait(timeout)
+
+    def checkpoint(self):
+        """暂停时阻塞直到恢复；已取消时抛出 InstallCancelled"""
+        if not self._running_event.is_set():
+            self._running_event.wait()
+        if self._cancel_event.is_set():
+            raise InstallCancelled(f"版本 {self.version_id} 的安装已取消")
+
+    def track(self, download):
+        """登记本任务使用的下载（提供 future 和 cancel()），取消任务时通知它"""
+        with self.lock:
+            self._downloads.add(download)
+        download.future.add_done_callback(lambda _: self._untrack(download))
+        if self.cancelled:
+            download.cancel()
+
+    def _untrack(self, download):
+        with self.lock:
+            self._downloads.discard(download)
+
+    def relative(self, path):
+        try:
+            return Path(path).relative_to(self.minecraft_path).as_posix()
+        except ValueError:
+            return str(path)
+
+    def forget(self, path):
+        """文件已不存在或损坏，从已完成集合中移除"""
+        with self.lock:
+            self.completed.discard(self.relative(path))
+
+    def mark_completed(self, path):
+        with self.lock:
+            self.completed.add(self.relative(path))
+            due = time.monotonic() - self._last_save > SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'version': self.version_id,
+                'minecraft_path': str(self.minecraft_path.resolve()),
+                'status': self.status,
+                'failed': self.failed,
+                'updated': time.time(),
+                'completed': sorted(self.completed),
+            }
+
+    def save(self):
+        data = self.to_dict()
+        with self.lock:
+            self._last_save = time.monotonic()
+        try:
+            atomic_write_bytes(self.state_path, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        except OSError as e:
+            print(f"保存安装任务状态失败: {e}")
+
+    def discard(self):
+        """任务完成后删除状态文件"""
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    def start(self):
+        self.status = 'running'
+        self.save()
+
+    def finish(self, failures=None, cancelled=False, error=False):
+        """记录任务结果：全部完成时删除状态文件，否则保存以便继续"""
+        if cancelled:
+            self.status = 'cancelled'
+        elif error or failures:
+            self.status = 'failed'
+            self.failed = len(failures or [])
+        else:
+            self.status = 'completed'
+            self.discard()
+            return
+        self.save()
+
+    def run(self, planner, progress_callback=None, verify=False, executor=None):
+        """规划并执行安装，返回失败列表；被取消时保存状态并抛出 InstallCancelled"""
+        self.start()
+        try:
+            plan = planner.plan(self.version_id, verify=verify, progress_callback=progress_callback, job=self)
+            failures = planner.execute(plan, progress_callback, executor=executor, job=self)
+        except InstallCancelled:
+            self.finish(cancelled=True)
+            raise
+        except Exception:
+            self.finish(error=True)
+            raise
+        self.finish(failures)
+        return failures
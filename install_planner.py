@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+安装规划器 - 下载前先算出需要获取的文件、字节数和预计耗时，再按字节加权执行
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import requests
+
+from file_utils import atomic_write_bytes, file_sha1
+from install_job import InstallCancelled
+from mirrors import resolve_url
+from tracing import span, traced
+
+RESOURCES_URL = "https://resources.download.minecraft.net"
+
+# 没有历史测量值时假定的下载速度（字节/秒）
+DEFAULT_THROUGHPUT = 2 * 1024 * 1024
+# 新测量值在滑动平均中的权重
+THROUGHPUT_ALPHA = 0.3
+# 下载量太小时测得的速度主要是连接开销，不计入
+MIN_SAMPLE_BYTES = 256 * 1024
+
+
+class ThroughputHistory:
+    """持久化的下载速度指数滑动平均"""
+
+    def __init__(self, path=None):
+        if path is None:
+            path = Path.home() / ".amcl_cache" / "throughput.json"
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.bytes_per_second = None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.bytes_per_second = json.load(f).get('bytes_per_second')
+        except (OSError, ValueError):
+            pass
+
+    def estimate(self):
+        return self.bytes_per_second or DEFAULT_THROUGHPUT
+
+    def record(self, byte_count, seconds):
+        """记录一次下载的字节数和耗时"""
+        if byte_count < MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+        sample = byte_count / seconds
+        with self.lock:
+            if self.bytes_per_second:
+                self.bytes_per_second = THROUGHPUT_ALPHA * sample + (1 - THROUGHPUT_ALPHA) * self.bytes_per_second
+            else:
+                self.bytes_per_second = sample
+            data = json.dumps({'bytes_per_second': self.bytes_per_second, 'updated': time.time()})
+        try:
+            atomic_write_bytes(self.path, data.encode('utf-8'))
+        except OSError as e:
+            print(f"保存下载速度记录失败: {e}")
+
+
+class PlannedFile:
+    """安装计划中的一个文件"""
+
+    def __init__(self, url, path, sha1, size, kind):
+        self.url = url
+        self.path = Path(path)
+        self.sha1 = sha1
+        self.size = size or 0
+        self.kind = kind  # client / library / asset
+
+    def to_dict(self):
+        return {'url': self.url, 'path': str(self.path), 'sha1': self.sha1,
+                'size': self.size, 'kind': self.kind}
+
+
+class InstallPlan:
+    """一个版本的安装计划"""
+
+    def __init__(self, version_id, version_data):
+        self.version_id = version_id
+        self.version_data = version_data
+        self.files = []      # 需要下载的文件
+        self.linked = []     # 共享存储中已有、只需链接的文件
+        self.present = 0     # 本地已有的文件数
+        self.corrupt = 0     # 本地存在但大小或SHA1不符的文件数
+        self.total_bytes = 0
+        self.shared_bytes = 0
+        self.estimated_seconds = 0.0
+
+    @property
+    def fetch_bytes(self):
+        return sum(f.size for f in self.files)
+
+    def bytes_by_kind(self):
+        summary = {}
+        for f in self.files:
+            count, total = summary.get(f.kind, (0, 0))
+            summary[f.kind] = (count + 1, total + f.size)
+        return summary
+
+    def format_summary(self):
+        """生成可读的摘要"""
+        mb = 1024 * 1024
+        lines = [f"版本 {self.version_id}: 共 {self.total_bytes / mb:.1f} MB，"
+                 f"已有 {self.shared_bytes / mb:.1f} MB，需下载 {len(self.files)} 个文件 "
+                 f"{self.fetch_bytes / mb:.1f} MB，预计 {self.estimated_seconds:.0f} 秒"]
+        for kind, (count, total) in sorted(self.bytes_by_kind().items()):
+            lines.append(f"  {kind}: {count} 个文件, {total / mb:.1f} MB")
+        if self.linked:
+            lines.append(f"  从共享存储链接 {len(self.linked)} 个文件")
+        if self.corrupt:
+            lines.append(f"  其中 {self.corrupt} 个本地文件已损坏，将重新下载")
+        return "\n".join(lines)
+
+    def verify_result(self):
+        """作为校验结果时的摘要：没有待下载或待链接的文件即为完整"""
+        pending = self.files + self.linked
+        return {'ok': not pending, 'present': self.present, 'corrupt': self.corrupt,
+                'missing': len(pending) - self.corrupt,
+                'pending_bytes': sum(f.size for f in pending)}
+
+    def to_dict(self):
+        return {
+            'version_id': self.version_id,
+            'total_bytes': self.total_bytes,
+            'shared_bytes': self.shared_bytes,
+            'fetch_bytes': self.fetch_bytes,
+            'estimated_seconds': self.estimated_seconds,
+            'present': self.present,
+            'corrupt': self.corrupt,
+            'linked': [f.to_dict() for f in self.linked],
+            'files': [f.to_dict() for f in self.files],
+        }
+
+
+class _SharedDownload:
+    """一个文件的一次下载，可能被多个并发的计划共用
+
+    按使用者计数：某个任务取消时，只有在没有其他使用者仍需要时才撤销下载；
+    所有使用者都暂停时下载线程才等待。没有关联任务的使用者（job=None）不可取消。
+    下载进度分发给每个使用者的 on_bytes，中途加入的使用者先补上已传输的字节。
+    """
+
+    def __init__(self, lock):
+        self.lock = lock  # 与规划器的 _inflight_lock 相同，避免撤销与新使用者加入交错
+        self.jobs = []
+        self.anonymous = 0
+        self.consumers = []
+        self.received = 0
+        self.resumed = 0
+        self.future = None
+
+    def add(self, job, on_bytes):
+        """加入一个使用者，返回加入前已传输的(字节数, 其中续传的字节数)"""
+        with self.lock:
+            if job is None:
+                self.anonymous += 1
+            else:
+                self.jobs.append(job)
+            self.consumers.append(on_bytes)
+            return self.received, self.resumed
+
+    def on_bytes(self, count, name, resumed=False):
+        """下载线程调用：累计字节数并转发给所有使用者"""
+        with self.lock:
+            self.received += count
+            if resumed:
+                self.resumed += count
+            consumers = list(self.consumers)
+        for consumer in consumers:
+            consumer(count, name, resumed=resumed)
+
+    def _active(self):
+        with self.lock:
+            return self.anonymous, [job for job in self.jobs if not job.cancelled]
+
+    def cancel(self):
+        """某个使用者取消时调用"""
+        with self.lock:
+            anonymous, active = self._active()
+            if not anonymous and not active:
+                self.future.cancel()
+
+    def checkpoint(self):
+        """下载线程调用：所有使用者都暂停时等待，都取消时抛出 InstallCancelled"""
+        while True:
+            anonymous, active = self._active()
+            if anonymous or any(not job.paused for job in active):
+                return
+            if not active:
+                raise InstallCancelled("下载已被所有使用者取消")
+            active[0].wait_resumed(0.2)
+
+
+class InstallPlanner:
+    """解析版本JSON、资源索引和依赖库，与本地文件比较后生成并执行安装计划"""
+
+    def __init__(self, version_manager, asset_downloader, library_manager,
+                 content_store=None, max_workers=8, throughput=None, peer_fetcher=None):
+        self.version_manager = version_manager
+        self.asset_downloader = asset_downloader
+        self.library_manager = library_manager
+        self.content_store = content_store
+        self.peer_fetcher = peer_fetcher  # 可选的局域网同伴缓存
+        self.max_workers = max_workers
+        self.throughput = throughput or ThroughputHistory()
+        self.session = requests.Session()
+        # 多个计划并发执行时，同一文件只下载一次
+        self._inflight = {}
+        self._inflight_lock = threading.RLock()
+
+    @traced('install_plan')
+    def plan(self, version_id, verify=False, progress_callback=None, job=None, read_only=False):
+        """生成安装计划；只下载版本JSON和资源索引这两个元数据文件
+
+        verify: 为True时对本地已有文件做SHA1校验，否则只比较大小
+        job: 继续的安装任务；记录为已完成的文件同样检查是否存在（暂停期间可能被删除或回收），
+             检查通过的文件记录到任务中
+        read_only: 只读取本地文件，不下载元数据、不改动共享存储，用于校验；
+                   本地资源索引缺失或损坏时计入结果，且无法列出其中的资源
+        """
+        if progress_callback:
+            progress_callback(f"解析版本 {version_id}", 0)
+        if read_only:
+            version_data = self._read_local_version_json(version_id)
+        else:
+            version_data = self.version_manager.fetch_version_json(version_id)
+        plan = InstallPlan(version_id, version_data)
+        seen = set()
+
+        def consider(planned):
+            if planned.path in seen:
+                return
+            seen.add(planned.path)
+            plan.total_bytes += planned.size
+            if job:
+                job.checkpoint()
+            status = self._local_status(planned, verify)
+            if status == 'present':
+                plan.present += 1
+                plan.shared_bytes += planned.size
+                if job:
+                    job.mark_completed(planned.path)
+                return
+            if job:
+                job.forget(planned.path)
+            if status == 'corrupt':
+                plan.corrupt += 1
+                # 硬链接时共享存储中的副本也已损坏
+                if self.content_store and planned.sha1 and not read_only:
+                    self.content_store.discard(planned.sha1)
+            if self.content_store and not read_only and self.content_store.contains(planned.sha1):
+                plan.linked.append(planned)
+                plan.shared_bytes += planned.size
+            else:
+                plan.files.append(planned)
+
+        client = version_data.get('downloads', {}).get('client')
+        if client:
+            client_jar = self.version_manager.versions_path / version_id / f"{version_id}.jar"
+            consider(PlannedFile(client['url'], client_jar, client.get('sha1'), client.get('size'), 'client'))
+
+        libraries_path = self.library_manager.libraries_path
+        for info in self.library_manager.resolve_libraries(version_data):
+            consider(PlannedFile(info['url'], libraries_path / info['path'],
+                                 info.get('sha1'), info.get('size'), 'library'))
+
+        if version_data.get('assetIndex'):
+            if progress_callback:
+                progress_callback("解析资源索引", 0)
+            objects_path = self.asset_downloader.assets_path / "objects"
+            if read_only:
+                view = self._local_index_view(version_data, plan, consider)
+            else:
+                view = self.asset_downloader.load_index_view(version_data)
+            if view is not None:
+                with view:
+                    for hash_value, size in view.iter_unique_objects():
+                        consider(PlannedFile(f"{RESOURCES_URL}/{hash_value[:2]}/{hash_value}",
+                                             objects_path / hash_value[:2] / hash_value,
+                                             hash_value, size, 'asset'))
+
+        plan.estimated_seconds = plan.fetch_bytes / self.throughput.estimate()
+        return plan
+
+    def _read_local_version_json(self, version_id):
+        json_file = self.version_manager.versions_path / version_id / f"{version_id}.json"
+        try:
+            with open(json_file, 'rb') as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            raise Exception(f"版本 {version_id} 未安装")
+
+    def _local_index_view(self, version_data, plan, consider):
+        """只读模式下的资源索引：索引文件本身作为一项参与校验，完整时才返回视图
+
+        索引总是按SHA1校验（文件很小），否则无法确定列出的资源是否正确
+        """
+        asset_index = version_data['assetIndex']
+        index_path = self.asset_downloader.assets_path / "indexes" / f"{asset_index.get('id', '')}.json"
+        index_sha1 = asset_index.get('sha1')
+        planned = PlannedFile(asset_index.get('url', ''), index_path, index_sha1,
+                              asset_index.get('size') or 0, 'index')
+        if index_path.exists() and index_sha1 and file_sha1(index_path) != index_sha1:
+            plan.total_bytes += planned.size
+            plan.corrupt += 1
+            plan.files.append(planned)
+            return None
+        consider(planned)
+        if not index_path.exists():
+            return None
+        return self.asset_downloader.index_cache.load(index_path, index_sha1)
+
+    def _local_status(self, planned, verify):
+        """本地文件状态: present / missing / corrupt"""
+        try:
+            stat = os.stat(planned.path)
+        except OSError:
+            return 'missing'
+        if planned.size and stat.st_size != planned.size:
+            return 'corrupt'
+        if verify and planned.sha1:
+            hasher = hashlib.sha1()
+            with span('hash', path=str(planned.path), size=planned.size):
+                with open(planned.path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(65536), b""):
+                        hasher.update(chunk)
+            if hasher.hexdigest() != planned.sha1:
+                return 'corrupt'
+        return 'present'
+
+    @traced('install_execute')
+    def execute(self, plan, progress_callback=None, max_workers=None, executor=None, job=None):
+        """执行安装计划，进度按字节加权；返回失败列表[(文件, 错误)]
+
+        executor: 多个计划共用的下载线程池（全局并发上限），不提供时临时创建
+        job: 所属的安装任务，可暂停和取消，完成的文件记录到任务状态中；取消时抛出 InstallCancelled
+        """
+        store = self.content_store
+        to_fetch = list(plan.files)
+        for planned in plan.linked:
+            if job:
+                job.checkpoint()
+            if store.materialize(planned.sha1, planned.path):
+                if job:
+                    job.mark_completed(planned.path)
+            else:
+                to_fetch.append(planned)
+
+        total = sum(f.size for f in to_fetch)
+        state = {'done': 0, 'resumed': 0, 'reported': 0.0}
+        lock = threading.Lock()
+
+        def on_bytes(count, name, resumed=False):
+            with lock:
+                state['done'] += count
+                if resumed:
+                    state['resumed'] += count
+                now = time.monotonic()
+                if now - state['reported'] < 0.1:
+                    return
+                state['reported'] = now
+                done = state['done']
+            if progress_callback and total:
+                progress_callback(f"下载 {name} ({done / 1024 / 1024:.1f}/{total / 1024 / 1024:.1f} MB)",
+                                  min(done / total * 100, 99.9))
+
+        failures = []
+        started = time.monotonic()
+        if to_fetch:
+            own_executor = None
+            if executor is None:
+                executor = own_executor = ThreadPoolExecutor(max_workers=max_workers or self.max_workers)
+            try:
+                futures = {self._submit(executor, planned, on_bytes, job): planned for planned in to_fetch}
+                pending = set(futures)
+                while pending:
+                    if job and job.cancelled:
+                        # 仍在进行的下载被其他计划共用，不再等待它们
+                        failures.extend((futures[future], InstallCancelled("已取消")) for future in pending)
+                        break
+                    done, pending = wait(pending, timeout=0.2 if job else None, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            future.result()
+                        except (InstallCancelled, CancelledError) as e:
+                            failures.append((futures[future], e))
+                        except Exception as e:
+                            failures.append((futures[future], e))
+                            print(f"下载失败 {futures[future].url}: {e}")
+                        else:
+                            if job:
+                                job.mark_completed(futures[future].path)
+            finally:
+                if own_executor:
+                    own_executor.shutdown()
+            # 续传的部分和暂停的时间不计入速度测量
+            elapsed = time.monotonic() - started - (job.paused_seconds if job else 0)
+            self.throughput.record(state['done'] - state['resumed'], elapsed)
+
+        if job and job.cancelled and failures:
+            if progress_callback:
+                progress_callback(f"版本 {plan.version_id} 的安装已取消", -1)
+            raise InstallCancelled(f"版本 {plan.version_id} 的安装已取消")
+
+        if progress_callback:
+            if failures:
+                progress_callback(f"安装未完成: {len(failures)} 个文件下载失败", -1)
+            else:
+                progress_callback(f"版本 {plan.version_id} 安装完成", 100)
+        return failures
+
+    def _submit(self, executor, planned, on_bytes, job=None):
+        """提交下载任务；同一文件正在被其他计划下载时复用该任务（见 _SharedDownload）"""
+        with self._inflight_lock:
+            shared = self._inflight.get(planned.path)
+            if shared is None:
+                shared = _SharedDownload(self._inflight_lock)
+                received, resumed = shared.add(job, on_bytes)
+                shared.future = executor.submit(self._fetch, planned, shared.on_bytes, shared)
+                self._inflight[planned.path] = shared
+                shared.future.add_done_callback(lambda done, path=planned.path: self._release(path, done))
+            else:
+                received, resumed = shared.add(job, on_bytes)
+            if job:
+                job.track(shared)
+        # 加入进行中的下载时，补上此前已传输的字节，进度才能到达100%
+        if resumed:
+            on_bytes(resumed, planned.path.name, resumed=True)
+        if received - resumed:
+            on_bytes(received - resumed, planned.path.name)
+        return shared.future
+
+    def _release(self, path, future):
+        with self._inflight_lock:
+            shared = self._inflight.get(path)
+            if shared is not None and shared.future is future:
+                del self._inflight[path]
+
+    def _fetch(self, planned, on_bytes, control=None):
+        with span('download', kind=planned.kind, file=planned.path.name, size=planned.size) as download_span:
+            download_span.set('source', self._fetch_file(planned, on_bytes, control))
+
+    def _fetch_file(self, planned, on_bytes, control=None):
+        """流式下载单个文件，边下载边计算SHA1，校验通过后替换目标文件；返回来源
+
+        下载写入同目录的 .part 文件；取消或网络中断时保留，下次用Range请求从断点继续。
+        control 提供 checkpoint()，用于暂停和取消（通常是 _SharedDownload）
+        """
+        if control:
+            control.checkpoint()
+        planned.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.peer_fetcher and planned.sha1:
+            # 先从局域网同伴获取（已按SHA1校验），没有同伴拥有时再访问上游
+            relative_path = planned.path.relative_to(self.version_manager.minecraft_path).as_posix()
+            checkpoint = control.checkpoint if control else None
+            if self.peer_fetcher.fetch(relative_path, planned.sha1, planned.path, on_bytes, checkpoint):
+                if self.content_store:
+                    self.content_store.ingest(planned.path, planned.sha1)
+                return 'peer'
+            if control:
+                control.checkpoint()
+
+        part_path = planned.path.with_name(f"{planned.path.name}.part")
+        hasher = hashlib.sha1()
+        offset = self._resume_offset(part_path, planned.size, hasher)
+        received = 0
+        keep_part = False
+        try:
+            headers = {'Range': f"bytes={offset}-"} if offset else None
+            with self.session.get(resolve_url(planned.url), stream=True, timeout=30, headers=headers) as response:
+                response.raise_for_status()
+                if offset and response.status_code != 206:
+                    # 服务器不支持Range，从头下载
+                    offset = 0
+                    hasher = hashlib.sha1()
+                if offset:
+                    received = offset
+                    on_bytes(offset, planned.path.name, resumed=True)
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=65536):
+                        if chunk:
+                            f.write(chunk)
+                            hasher.update(chunk)
+                            received += len(chunk)
+                            on_bytes(len(chunk), planned.path.name)
+                            if control:
+                                control.checkpoint()
+            if planned.sha1 and hasher.hexdigest() != planned.sha1:
+                self._drop_mirror_entry(planned.url)
+                raise Exception(f"文件哈希值不匹配: 期望 {planned.sha1}, 实际 {hasher.hexdigest()}")
+            os.replace(part_path, planned.path)
+        except InstallCancelled:
+            on_bytes(-received, planned.path.name)
+            keep_part = True
+            raise
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            on_bytes(-received, planned.path.name)
+            keep_part = True
+            raise
+        except BaseException:
+            # 失败的文件不计入进度
+            on_bytes(-received, planned.path.name)
+            raise
+        finally:
+            if not keep_part and os.path.exists(part_path):
+                os.remove(part_path)
+
+        # 已校验的文件加入共享存储
+        if self.content_store and planned.sha1:
+            self.content_store.ingest(planned.path, planned.sha1)
+        return 'upstream'
+
+    def _drop_mirror_entry(self, url):
+        """经镜像（缓存代理）下载的内容损坏时，请镜像丢弃该条目，重试时不会再拿到同一份坏内容"""
+        mirror_url = resolve_url(url)
+        if mirror_url == url:
+            return
+        try:
+            self.session.delete(mirror_url, timeout=5).close()
+        except requests.RequestException as e:
+            print(f"通知镜像丢弃损坏条目失败: {e}")
+
+    @staticmethod
+    def _resume_offset(part_path, size, hasher):
+        """已下载部分的字节数，并把这部分内容计入hasher；无法续传时返回0"""
+        try:
+            offset = os.path.getsize(part_path)
+        except OSError:
+            return 0
+        if not offset or not size or offset >= size:
+            return 0
+        with span('hash', path=str(part_path), size=offset):
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b""):
+                    hasher.update(chunk)
+        return offset
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实例管理器 - 每个实例拥有独立的存档、配置和模组，共享版本文件、依赖库和资源
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+from pathlib import Path
+
+from content_store import place_file
+from file_utils import atomic_write_bytes
+
+INSTANCE_FILE = "instance.json"
+
+# 实例私有的目录（作为 --gameDir 使用）
+PRIVATE_DIRS = ('saves', 'config', 'mods', 'resourcepacks', 'screenshots', 'logs')
+
+# 克隆时可以硬链接的只读内容（模组和资源包一般只会被整体替换，不会原地修改）
+IMMUTABLE_SUFFIXES = ('.jar', '.zip')
+
+INSTANCE_NAME_PATTERN = re.compile(r'^[^\\/:*?"<>|]+$')
+
+
+class InstanceManager:
+    """管理 <游戏目录>/instances 下的命名实例"""
+
+    def __init__(self, minecraft_path):
+        self.minecraft_path = Path(minecraft_path)
+        self.instances_path = self.minecraft_path / "instances"
+
+    def instance_dir(self, name):
+        return self.instances_path / name
+
+    def _validate_name(self, name):
+        if not name or not INSTANCE_NAME_PATTERN.match(name) or name in ('.', '..'):
+            raise Exception(f"无效的实例名称: {name}")
+
+    def _write_info(self, name, info):
+        data = json.dumps(info, ensure_ascii=False, indent=2).encode('utf-8')
+        atomic_write_bytes(self.instance_dir(name) / INSTANCE_FILE, data)
+
+    def get_instance(self, name):
+        """读取实例信息，不存在时返回None"""
+        info_path = self.instance_dir(name) / INSTANCE_FILE
+        if not info_path.exists():
+            return None
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except Exception as e:
+            print(f"读取实例 {name} 信息失败: {e}")
+            return None
+        info['name'] = name
+        info['path'] = str(self.instance_dir(name))
+        return info
+
+    def list_instances(self):
+        """列出所有实例"""
+        if not self.instances_path.exists():
+            return []
+        instances = []
+        for entry in sorted(os.scandir(self.instances_path), key=lambda e: e.name):
+            if entry.is_dir():
+                info = self.get_instance(entry.name)
+                if info:
+                    instances.append(info)
+        return instances
+
+    def create_instance(self, name, version_id='', settings=None):
+        """创建新实例，只创建私有目录，版本和资源直接共享"""
+        self._validate_name(name)
+        instance_dir = self.instance_dir(name)
+        if instance_dir.exists():
+            raise Exception(f"实例已存在: {name}")
+        for dir_name in PRIVATE_DIRS:
+            (instance_dir / dir_name).mkdir(parents=True, exist_ok=True)
+        info = {
+            'version': version_id,
+            'created': time.time(),
+            'settings': settings or {},
+        }
+        self._write_info(name, info)
+        return self.get_instance(name)
+
+    def clone_instance(self, source_name, target_name):
+        """克隆实例：可变数据用reflink（不支持时复制），模组等只读文件可硬链接"""
+        self._validate_name(target_name)
+        source_dir = self.instance_dir(source_name)
+        target_dir = self.instance_dir(target_name)
+        if not (source_dir / INSTANCE_FILE).exists():
+            raise Exception(f"实例不存在: {source_name}")
+        if target_dir.exists():
+            raise Exception(f"实例已存在: {target_name}")
+
+        modes = {}
+        try:
+            for root, dirs, files in os.walk(source_dir):
+                relative = Path(root).relative_to(source_dir)
+                (target_dir / relative).mkdir(parents=True, exist_ok=True)
+                for file_name in files:
+                    if file_name == INSTANCE_FILE and relative == Path('.'):
+                        continue
+                    src = Path(root) / file_name
+                    if os.path.islink(src):
+                        os.symlink(os.readlink(src), target_dir / relative / file_name)
+                        continue
+                    if file_name.lower().endswith(IMMUTABLE_SUFFIXES) and relative.parts[:1] in (('mods',), ('resourcepacks',)):
+                        link_modes = ('reflink', 'hardlink', 'copy')
+                    else:
+                        link_modes = ('reflink', 'copy')
+                    mode = place_file(src, target_dir / relative / file_name, link_modes)
+                    modes[mode] = modes.get(mode, 0) + 1
+        except Exception:
+            shutil.rmtree(target_dir, ignore_errors=True)
+            raise
+
+        info = self.get_instance(source_name)
+        self._write_info(target_name, {
+            'version': info.get('version', ''),
+            'created': time.time(),
+            'cloned_from': source_name,
+            'settings': info.get('settings', {}),
+        })
+        result = self.get_instance(target_name)
+        result['clone_modes'] = modes
+        return result
+
+    def update_instance(self, name, **fields):
+        """更新实例信息"""
+        info = self.get_instance(name)
+        if info is None:
+            raise Exception(f"实例不存在: {name}")
+        info.update(fields)
+        info.pop('name', None)
+        info.pop('path', None)
+        self._write_info(name, info)
+        return self.get_instance(name)
+
+    def delete_instance(self, name):
+        """删除实例（只删除私有数据，共享的版本和资源不受影响）"""
+        self._validate_name(name)
+        instance_dir = self.instance_dir(name)
+        if instance_dir.exists():
+            shutil.rmtree(instance_dir)
+            return True
+        return False
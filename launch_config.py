@@ -4,19 +4,35 @@
 启动配置 - 管理启动参数和设置
 """
 
+import atexit
 import json
 import os
 import subprocess
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from file_utils import atomic_write_bytes
+from tracing import traced
+
 class LaunchConfig:
-    def __init__(self, config_path=None):
+    def __init__(self, config_path=None, flush_delay=0.5):
         if config_path is None:
             config_path = Path.home() / ".tcl" / "config.json"
         
         self.config_path = Path(config_path)
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
         self.config = self._load_config()
+        
+        # 内存中修改，延迟合并写入磁盘
+        self.flush_delay = flush_delay
+        self.lock = threading.RLock()
+        # 串行化写盘：快照在持有写锁后才生成，旧快照不会覆盖新快照
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+        self._transaction_depth = 0
+        atexit.register(self.flush)
     
     def _load_config(self):
         """加载配置文件"""
@@ -28,7 +44,23 @@ class LaunchConfig:
             'last_version': '',
             'window_width': 800,
             'window_height': 600,
-            'username': 'Player'
+            'username': 'Player',
+            'process_priority': 'normal',
+            'cpu_affinity': [],
+            'lower_launcher_priority': True,
+            'version_settings': {},
+            'log_budget_mb': 256,
+            'cached_local_versions': [],
+            'cached_online_versions': [],
+            'shared_store_path': '',
+            'current_instance': '',
+            'gc_min_age_days': 1,
+            'lan_sharing': False,
+            'lan_discovery': True,
+            'lan_peers': [],
+            'download_mirror': '',
+            'trace_output': '',
+            'ui_watchdog': True
         }
         
         if self.config_path.exists():
@@ -43,23 +75,96 @@ class LaunchConfig:
         return default_config
     
     def save_config(self):
-        """保存配置文件"""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2)
-            return True
-        except Exception as e:
-            print(f"保存配置文件失败: {e}")
-            return False
+        """立即保存配置文件（原子替换，崩溃时不会留下半个文件）"""
+        with self._write_lock:
+            with self.lock:
+                self._cancel_timer()
+                data = json.dumps(self.config, indent=2).encode('utf-8')
+                self._dirty = False
+            try:
+                atomic_write_bytes(self.config_path, data)
+                return True
+            except Exception as e:
+                print(f"保存配置文件失败: {e}")
+                with self.lock:
+                    self._dirty = True
+                return False
+    
+    def flush(self):
+        """将尚未写入的修改立即写入磁盘"""
+        with self.lock:
+            if not self._dirty:
+                return True
+        return self.save_config()
+    
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    def _schedule_flush(self):
+        """延迟写入，短时间内的多次修改合并为一次写入"""
+        with self.lock:
+            if self._transaction_depth or not self._dirty:
+                return
+            self._cancel_timer()
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
     
     def get(self, key, default=None):
         """获取配置值"""
         return self.config.get(key, default)
     
     def set(self, key, value):
-        """设置配置值"""
-        self.config[key] = value
-        return self.save_config()
+        """设置配置值（值未变化时不触发写入）
+
+        列表和字典可能是 get() 返回后被原地修改的同一对象，与当前值比较总是相等，因此总是写入
+        """
+        with self.lock:
+            if key in self.config and self.config[key] == value and not isinstance(value, (list, dict)):
+                return True
+            self.config[key] = value
+            self._dirty = True
+            self._schedule_flush()
+        return True
+    
+    @contextmanager
+    def transaction(self):
+        """批量修改多个配置项，结束后只写入一次"""
+        with self.lock:
+            self._transaction_depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self._transaction_depth -= 1
+            self._schedule_flush()
+    
+    def update(self, values):
+        """一次设置多个配置值"""
+        with self.transaction():
+            for key, value in values.items():
+                self.set(key, value)
+        return True
+    
+    def get_process_settings(self, version_id=None, instance_settings=None):
+        """获取进程调度设置，优先级：实例设置 > 版本设置 > 全局设置"""
+        settings = {
+            'priority': self.get('process_priority', 'normal'),
+            'affinity': self.get('cpu_affinity', []),
+        }
+        layers = []
+        if version_id:
+            layers.append(self.get('version_settings', {}).get(version_id, {}))
+        if instance_settings:
+            layers.append(instance_settings)
+        for overrides in layers:
+            if 'process_priority' in overrides:
+                settings['priority'] = overrides['process_priority']
+            if 'cpu_affinity' in overrides:
+                settings['affinity'] = overrides['cpu_affinity']
+        return settings
     
     def get_java_path(self):
         """获取Java路径"""
@@ -118,8 +223,9 @@ class LaunchConfig:
         
         return None
     
-    def get_launch_arguments(self, version_data, version_id, game_directory):
-        """获取启动参数"""
+    def get_launch_arguments(self, version_data, version_id, game_directory,
+                             instance_directory=None, instance_settings=None):
+        """获取启动参数（指定实例时，实例目录作为gameDir，版本、依赖库和资源仍使用game_directory）"""
         args = []
         java_path = self.get_java_path()
         
@@ -127,7 +233,7 @@ class LaunchConfig:
             raise Exception("未找到Java运行时环境")
         
         # JVM参数
-        memory = self.get('memory', 2048)
+        memory = (instance_settings or {}).get('memory') or self.get('memory', 2048)
         args.extend([
             java_path,
             f"-Xmx{memory}M",
@@ -143,7 +249,7 @@ class LaunchConfig:
         # 游戏参数
         game_args = {
             '--version': version_id,
-            '--gameDir': game_directory,
+            '--gameDir': instance_directory or game_directory,
             '--assetsDir': str(Path(game_directory) / "assets"),
             '--assetIndex': version_data.get('assets', ''),
             '--uuid': '00000000-0000-0000-0000-000000000000',
@@ -161,6 +267,19 @@ class LaunchConfig:
         
         return args
     
+    @staticmethod
+    def jvm_arguments(cmd):
+        """启动命令中的JVM参数（Java路径之后、类路径或主类之前的部分）"""
+        if '-cp' in cmd:
+            return cmd[1:cmd.index('-cp')]
+        args = []
+        for arg in cmd[1:]:
+            if not arg.startswith('-'):
+                break
+            args.append(arg)
+        return args
+    
+    @traced('classpath_build')
     def _build_classpath(self, version_data, game_directory):
         """构建类路径"""
         from library_manager import LibraryManager
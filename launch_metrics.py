@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时统计 - 记录从点击启动到游戏可用的各阶段耗时
+"""
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# 游戏日志中可识别的启动里程碑（按出现顺序）
+LOG_MILESTONES = [
+    ('lwjgl_init', re.compile(r"LWJGL Version|Backend library: LWJGL")),
+    ('resource_reload_complete', re.compile(r"Created: \d+x\d+x\d+ \S*atlas")),
+    ('sound_engine_started', re.compile(r"Sound engine started")),
+]
+
+
+class LaunchTimer:
+    """单次启动的计时器，所有时间戳均基于单调时钟"""
+
+    def __init__(self, version_id, record_store=None, launcher_version='', jvm_args=None):
+        self.version_id = version_id
+        self.record_store = record_store
+        self.launcher_version = launcher_version
+        self.jvm_args = list(jvm_args or [])
+        self.started_at = time.time()
+        self.t0 = time.monotonic()
+        self.phases = {}
+        self.milestones = {}
+        self.status = None
+        self.exit_code = None
+        self.lock = threading.Lock()
+        self._finished = False
+
+    def _elapsed_ms(self):
+        return (time.monotonic() - self.t0) * 1000
+
+    @contextmanager
+    def phase(self, name):
+        """记录一个启动阶段的起止时间"""
+        start = self._elapsed_ms()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = {
+                    'start_ms': round(start, 1),
+                    'duration_ms': round(self._elapsed_ms() - start, 1)
+                }
+
+    def add_phase(self, name, start, end):
+        """根据单调时钟时间戳补记一个阶段"""
+        with self.lock:
+            self.phases[name] = {
+                'start_ms': round((start - self.t0) * 1000, 1),
+                'duration_ms': round((end - start) * 1000, 1)
+            }
+
+    def mark(self, name):
+        """记录一个瞬时事件"""
+        with self.lock:
+            self.milestones.setdefault(name, round(self._elapsed_ms(), 1))
+
+    def observe_line(self, line):
+        """匹配游戏日志行，返回新到达的里程碑名称"""
+        if self._finished:
+            return None
+        for name, pattern in LOG_MILESTONES:
+            if name in self.milestones:
+                continue
+            if pattern.search(line):
+                self.mark(name)
+                if all(n in self.milestones for n, _ in LOG_MILESTONES):
+                    self.finish('ready')
+                return name
+        return None
+
+    def milestone_ms(self, name):
+        """获取里程碑相对点击启动的耗时（毫秒）"""
+        return self.milestones.get(name)
+
+    def to_record(self):
+        """转换为可持久化的记录"""
+        with self.lock:
+            return {
+                'launcher_version': self.launcher_version,
+                'version_id': self.version_id,
+                'jvm_args': self.jvm_args,
+                'started_at': self.started_at,
+                'status': self.status,
+                'exit_code': self.exit_code,
+                'total_ms': round(self._elapsed_ms(), 1),
+                'phases': dict(self.phases),
+                'milestones': dict(self.milestones),
+            }
+
+    def finish(self, status, exit_code=None):
+        """结束计时并持久化记录（只持久化一次）"""
+        with self.lock:
+            if self._finished:
+                return False
+            self._finished = True
+            self.status = status
+            self.exit_code = exit_code
+        if self.record_store:
+            self.record_store.append(self.to_record())
+        return True
+
+
+class LaunchRecordStore:
+    """启动记录存储 - 每行一条JSON记录，便于跨版本对比"""
+
+    def __init__(self, record_path):
+        self.record_path = Path(record_path)
+        self.lock = threading.Lock()
+
+    def append(self, record):
+        """追加一条启动记录"""
+        try:
+            with self.lock:
+                self.record_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.record_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            return True
+        except Exception as e:
+            print(f"保存启动记录失败: {e}")
+            return False
+
+    def load_records(self, version_id=None):
+        """读取启动记录，可按版本过滤"""
+        records = []
+        if not self.record_path.exists():
+            return records
+        with open(self.record_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if version_id and record.get('version_id') != version_id:
+                    continue
+                records.append(record)
+        return records
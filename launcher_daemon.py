@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动器常驻服务 - 在内存中保持版本目录、安装计划和启动命令，通过本地套接字为界面和命令行提供查询
+"""
+
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+
+from launch_config import LaunchConfig
+from launcher_services import LauncherServices
+from mirrors import set_mirror
+
+RUNTIME_DIR = Path.home() / ".amcl_cache"
+# POSIX使用Unix套接字；Windows的Python不提供Unix套接字和命名管道，改用仅监听本机的TCP端口
+SOCKET_PATH = RUNTIME_DIR / "daemon.sock"
+PORT_FILE = RUNTIME_DIR / "daemon.port"
+# TCP端口本机任何进程都能连接，每个请求都必须带上令牌文件中的随机令牌
+TOKEN_FILE = RUNTIME_DIR / "daemon.token"
+USE_UNIX_SOCKET = hasattr(socket, 'AF_UNIX') and os.name != 'nt'
+
+# 目录轮询间隔（秒）
+WATCH_INTERVAL = 2.0
+# 依赖单个文件状态的结果（安装计划、校验、启动命令）的有效期（秒），这些变化不在目录监视范围内
+FILE_RESULT_TTL = 60.0
+
+
+class DirectoryWatcher(threading.Thread):
+    """轮询少量目录和文件的修改时间，发现变化时调用回调
+
+    只比较目录本身的mtime：新增、删除、替换文件（包括原子写入）都会改变所在目录的mtime。
+    roots 为 [(目录, 深度)]，深度0只看目录本身，1再加上直接子目录；不递归整个目录树，
+    每次轮询只需几十次stat。member_files 为 [(目录, 文件名)]，监视每个子目录下的该文件
+    （例如各实例的 instance.json），子目录中的存档、日志等运行时文件不会触发失效。
+    更深层的变化（单个依赖库或资源对象）不在监视范围内，相关结果按有效期过期。
+    """
+
+    def __init__(self, roots, on_change, interval=WATCH_INTERVAL, files=(), member_files=()):
+        super().__init__(daemon=True)
+        self.roots = [(Path(root), depth) for root, depth in roots]
+        self.files = [Path(path) for path in files]
+        self.member_files = [(Path(root), name) for root, name in member_files]
+        self.on_change = on_change
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self.snapshot = self._take_snapshot()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _subdirs(self, path):
+        try:
+            return [entry.path for entry in os.scandir(path) if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return []
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for path in self.files:
+            snapshot[str(path)] = self._mtime(path)
+        for root, depth in self.roots:
+            snapshot[str(root)] = self._mtime(root)
+            if depth >= 1:
+                for path in self._subdirs(root):
+                    snapshot[path] = self._mtime(path)
+        for root, name in self.member_files:
+            for path in self._subdirs(root):
+                member = os.path.join(path, name)
+                snapshot[member] = self._mtime(member)
+        return snapshot
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            snapshot = self._take_snapshot()
+            if snapshot != self.snapshot:
+                changed = [path for path in set(snapshot) | set(self.snapshot)
+                           if snapshot.get(path) != self.snapshot.get(path)]
+                self.snapshot = snapshot
+                try:
+                    self.on_change(changed)
+                except Exception as e:
+                    print(f"处理目录变化失败: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class LauncherDaemon:
+    """持有预热的管理器和结果缓存；目录变化时按代数整体失效"""
+
+    def __init__(self, config_path, minecraft_path=None, content_store=None, max_workers=16):
+        self.config_path = Path(config_path)
+        self.config = LaunchConfig(self.config_path)
+        self.minecraft_path = minecraft_path or self.config.get('game_directory')
+        set_mirror(self.config.get('download_mirror', ''))
+        if content_store is None and self.config.get('shared_store_path', ''):
+            from content_store import ContentStore
+            content_store = ContentStore(self.config.get('shared_store_path'))
+        self.services = LauncherServices(self.minecraft_path, max_workers=max_workers,
+                                         content_store=content_store)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.results = {}  # (方法, 参数...) -> (代数, 计算时间, 结果)
+        self.started_at = time.time()
+        self.requests_served = 0
+
+        game_dir = Path(self.minecraft_path)
+        self.watcher = DirectoryWatcher(
+            [(game_dir / "versions", 1), (game_dir / "libraries", 0), (game_dir / "assets" / "indexes", 0),
+             (game_dir / "assets" / "objects", 0), (game_dir / "instances", 0)],
+            self._on_change, files=[self.config_path],
+            member_files=[(game_dir / "instances", "instance.json")])
+
+    def start(self):
+        self.warm_up()
+        self.watcher.start()
+
+    def stop(self):
+        self.watcher.stop()
+        self.config.flush()
+
+    def warm_up(self):
+        """预先载入版本目录、本地版本列表和管理器（包括HTTP连接池）"""
+        started = time.monotonic()
+        try:
+            self.services.version_manager.get_version_catalog()
+        except Exception as e:
+            print(f"预载版本目录失败: {e}")
+        self.services.version_manager.get_local_versions()
+        self.services.install_planner
+        return (time.monotonic() - started) * 1000
+
+    def _on_change(self, changed):
+        with self.lock:
+            self.generation += 1
+            self.results.clear()
+        if str(self.config_path) in changed:
+            # 配置文件被界面修改，重新载入
+            with self.config.lock:
+                self.config.config = self.config._load_config()
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.results.clear()
+        return self.generation
+
+    def _cached(self, key, compute, max_age=None):
+        """同一代内（且未超过max_age秒）重复请求直接返回内存中的结果"""
+        with self.lock:
+            generation = self.generation
+            cached = self.results.get(key)
+            if cached is not None and cached[0] == generation and \
+                    (max_age is None or time.monotonic() - cached[1] < max_age):
+                return cached[2]
+        result = compute()
+        with self.lock:
+            if self.generation == generation:
+                self.results[key] = (generation, time.monotonic(), result)
+        return result
+
+    # 以下为对外提供的请求方法，参数和返回值都必须能序列化为JSON
+
+    def handle_ping(self):
+        return {'pid': os.getpid(), 'uptime': time.time() - self.started_at}
+
+    def handle_status(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'minecraft_path': str(self.minecraft_path),
+                'generation': self.generation,
+                'cached_results': len(self.results),
+                'requests_served': self.requests_served,
+                'uptime': time.time() - self.started_at,
+            }
+
+    def handle_local_versions(self):
+        return self._cached(('local_versions',), self.services.version_manager.get_local_versions)
+
+    def handle_available_versions(self, version_type=None):
+        return self.services.version_manager.get_available_versions(version_type)
+
+    def handle_plan(self, version_id, verify=False):
+        def compute():
+            return self.services.install_planner.plan(version_id, verify=verify).to_dict()
+        return self._cached(('plan', version_id, verify), compute, FILE_RESULT_TTL)
+
+    def handle_verify(self, version_id, full=False):
+        """校验版本文件；full为False时只比较大小，结果在目录无变化时直接复用"""
+        def compute():
+            return self.services.install_planner.plan(version_id, verify=full, read_only=True).verify_result()
+        return self._cached(('verify', version_id, full), compute, FILE_RESULT_TTL)
+
+    def handle_launch_command(self, version_id, instance=''):
+        """生成启动命令（类路径已解析），启动时无需再读取版本JSON和扫描依赖库"""
+        def compute():
+            json_file = Path(self.minecraft_path) / "versions" / version_id / f"{version_id}.json"
+            with open(json_file, 'r', encoding='utf-8') as f:
+                version_data = json.load(f)
+            instance_info = None
+            if instance:
+                instance_info = self.services.instance_manager.get_instance(instance)
+                if instance_info is None:
+                    raise Exception(f"实例不存在: {instance}")
+            instance_dir = instance_info['path'] if instance_info else None
+            instance_settings = instance_info.get('settings', {}) if instance_info else {}
+            return {
+                'cmd': self.config.get_launch_arguments(
+                    version_data, version_id, self.minecraft_path,
+                    instance_directory=instance_dir, instance_settings=instance_settings),
+                'cwd': instance_dir or str(self.minecraft_path),
+                'process_settings': self.config.get_process_settings(version_id, instance_settings),
+            }
+        # 依赖库目录只监视顶层，删除或替换某个库文件不会使类路径失效，因此同样设有效期
+        return self._cached(('launch_command', version_id, instance), compute, FILE_RESULT_TTL)
+
+    def handle_install(self, version_id, emit):
+        """安装版本，进度通过emit推送给客户端"""
+        planner = self.services.install_planner
+        callback = lambda message, percent: emit('progress', message=message, percent=round(percent, 1))
+        plan = planner.plan(version_id, progress_callback=callback)
+        emit('plan', files=len(plan.files), total_bytes=plan.total_bytes,
+             shared_bytes=plan.shared_bytes, fetch_bytes=plan.fetch_bytes,
+             estimated_seconds=round(plan.estimated_seconds, 1))
+        failures = planner.execute(plan, callback)
+        self.invalidate()
+        return {'ok': not failures, 'failed': [planned.to_dict() for planned, _ in failures]}
+
+    def handle_invalidate(self):
+        return {'generation': self.invalidate()}
+
+    # 需要推送进度事件的方法
+    STREAMING = ('install',)
+
+    def dispatch(self, method, params, emit):
+        handler = getattr(self, f"handle_{method}", None)
+        if handler is None:
+            raise Exception(f"未知的请求: {method}")
+        with self.lock:
+            self.requests_served += 1
+        if method in self.STREAMING:
+            return handler(emit=emit, **params)
+        return handler(**params)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """每行一个JSON请求 {"id", "method", "params"[, "token"]}，每行一个JSON响应或事件"""
+
+    def handle(self):
+        write_lock = threading.Lock()
+
+        def send(message):
+            data = (json.dumps(message, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+            with write_lock:
+                self.wfile.write(data)
+                self.wfile.flush()
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get('id')
+                token = self.server.token
+                if token and not hmac.compare_digest(str(request.get('token', '')), token):
+                    send({'id': request_id, 'error': "令牌无效"})
+                    return
+                method = request['method']
+                if method == 'shutdown':
+                    send({'id': request_id, 'result': True})
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    return
+
+                def emit(event, **fields):
+                    send({'id': request_id, 'event': event, **fields})
+
+                result = self.server.launcher_daemon.dispatch(method, request.get('params', {}), emit)
+                send({'id': request_id, 'result': result})
+            except Exception as e:
+                send({'id': request_id, 'error': str(e)})
+
+
+def _make_server(daemon):
+    RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+    if USE_UNIX_SOCKET:
+        if SOCKET_PATH.exists():
+            if DaemonClient.connect() is not None:
+                raise Exception("常驻服务已在运行")
+            SOCKET_PATH.unlink()  # 上次异常退出遗留的套接字文件
+        server = socketserver.ThreadingUnixStreamServer(str(SOCKET_PATH), _RequestHandler)
+        os.chmod(SOCKET_PATH, 0o600)
+        server.token = None  # 套接字文件仅当前用户可访问
+    else:
+        if DaemonClient.connect() is not None:
+            raise Exception("常驻服务已在运行")
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _RequestHandler)
+        server.token = secrets.token_hex(32)
+        # 令牌文件位于用户目录下，先于端口文件写入，客户端看到端口时令牌已就绪
+        fd = os.open(TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(server.token)
+        PORT_FILE.write_text(str(server.server_address[1]), encoding='utf-8')
+    server.daemon_threads = True
+    server.launcher_daemon = daemon
+    return server
+
+
+def serve(config_path, minecraft_path=None):
+    """在前台运行常驻服务，直到收到shutdown请求或被中断"""
+    daemon = LauncherDaemon(config_path, minecraft_path)
+    server = _make_server(daemon)
+    daemon.start()
+    print(f"常驻服务已启动: {SOCKET_PATH if USE_UNIX_SOCKET else PORT_FILE.read_text()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stop()
+        for path in ([SOCKET_PATH] if USE_UNIX_SOCKET else [PORT_FILE, TOKEN_FILE]):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+class DaemonClient:
+    """常驻服务的客户端；服务未运行时 connect() 返回None，调用方回退到直接使用管理器"""
+
+    def __init__(self, sock, token=None):
+        self.sock = sock
+        self.token = token
+        self.reader = sock.makefile('rb')
+        self.next_id = 0
+
+    @classmethod
+    def connect(cls, timeout=0.5):
+        token = None
+        try:
+            if USE_UNIX_SOCKET:
+                if not SOCKET_PATH.exists():
+                    return None
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(timeout)
+                sock.connect(str(SOCKET_PATH))
+            else:
+                if not PORT_FILE.exists():
+                    return None
+                port = int(PORT_FILE.read_text(encoding='utf-8'))
+                token = TOKEN_FILE.read_text(encoding='utf-8').strip()
+                sock = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+        except (OSError, ValueError):
+            return None
+        sock.settimeout(None)
+        return cls(sock, token)
+
+    def call(self, method, on_event=None, **params):
+        """发送请求并等待结果；安装等长时间请求的进度事件交给on_event"""
+        self.next_id += 1
+        request_id = self.next_id
+        request = {'id': request_id, 'method': method, 'params': params}
+        if self.token:
+            request['token'] = self.token
+        self.sock.sendall((json.dumps(request) + "\n").encode('utf-8'))
+        for line in self.reader:
+            message = json.loads(line)
+            if message.get('id') != request_id:
+                continue
+            if 'event' in message:
+                if on_event:
+                    on_event(message)
+                continue
+            if 'error' in message:
+                raise Exception(message['error'])
+            return message.get('result')
+        raise Exception("常驻服务连接已断开")
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    serve(Path(__file__).parent / "config.json", sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动器服务门面 - 各管理器在第一次使用时才导入和创建
+"""
+
+import threading
+
+
+class LauncherServices:
+    """集中持有各管理器实例，按需延迟创建"""
+
+    def __init__(self, minecraft_path, progress_callback=None, max_workers=8, content_store=None,
+                 peer_fetcher=None):
+        self.minecraft_path = minecraft_path
+        self.progress_callback = progress_callback
+        self.max_workers = max_workers
+        self.content_store = content_store
+        self.peer_fetcher = peer_fetcher
+        self._instances = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name, factory):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = factory()
+                    self._instances[name] = instance
+        return instance
+
+    def retarget(self, minecraft_path):
+        """切换游戏目录：丢弃绑定旧目录的管理器，下次使用时按新目录重新创建
+
+        进程管理器与目录无关，保留以免丢失正在运行的游戏
+        """
+        with self._lock:
+            self.minecraft_path = minecraft_path
+            self._instances = {name: instance for name, instance in self._instances.items()
+                               if name == 'process_manager'}
+
+    def is_loaded(self, name):
+        """某个管理器是否已经创建"""
+        return name in self._instances
+
+    @property
+    def version_manager(self):
+        def create():
+            from enhanced_version_manager import EnhancedVersionManager
+            return EnhancedVersionManager(self.minecraft_path, self.progress_callback)
+        return self._get('version_manager', create)
+
+    @property
+    def asset_downloader(self):
+        def create():
+            from asset_downloader import AssetDownloader
+            return AssetDownloader(self.minecraft_path, self.progress_callback,
+                                   max_workers=self.max_workers, content_store=self.content_store,
+                                   peer_fetcher=self.peer_fetcher)
+        return self._get('asset_downloader', create)
+
+    @property
+    def library_manager(self):
+        def create():
+            from library_manager import LibraryManager
+            return LibraryManager(self.minecraft_path, self.progress_callback,
+                                  content_store=self.content_store, peer_fetcher=self.peer_fetcher)
+        return self._get('library_manager', create)
+
+    @property
+    def install_planner(self):
+        def create():
+            from install_planner import InstallPlanner
+            return InstallPlanner(self.version_manager, self.asset_downloader, self.library_manager,
+                                  content_store=self.content_store, max_workers=self.max_workers,
+                                  peer_fetcher=self.peer_fetcher)
+        return self._get('install_planner', create)
+
+    @property
+    def dependency_checker(self):
+        def create():
+            from dependency_checker import DependencyChecker
+            return DependencyChecker(self.minecraft_path)
+        return self._get('dependency_checker', create)
+
+    @property
+    def process_manager(self):
+        def create():
+            from process_manager import ProcessManager
+            return ProcessManager()
+        return self._get('process_manager', create)
+
+    @property
+    def instance_manager(self):
+        def create():
+            from instance_manager import InstanceManager
+            return InstanceManager(self.minecraft_path)
+        return self._get('instance_manager', create)
+
+    @property
+    def version_list_manager(self):
+        def create():
+            from version_list_manager import VersionListManager
+            return VersionListManager(self.minecraft_path, self.progress_callback)
+        return self._get('version_list_manager', create)
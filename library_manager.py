@@ -12,12 +12,17 @@ import threading
 from pathlib import Path
 from urllib.parse import urljoin
 
+from mirrors import resolve_url
+from tracing import span
+
 class LibraryManager:
-    def __init__(self, minecraft_path, progress_callback=None):
+    def __init__(self, minecraft_path, progress_callback=None, content_store=None, peer_fetcher=None):
         self.minecraft_path = Path(minecraft_path)
         self.libraries_path = self.minecraft_path / "libraries"
         self.libraries_path.mkdir(parents=True, exist_ok=True)
         self.progress_callback = progress_callback
+        self.content_store = content_store  # 可选的全局共享存储
+        self.peer_fetcher = peer_fetcher  # 可选的局域网同伴缓存
     
     def download_libraries(self, version_data, progress_callback=None):
         """下载游戏依赖库"""
@@ -50,13 +55,27 @@ class LibraryManager:
                 
                 target_path = self.libraries_path / library_path
                 target_path.parent.mkdir(parents=True, exist_ok=True)
+                library_sha1 = library_info.get('sha1')
+                store = self.content_store
                 
                 if not target_path.exists():
+                    if store and store.materialize(library_sha1, target_path):
+                        # 共享存储中已有该库，直接链接
+                        downloaded += 1
+                        continue
+                    
                     if progress_callback:
                         progress_callback(f"下载库文件: {library_path.split('/')[-1]}", 
                                         (downloaded / total) * 100)
                     
-                    self._download_file(library_url, target_path)
+                    # 先从局域网同伴获取（已按SHA1校验），没有时再访问上游
+                    peer = self.peer_fetcher
+                    with span('download', kind='library', path=library_path):
+                        if not (peer and peer.fetch(f"libraries/{library_path}", library_sha1, target_path)):
+                            self._download_file(library_url, target_path)
+                
+                if store and library_sha1 and not store.contains(library_sha1):
+                    store.ingest(target_path, library_sha1, verify=True)
                 
                 downloaded += 1
             
@@ -70,6 +89,17 @@ class LibraryManager:
                 progress_callback(f"依赖库下载失败: {e}", -1)
             raise Exception(f"下载依赖库失败: {e}")
     
+    def resolve_libraries(self, version_data):
+        """当前平台需要的库文件下载信息列表（path, url, sha1, size）"""
+        resolved = []
+        for library in version_data.get('libraries', []):
+            if not self._should_download_library(library):
+                continue
+            library_info = self._get_library_info(library)
+            if library_info and library_info.get('path') and library_info.get('url'):
+                resolved.append(library_info)
+        return resolved
+    
     def _get_library_info(self, library):
         """获取库的下载信息"""
         # 优先使用artifact下载信息
@@ -233,7 +263,7 @@ class LibraryManager:
     
     def _download_file(self, url, file_path):
         """下载文件"""
-        response = requests.get(url, stream=True)
+        response = requests.get(resolve_url(url), stream=True)
         response.raise_for_status()
         
         total_size = int(response.headers.get('content-length', 0))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地版本目录 - 按版本JSON的修改时间和大小增量维护已安装版本列表
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+CATALOG_FORMAT = 1
+
+
+class LocalVersionCatalog:
+    """只重新解析修改过的版本JSON，新增和删除的版本通过一次目录列举发现"""
+
+    def __init__(self, versions_path, catalog_path=None):
+        self.versions_path = Path(versions_path)
+        if catalog_path is None:
+            catalog_path = self.versions_path / ".ecl_local_catalog.json"
+        self.catalog_path = Path(catalog_path)
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def _load(self):
+        """载入持久化的目录"""
+        self.entries = {}
+        if not self.catalog_path.exists():
+            return
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == CATALOG_FORMAT:
+                self.entries = data.get('entries', {})
+        except Exception as e:
+            print(f"读取本地版本目录失败: {e}")
+
+    def _save(self):
+        tmp_path = self.catalog_path.with_name(self.catalog_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'format': CATALOG_FORMAT, 'entries': self.entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.catalog_path)
+        except Exception as e:
+            print(f"保存本地版本目录失败: {e}")
+
+    def _parse_version(self, dir_name, json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            version_data = json.load(f)
+        return {
+            'id': version_data.get('id', dir_name),
+            'type': version_data.get('type', 'release'),
+            'release_time': version_data.get('releaseTime', ''),
+        }
+
+    def refresh(self):
+        """刷新目录并返回已安装版本列表"""
+        with self.lock:
+            if self.entries is None:
+                self._load()
+
+            seen = {}
+            changed = False
+            try:
+                dir_entries = list(os.scandir(self.versions_path))
+            except FileNotFoundError:
+                dir_entries = []
+
+            for dir_entry in dir_entries:
+                if not dir_entry.is_dir():
+                    continue
+                name = dir_entry.name
+                json_path = os.path.join(dir_entry.path, f"{name}.json")
+                try:
+                    stat = os.stat(json_path)
+                except OSError:
+                    continue
+
+                cached = self.entries.get(name)
+                if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+                    seen[name] = cached
+                    continue
+
+                # 新增或修改过的版本才重新解析JSON
+                try:
+                    info = self._parse_version(name, json_path)
+                except Exception as e:
+                    print(f"读取版本 {name} 信息失败: {e}")
+                    continue
+                info['mtime_ns'] = stat.st_mtime_ns
+                info['size'] = stat.st_size
+                seen[name] = info
+                changed = True
+
+            if set(seen) != set(self.entries):
+                changed = True
+            self.entries = seen
+            if changed:
+                self._save()
+
+            return [{
+                'id': info['id'],
+                'type': info['type'],
+                'release_time': info['release_time'],
+                'path': str(self.versions_path / name)
+            } for name, info in seen.items()]
+
+    def invalidate(self, version_id=None):
+        """使目录中的某个版本（或全部）在下次刷新时重新解析"""
+        with self.lock:
+            if self.entries is None:
+                return
+            if version_id is None:
+                self.entries = {}
+            else:
+                self.entries.pop(version_id, None)
@@ -6,26 +6,33 @@ Easy Minecraft Launcher
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import time
 import json
 import os
 import sys
 import subprocess
 import threading
-import requests
 from pathlib import Path
 
-from enhanced_version_manager import EnhancedVersionManager
-from asset_downloader import AssetDownloader
-from library_manager import LibraryManager
+# 各管理器及requests、psutil等较重的模块通过LauncherServices按需导入
+from launcher_services import LauncherServices
 from launch_config import LaunchConfig
-from dependency_checker import DependencyChecker
-from process_manager import ProcessManager
-from version_list_manager import VersionListManager, VersionListDialog
+from process_manager import PRIORITY_LEVELS
+from launch_metrics import LaunchTimer, LaunchRecordStore
+from game_log_store import GameLogStore
+from progress_aggregator import ProgressAggregator
+from content_store import ContentStore
+from mirrors import set_mirror
+
+LAUNCHER_VERSION = "Alpha_v0.1.20"
+# 从创建启动器到首次绘制窗口的时间预算（毫秒）
+FIRST_PAINT_BUDGET_MS = 800
+DEFAULT_INSTANCE_LABEL = "(默认)"
 
 class MinecraftLauncher:
     def __init__(self):
+        self._startup_t0 = time.perf_counter()
         self.root = tk.Tk()
         self.root.title("Easy Minecraft Launcher - 开发测试版")
         self.root.geometry("625x700")
@@ -35,16 +42,40 @@ class MinecraftLauncher:
         config_path = program_dir / "config.json"
         self.config = LaunchConfig(config_path)
         
+        # 启动耗时记录
+        self.launch_records = LaunchRecordStore(program_dir / "launch_records.jsonl")
+        
         # Minecraft文件夹路径
         self.minecraft_path = self.config.get('game_directory')
         
-        # 管理器实例
-        self.version_manager = EnhancedVersionManager(self.minecraft_path, self.progress_callback)
-        self.asset_downloader = AssetDownloader(self.minecraft_path, self.progress_callback, max_workers=8)  # 添加多线程支持
-        self.library_manager = LibraryManager(self.minecraft_path, self.progress_callback)
-        self.dependency_checker = DependencyChecker(self.minecraft_path)
-        self.process_manager = ProcessManager()
-        self.version_list_manager = VersionListManager(self.minecraft_path, self.progress_callback)
+        # 游戏日志持久化
+        self.log_store = GameLogStore(Path(self.minecraft_path) / "ecl_logs",
+                                      self.config.get('log_budget_mb', 256) * 1024 * 1024)
+        self.game_log = None
+        
+        # 可选的全局共享存储（多个游戏目录共享资源文件和依赖库）
+        store_path = self.config.get('shared_store_path', '')
+        self.content_store = ContentStore(store_path) if store_path else None
+        
+        # 可选的性能追踪，退出时导出为Chrome trace JSON
+        if self.config.get('trace_output', ''):
+            import tracing
+            tracing.enable_with_export(self.config.get('trace_output'))
+        
+        # 可选的下载镜像（例如局域网内的缓存代理）
+        set_mirror(self.config.get('download_mirror', ''))
+        
+        # 可选的局域网共享缓存
+        self.peer_server = None
+        self.peer_fetcher = self._create_peer_cache()
+        
+        # 当前的安装任务及其线程
+        self.install_job = None
+        self.install_thread = None
+        
+        # 管理器实例（首次使用时才创建）
+        self.services = LauncherServices(self.minecraft_path, self.progress_callback, max_workers=8,  # 添加多线程支持
+                                         content_store=self.content_store, peer_fetcher=self.peer_fetcher)
         
         # 版本管理
         self.versions = []
@@ -54,12 +85,16 @@ class MinecraftLauncher:
         # 初始化UI
         self.setup_ui()
         
+        # 进度和日志统一由UI线程按固定频率渲染
+        self.progress_aggregator = ProgressAggregator(self.root, self._render_progress)
+        self.progress_aggregator.start()
+        
         # 绑定窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # 加载版本列表
-        self.refresh_versions()
-        self.load_available_versions()
+        # 先用缓存的版本列表绘制窗口，再在后台加载最新数据
+        self._apply_cached_versions()
+        self.root.after_idle(self._on_first_paint)
     
     def setup_ui(self):
         """设置用户界面"""
@@ -68,7 +103,7 @@ class MinecraftLauncher:
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # 标题
-        title_label = ttk.Label(main_frame, text="Easy Minecraft Launcher - Alpha_v0.1.20", 
+        title_label = ttk.Label(main_frame, text=f"Easy Minecraft Launcher - {LAUNCHER_VERSION}", 
                                font=("Arial", 16, "bold"))
         title_label.grid(row=0, column=0, columnspan=2, pady=10)
         
@@ -116,6 +151,18 @@ class MinecraftLauncher:
         ttk.Button(button_frame, text="下载资源", 
                   command=self.download_missing_assets).grid(row=0, column=5, padx=5)
         
+        ttk.Button(button_frame, text="清理文件", 
+                  command=self.collect_garbage).grid(row=0, column=6, padx=5)
+        
+        # 安装任务控制
+        self.pause_button = ttk.Button(button_frame, text="暂停下载",
+                                       command=self.toggle_pause_download, state='disabled')
+        self.pause_button.grid(row=0, column=7, padx=5)
+        
+        self.cancel_button = ttk.Button(button_frame, text="取消下载",
+                                        command=self.cancel_download, state='disabled')
+        self.cancel_button.grid(row=0, column=8, padx=5)
+        
         # 启动设置区域
         settings_frame = ttk.LabelFrame(main_frame, text="启动设置", padding="10")
         settings_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=5)
@@ -148,6 +195,29 @@ class MinecraftLauncher:
         ttk.Button(settings_frame, text="浏览", 
                   command=self.browse_java_path).grid(row=2, column=3, padx=5)
         
+        # 进程优先级设置
+        ttk.Label(settings_frame, text="进程优先级:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        self.priority_var = tk.StringVar(value=self.config.get('process_priority', 'normal'))
+        priority_combo = ttk.Combobox(settings_frame, textvariable=self.priority_var, width=12,
+                                      values=list(PRIORITY_LEVELS), state='readonly')
+        priority_combo.grid(row=3, column=1, padx=5, sticky=tk.W)
+        self.lower_priority_var = tk.BooleanVar(value=self.config.get('lower_launcher_priority', True))
+        ttk.Checkbutton(settings_frame, text="游戏运行时降低启动器优先级（仅Windows）",
+                        variable=self.lower_priority_var).grid(row=3, column=2, columnspan=2, sticky=tk.W)
+        
+        # 实例设置（独立的存档、配置和模组）
+        ttk.Label(settings_frame, text="实例:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        self.instance_var = tk.StringVar(value=self.config.get('current_instance', '') or DEFAULT_INSTANCE_LABEL)
+        self.instance_combo = ttk.Combobox(settings_frame, textvariable=self.instance_var, width=20,
+                                           state='readonly', postcommand=self.refresh_instances)
+        self.instance_combo.grid(row=4, column=1, padx=5, sticky=tk.W)
+        instance_buttons = ttk.Frame(settings_frame)
+        instance_buttons.grid(row=4, column=2, columnspan=2, sticky=tk.W)
+        ttk.Button(instance_buttons, text="新建实例",
+                  command=self.create_instance).grid(row=0, column=0, padx=5)
+        ttk.Button(instance_buttons, text="克隆实例",
+                  command=self.clone_instance).grid(row=0, column=1, padx=5)
+        
         # 启动按钮
         launch_frame = ttk.Frame(main_frame)
         launch_frame.grid(row=3, column=0, pady=20)
@@ -185,6 +255,9 @@ class MinecraftLauncher:
         self.username_var.trace('w', self.on_settings_changed)
         self.game_dir_var.trace('w', self.on_settings_changed)
         self.java_path_var.trace('w', self.on_settings_changed)
+        self.priority_var.trace('w', self.on_settings_changed)
+        self.lower_priority_var.trace('w', self.on_settings_changed)
+        self.instance_var.trace('w', self.on_settings_changed)
     
     def on_version_selected(self, event):
         """版本选择事件处理"""
@@ -196,65 +269,189 @@ class MinecraftLauncher:
     def show_version_list(self):
         """显示版本列表对话框"""
         try:
-            VersionListDialog(self.root, self.version_list_manager, self.minecraft_path)
+            from version_list_manager import VersionListDialog
+            VersionListDialog(self.root, self.services.version_list_manager, self.minecraft_path)
         except Exception as e:
             messagebox.showerror("错误", f"打开版本列表失败: {e}")
 
     def progress_callback(self, message, progress):
-        """进度回调函数"""
-        def update():
-            self.progress_var.set(message)
-            if progress >= 0:
-                self.progress_bar['value'] = progress
-            else:
+        """进度回调函数（线程安全，只记录最新状态）"""
+        self.progress_aggregator.update_progress(message, progress)
+    
+    def log_message(self, message):
+        """添加日志消息（线程安全，由UI线程批量渲染）"""
+        self.progress_aggregator.add_log(message)
+    
+    def _render_progress(self, snapshot):
+        """在UI线程中渲染进度快照"""
+        if snapshot.changed and snapshot.message is not None:
+            self.progress_var.set(snapshot.message)
+            if snapshot.progress >= 0:
+                if str(self.progress_bar['mode']) == 'indeterminate':
+                    self.progress_bar.stop()
+                    self.progress_bar['mode'] = 'determinate'
+                self.progress_bar['value'] = snapshot.progress
+            elif str(self.progress_bar['mode']) != 'indeterminate':
                 self.progress_bar['mode'] = 'indeterminate'
                 self.progress_bar.start()
-            self.root.update()
         
-        self.root.after(0, update)
-    
-    def log_message(self, message):
-        """添加日志消息"""
-        def update():
-            self.log_text.insert(tk.END, f"{message}\n")
+        if snapshot.logs:
+            self.log_text.insert(tk.END, "\n".join(snapshot.logs) + "\n")
             self.log_text.see(tk.END)
-            self.root.update()
-        
-        self.root.after(0, update)
+            # 限制日志长度，避免内存占用过大（完整日志已持久化到日志文件）
+            lines = int(self.log_text.index('end-1c').split('.')[0])
+            if lines > 1000:
+                self.log_text.delete('1.0', f'{lines-500}.0')
     
     def on_settings_changed(self, *args):
         """设置改变时的回调"""
-        self.config.set('memory', int(self.memory_var.get() or 2048))
-        self.config.set('username', self.username_var.get())
-        self.config.set('game_directory', self.game_dir_var.get())
-        self.config.set('java_path', self.java_path_var.get())
+        try:
+            memory = int(self.memory_var.get() or 2048)
+        except ValueError:
+            return  # 输入未完成时不保存
+        self.config.update({
+            'memory': memory,
+            'username': self.username_var.get(),
+            'game_directory': self.game_dir_var.get(),
+            'java_path': self.java_path_var.get(),
+            'process_priority': self.priority_var.get(),
+            'lower_launcher_priority': self.lower_priority_var.get(),
+            'current_instance': self._selected_instance(),
+        })
+    
+    def _apply_cached_versions(self):
+        """使用上次保存的版本列表填充下拉框，避免启动时等待磁盘和网络"""
+        local_ids = self.config.get('cached_local_versions', [])
+        online_ids = self.config.get('cached_online_versions', [])
+        self.version_combo['values'] = local_ids
+        self.online_version_combo['values'] = online_ids
+        if online_ids:
+            self.online_version_combo.set(online_ids[0])
+    
+    def _on_first_paint(self):
+        """窗口首次绘制后记录耗时，并开始异步加载版本列表"""
+        elapsed_ms = (time.perf_counter() - self._startup_t0) * 1000
+        if elapsed_ms > FIRST_PAINT_BUDGET_MS:
+            self.log_message(f"警告: 启动到首次绘制耗时 {elapsed_ms:.0f} ms，超出预算 {FIRST_PAINT_BUDGET_MS} ms")
+        else:
+            self.log_message(f"启动到首次绘制耗时 {elapsed_ms:.0f} ms")
+        
+        self.refresh_versions()
+        self.load_available_versions()
+        self._start_ui_watchdog()
+        self._report_unfinished_jobs()
+    
+    def _report_unfinished_jobs(self):
+        from install_job import InstallJob
+        for version_id, status, completed in InstallJob.unfinished(self.minecraft_path):
+            self.log_message(f"版本 {version_id} 有未完成的下载（已完成 {completed} 个文件），重新下载该版本即可继续")
+    
+    def _start_ui_watchdog(self):
+        """监测事件循环延迟，卡顿时记录主线程调用栈（写入程序目录下的 ui_metrics）"""
+        self.ui_watchdog = None
+        if not self.config.get('ui_watchdog', True):
+            return
+        from ui_watchdog import UIWatchdog
+        self.ui_watchdog = UIWatchdog(self.root, Path(__file__).parent / "ui_metrics").start()
     
     def load_available_versions(self):
-        """加载可用的在线版本"""
-        try:
-            self.available_versions = self.version_manager.get_available_versions('release')
-            version_ids = [v['id'] for v in self.available_versions[:20]]  # 只显示最新的20个版本
-            self.online_version_combo['values'] = version_ids
-            if version_ids:
-                self.online_version_combo.set(version_ids[0])
-        except Exception as e:
-            self.log_message(f"加载在线版本失败: {e}")
+        """在后台加载可用的在线版本"""
+        def load_thread():
+            try:
+                available_versions = self.services.version_manager.get_available_versions('release')
+                self.progress_aggregator.post(self._apply_available_versions, available_versions)
+            except Exception as e:
+                self.log_message(f"加载在线版本失败: {e}")
+        
+        threading.Thread(target=load_thread, daemon=True).start()
+    
+    def _apply_available_versions(self, available_versions):
+        """在UI线程中更新在线版本列表"""
+        self.available_versions = available_versions
+        version_ids = [v['id'] for v in self.available_versions[:20]]  # 只显示最新的20个版本
+        selected = self.online_version_var.get()
+        self.online_version_combo['values'] = version_ids
+        if version_ids and selected not in version_ids:
+            self.online_version_combo.set(version_ids[0])
+        if version_ids != self.config.get('cached_online_versions', []):
+            self.config.set('cached_online_versions', version_ids)
     
     def refresh_versions(self):
-        """刷新本地版本列表"""
-        try:
-            self.versions = self.version_manager.get_local_versions()
-            version_ids = [v['id'] for v in self.versions]
-            self.version_combo['values'] = version_ids
-            if version_ids:
-                # 不再自动设置当前版本，让用户选择
+        """在后台刷新本地版本列表"""
+        def refresh_thread():
+            try:
+                versions = self.services.version_manager.get_local_versions()
+                self.progress_aggregator.post(self._apply_local_versions, versions)
+            except Exception as e:
+                self.log_message(f"刷新版本失败: {e}")
+        
+        threading.Thread(target=refresh_thread, daemon=True).start()
+    
+    def _apply_local_versions(self, versions):
+        """在UI线程中更新本地版本列表"""
+        self.versions = versions
+        version_ids = [v['id'] for v in self.versions]
+        self.version_combo['values'] = version_ids
+        if version_ids:
+            # 不再自动设置当前版本，让用户选择
+            if self.version_var.get() not in version_ids:
                 self.version_combo.set("")
-                self.log_message(f"找到 {len(version_ids)} 个本地版本，请选择要启动的版本")
-            else:
-                self.current_version = None
-                self.log_message("未找到本地版本")
+            self.log_message(f"找到 {len(version_ids)} 个本地版本，请选择要启动的版本")
+        else:
+            self.current_version = None
+            self.log_message("未找到本地版本")
+        if version_ids != self.config.get('cached_local_versions', []):
+            self.config.set('cached_local_versions', version_ids)
+    
+    def _selected_instance(self):
+        """当前选择的实例名称，默认实例返回空字符串"""
+        name = self.instance_var.get()
+        return '' if name == DEFAULT_INSTANCE_LABEL else name
+    
+    def refresh_instances(self):
+        """刷新实例下拉列表"""
+        names = [info['name'] for info in self.services.instance_manager.list_instances()]
+        self.instance_combo['values'] = [DEFAULT_INSTANCE_LABEL] + names
+    
+    def create_instance(self):
+        """新建实例"""
+        name = simpledialog.askstring("新建实例", "实例名称:", parent=self.root)
+        if not name:
+            return
+        try:
+            self.services.instance_manager.create_instance(name, self.version_var.get())
+            self.refresh_instances()
+            self.instance_var.set(name)
+            self.log_message(f"已创建实例: {name}")
         except Exception as e:
-            self.log_message(f"刷新版本失败: {e}")
+            messagebox.showerror("错误", f"创建实例失败: {e}")
+    
+    def clone_instance(self):
+        """克隆当前选择的实例"""
+        source = self._selected_instance()
+        if not source:
+            messagebox.showwarning("警告", "请先选择要克隆的实例")
+            return
+        name = simpledialog.askstring("克隆实例", f"新实例名称（克隆自 {source}）:", parent=self.root)
+        if not name:
+            return
+        
+        def clone_thread():
+            try:
+                start = time.perf_counter()
+                info = self.services.instance_manager.clone_instance(source, name)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                modes = ", ".join(f"{mode} {count}" for mode, count in info['clone_modes'].items())
+                self.log_message(f"已克隆实例 {source} -> {name}，耗时 {elapsed_ms:.0f} ms ({modes or '无文件'})")
+                self.progress_aggregator.post(self._on_instance_cloned, name)
+            except Exception as e:
+                self.log_message(f"克隆实例失败: {e}")
+        
+        threading.Thread(target=clone_thread, daemon=True).start()
+    
+    def _on_instance_cloned(self, name):
+        self.refresh_instances()
+        self.instance_var.set(name)
     
     def download_version(self):
         """下载Minecraft版本"""
@@ -263,25 +460,75 @@ class MinecraftLauncher:
             messagebox.showerror("错误", "请选择要下载的版本")
             return
         
+        if self.install_thread and self.install_thread.is_alive():
+            messagebox.showinfo("提示", f"版本 {self.install_job.version_id} 正在下载，请等待完成或取消后再试")
+            return
+        
+        from install_job import InstallCancelled, InstallJob
+        # 上次未完成的任务从已完成的文件和 .part 文件继续
+        job = InstallJob.load(selected_version, self.minecraft_path)
+        if job.completed:
+            self.log_message(f"继续未完成的下载（已完成 {len(job.completed)} 个文件）")
+        
         def download_thread():
             try:
-                # 下载版本
-                version_data = self.version_manager.download_version(
-                    selected_version, self.progress_callback)
-                
-                # 下载资源
-                self.asset_downloader.download_assets(version_data, self.progress_callback)
+                # 先规划：算出需要下载的文件和字节数，再按字节加权执行
+                planner = self.services.install_planner
+                plan = planner.plan(selected_version, progress_callback=self.progress_callback, job=job)
+                self.log_message(plan.format_summary())
                 
-                # 下载依赖库
-                self.library_manager.download_libraries(version_data, self.progress_callback)
-                
-                self.log_message(f"版本 {selected_version} 下载完成")
+                failures = planner.execute(plan, self.progress_callback, job=job)
+                job.finish(failures)
+                if failures:
+                    self.log_message(f"版本 {selected_version} 下载未完成，{len(failures)} 个文件失败，可重新下载以继续")
+                else:
+                    self.log_message(f"版本 {selected_version} 下载完成")
                 self.refresh_versions()
                 
+            except InstallCancelled:
+                job.finish(cancelled=True)
+                self.log_message(f"版本 {selected_version} 的下载已取消，重新下载该版本时会从已完成的部分继续")
             except Exception as e:
+                job.finish(error=True)
                 self.log_message(f"下载失败: {e}")
-        
-        threading.Thread(target=download_thread, daemon=True).start()
+            finally:
+                self.progress_aggregator.post(self._set_download_controls, False)
+        
+        self.install_job = job
+        job.start()
+        self._set_download_controls(True)
+        self.install_thread = threading.Thread(target=download_thread, daemon=True)
+        self.install_thread.start()
+    
+    def _set_download_controls(self, active):
+        state = 'normal' if active else 'disabled'
+        self.pause_button.configure(state=state, text="暂停下载")
+        self.cancel_button.configure(state=state)
+    
+    def toggle_pause_download(self):
+        job = self.install_job
+        if not job or not self.install_thread or not self.install_thread.is_alive():
+            return
+        if job.paused:
+            job.resume()
+            self.pause_button.configure(text="暂停下载")
+            self.log_message(f"继续下载版本 {job.version_id}")
+        else:
+            job.pause()
+            self.pause_button.configure(text="继续下载")
+            self.log_message(f"已暂停下载版本 {job.version_id}")
+    
+    def cancel_download(self):
+        if self.install_job and self.install_thread and self.install_thread.is_alive():
+            self.install_job.cancel()
+            self.cancel_button.configure(state='disabled')
+            self.pause_button.configure(state='disabled')
+    
+    def _stop_install_job(self):
+        """关闭窗口时取消正在进行的安装并等待其保存状态，避免文件写到一半被终止"""
+        if self.install_thread and self.install_thread.is_alive():
+            self.install_job.cancel()
+            self.install_thread.join(timeout=5)
     
     def check_java(self):
         """检查Java环境"""
@@ -297,8 +544,22 @@ class MinecraftLauncher:
         directory = filedialog.askdirectory(initialdir=self.minecraft_path)
         if directory:
             self.game_dir_var.set(directory)
-            self.minecraft_path = directory
-            self.refresh_versions()
+            self._set_game_directory(directory)
+    
+    def _set_game_directory(self, directory):
+        """切换游戏目录：管理器、日志存储和局域网共享都改为使用新目录"""
+        if Path(directory) == Path(self.minecraft_path):
+            return
+        self.minecraft_path = directory
+        self.services.retarget(directory)
+        self.log_store = GameLogStore(Path(directory) / "ecl_logs",
+                                      self.config.get('log_budget_mb', 256) * 1024 * 1024)
+        if self.peer_server:
+            self._stop_peer_server()
+            self.peer_fetcher = self._create_peer_cache()
+            self.services.peer_fetcher = self.peer_fetcher
+        self.refresh_versions()
+        self.refresh_instances()
     
     def browse_java_path(self):
         """浏览选择Java路径"""
@@ -325,7 +586,7 @@ class MinecraftLauncher:
                     version_data = json.load(f)
                 
                 # 检查资源完整性
-                success, message = self.asset_downloader.check_assets_integrity(
+                success, message = self.services.asset_downloader.check_assets_integrity(
                     version_data, self.progress_callback)
                 
                 if success:
@@ -339,6 +600,37 @@ class MinecraftLauncher:
                 messagebox.showerror("错误", f"资源检查失败: {e}")
         threading.Thread(target=check_thread, daemon=True).start()
 
+    def collect_garbage(self):
+        """清理不再被任何已安装版本引用的资源和依赖库"""
+        def gc_thread():
+            from garbage_collector import GarbageCollector
+            try:
+                collector = GarbageCollector(self.minecraft_path)
+                self.log_message("正在统计未被引用的文件...")
+                report = collector.collect(dry_run=True, min_age_days=self.config.get('gc_min_age_days', 1))
+                self.log_message(report.format_summary())
+                if not report.files:
+                    return
+                self.progress_aggregator.post(self._confirm_garbage_collection, collector, report)
+            except Exception as e:
+                self.log_message(f"清理失败: {e}")
+        
+        threading.Thread(target=gc_thread, daemon=True).start()
+    
+    def _confirm_garbage_collection(self, collector, report):
+        """在UI线程中确认后执行清理"""
+        if not messagebox.askyesno("清理文件", f"{report.format_summary()}\n\n确定要删除这些文件吗？"):
+            return
+        
+        def sweep_thread():
+            try:
+                result = collector.collect(dry_run=False, min_age_days=self.config.get('gc_min_age_days', 1))
+                self.log_message(result.format_summary())
+            except Exception as e:
+                self.log_message(f"清理失败: {e}")
+        
+        threading.Thread(target=sweep_thread, daemon=True).start()
+    
     def check_dependencies(self):
         """检查游戏依赖是否完整"""
         try:
@@ -361,7 +653,7 @@ class MinecraftLauncher:
                 version_data = json.load(f)
             
             self.log_message("检查游戏资源完整性...")
-            assets_success, assets_message = self.asset_downloader.check_assets_integrity(
+            assets_success, assets_message = self.services.asset_downloader.check_assets_integrity(
                 version_data, self.progress_callback)
             
             if not assets_success:
@@ -371,7 +663,7 @@ class MinecraftLauncher:
                 self.log_message(f"✓ {assets_message}")
             
             # 检查依赖库
-            success, message = self.dependency_checker.check_version_dependencies(self.current_version)
+            success, message = self.services.dependency_checker.check_version_dependencies(self.current_version)
             if success:
                 self.log_message("✓ 依赖检查通过")
             else:
@@ -381,28 +673,30 @@ class MinecraftLauncher:
             self.log_message(f"依赖检查失败: {e}")
             return False, str(e)
     
-    def _launch_game_thread(self):
+    def _launch_game_thread(self, timer):
         """在新线程中启动游戏"""
         try:
-            # 检查Java环境
-            java_path = self.config.get_java_path()
-            if not java_path:
-                self.log_message("错误: 未找到Java运行时环境")
-                self.log_message("请手动设置Java路径或安装Java")
-                self.launch_button['state'] = 'normal'
-                return
-            
-            self.log_message(f"使用Java路径: {java_path}")
-            
-            # 验证Java版本
-            try:
-                result = subprocess.run([java_path, '-version'], capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    self.log_message("Java版本检查通过")
-                else:
-                    self.log_message("警告: Java版本检查失败")
-            except Exception as e:
-                self.log_message(f"Java版本检查失败: {e}")
+            with timer.phase('java_probe'):
+                # 检查Java环境
+                java_path = self.config.get_java_path()
+                if not java_path:
+                    self.log_message("错误: 未找到Java运行时环境")
+                    self.log_message("请手动设置Java路径或安装Java")
+                    self.launch_button['state'] = 'normal'
+                    timer.finish('no_java')
+                    return
+                
+                self.log_message(f"使用Java路径: {java_path}")
+                
+                # 验证Java版本
+                try:
+                    result = subprocess.run([java_path, '-version'], capture_output=True, text=True, timeout=10)
+                    if result.returncode == 0:
+                        self.log_message("Java版本检查通过")
+                    else:
+                        self.log_message("警告: Java版本检查失败")
+                except Exception as e:
+                    self.log_message(f"Java版本检查失败: {e}")
             
             # 读取版本数据
             version_dir = Path(self.minecraft_path) / "versions" / self.current_version
@@ -412,11 +706,13 @@ class MinecraftLauncher:
             if not json_file.exists():
                 self.log_message(f"错误: 未找到版本配置文件 {json_file}")
                 self.launch_button['state'] = 'normal'
+                timer.finish('missing_files')
                 return
             
             if not jar_file.exists():
                 self.log_message(f"错误: 未找到游戏文件 {jar_file}")
                 self.launch_button['state'] = 'normal'
+                timer.finish('missing_files')
                 return
             
             with open(json_file, 'r', encoding='utf-8') as f:
@@ -424,8 +720,20 @@ class MinecraftLauncher:
             
             # 检查资源完整性
             self.log_message("检查游戏资源完整性...")
-            assets_success, assets_message = self.asset_downloader.check_assets_integrity(
-                version_data, self.progress_callback)
+            with timer.phase('asset_check'):
+                # 常驻服务运行时，由其内存中的校验结果应答（目录无变化时无需重新扫描）；
+                # 必须是逐个比对SHA1的完整校验，与本地检查的强度一致
+                daemon_result = self._daemon_call('verify', version_id=self.current_version, full=True)
+                if daemon_result is not None:
+                    assets_success = daemon_result['ok']
+                    if assets_success:
+                        assets_message = f"常驻服务校验: {daemon_result['present']} 个文件完整"
+                    else:
+                        assets_message = (f"常驻服务校验: 缺失 {daemon_result['missing']} 个文件, "
+                                          f"损坏 {daemon_result['corrupt']} 个文件")
+                else:
+                    assets_success, assets_message = self.services.asset_downloader.check_assets_integrity(
+                        version_data, self.progress_callback)
             
             if not assets_success:
                 self.log_message(f"资源不完整: {assets_message}")
@@ -433,38 +741,65 @@ class MinecraftLauncher:
                 if messagebox.askyesno("资源不完整", 
                                       f"{assets_message}\n是否自动下载缺失的资源？"):
                     self.log_message("开始下载缺失资源...")
-                    self.asset_downloader.download_assets(version_data, self.progress_callback)
+                    self.services.asset_downloader.download_assets(version_data, self.progress_callback)
                     self.log_message("资源下载完成")
                 else:
                     self.log_message("用户取消资源下载")
                     self.launch_button['state'] = 'normal'
+                    timer.finish('cancelled')
                     return
             else:
                 self.log_message(f"资源完整性检查通过: {assets_message}")
             
             # 检查依赖库是否完整
             self.log_message("检查依赖库完整性...")
-            from library_manager import LibraryManager
-            library_manager = LibraryManager(self.minecraft_path)
+            library_manager = self.services.library_manager
             
             # 强制重新下载所有依赖库
             self.log_message("下载依赖库...")
-            library_manager.download_libraries(version_data, self.progress_callback)
+            with timer.phase('library_phase'):
+                library_manager.download_libraries(version_data, self.progress_callback)
             
-            classpath = library_manager.get_classpath(version_data, self.minecraft_path)
-            self.log_message(f"找到 {len(classpath)} 个库文件")
+            # 实例：独立的gameDir，版本、依赖库和资源仍共享游戏目录中的文件
+            instance_name = self.config.get('current_instance', '')
+            instance_info = None
+            if instance_name:
+                instance_info = self.services.instance_manager.get_instance(instance_name)
+                if instance_info is None:
+                    self.log_message(f"警告: 实例 {instance_name} 不存在，使用默认游戏目录")
+            instance_dir = instance_info['path'] if instance_info else None
+            instance_settings = instance_info.get('settings', {}) if instance_info else {}
             
-            # 构建启动命令
-            cmd = self.config.get_launch_arguments(
-                version_data, self.current_version, self.minecraft_path)
+            with timer.phase('classpath_build'):
+                classpath = library_manager.get_classpath(version_data, self.minecraft_path)
+                self.log_message(f"找到 {len(classpath)} 个库文件")
+                
+                # 构建启动命令
+                cmd = self.config.get_launch_arguments(
+                    version_data, self.current_version, self.minecraft_path,
+                    instance_directory=instance_dir, instance_settings=instance_settings)
             
             self.log_message(f"启动命令: {' '.join(cmd[:10])}...")
+            timer.jvm_args = LaunchConfig.jvm_arguments(cmd)
+            
+            # 为本次启动创建日志文件
+            try:
+                self.game_log = self.log_store.open_session(instance_name or self.current_version)
+            except OSError as e:
+                self.game_log = None
+                self.log_message(f"创建日志文件失败: {e}")
             
             # 使用进程管理器启动游戏
-            success = self.process_manager.start_process(
+            process_settings = self.config.get_process_settings(self.current_version, instance_settings)
+            self.services.process_manager.lower_launcher_priority = self.config.get('lower_launcher_priority', True)
+            success = self.services.process_manager.start_process(
                 cmd, 
-                cwd=self.minecraft_path,
-                callback=self._safe_log_message
+                cwd=instance_dir or self.minecraft_path,
+                callback=self._game_output_callback,
+                launch_timer=timer,
+                priority=process_settings['priority'],
+                affinity=process_settings['affinity'],
+                exit_callback=self._on_game_exit
             )
             
             if success:
@@ -474,20 +809,38 @@ class MinecraftLauncher:
             else:
                 self.log_message("启动失败")
                 self.launch_button['state'] = 'normal'
+                self._close_game_log()
             
         except Exception as e:
+            timer.finish('failed')
             self.log_message(f"启动失败: {e}")
             import traceback
             self.log_message(f"详细错误信息: {traceback.format_exc()}")
             self.launch_button['state'] = 'normal'
     
+    def _daemon_call(self, method, **params):
+        """常驻服务运行且管理同一游戏目录时通过它应答，否则返回None"""
+        from launcher_daemon import DaemonClient
+        client = DaemonClient.connect()
+        if client is None:
+            return None
+        try:
+            with client:
+                status = client.call('status')
+                if Path(status['minecraft_path']) != Path(self.minecraft_path):
+                    return None
+                return client.call(method, **params)
+        except Exception as e:
+            self.log_message(f"常驻服务请求失败，改为直接检查: {e}")
+            return None
+    
     def _start_process_monitor(self):
         """启动进程状态监控"""
         def monitor():
             # 等待几秒后检查进程状态
             time.sleep(3)
             
-            if self.process_manager.is_process_running():
+            if self.services.process_manager.is_process_running():
                 self.log_message("游戏进程运行中...")
                 # 重新启用启动按钮
                 self.launch_button['state'] = 'normal'
@@ -497,36 +850,80 @@ class MinecraftLauncher:
         
         threading.Thread(target=monitor, daemon=True).start()
     
+    def _create_peer_cache(self):
+        """按配置启动局域网共享服务，并返回优先向同伴获取文件的PeerFetcher"""
+        sharing = self.config.get('lan_sharing', False)
+        static_peers = self.config.get('lan_peers', [])
+        if not sharing and not static_peers:
+            return None
+        import peer_cache
+        discovery = sharing and self.config.get('lan_discovery', True)
+        if sharing:
+            try:
+                shared_roots = [self.content_store.objects_path] if self.content_store else []
+                self.peer_server = peer_cache.PeerCacheServer(
+                    self.minecraft_path, shared_roots=shared_roots).start(discoverable=discovery)
+            except OSError as e:
+                print(f"启动局域网共享失败: {e}")
+        own_port = self.peer_server.port if self.peer_server else None
+        return peer_cache.PeerFetcher(static_peers, discovery=discovery, own_port=own_port)
+    
+    def _stop_ui_watchdog(self):
+        if getattr(self, 'ui_watchdog', None):
+            self.ui_watchdog.stop()
+            self.ui_watchdog = None
+    
+    def _stop_peer_server(self):
+        if self.peer_server:
+            self.peer_server.stop()
+            self.peer_server = None
+    
     def on_closing(self):
         """窗口关闭时的处理"""
         # 如果游戏正在运行，询问是否终止
-        if self.process_manager.is_process_running():
+        if self.services.process_manager.is_process_running():
             if messagebox.askyesno("确认", "游戏正在运行，确定要关闭启动器吗？"):
                 try:
-                    self.process_manager.terminate_process()
+                    self.services.process_manager.terminate_process()
                 except:
                     pass
                 finally:
+                    self._close_game_log()
+                    self._stop_install_job()
+                    self._stop_peer_server()
+                    self._stop_ui_watchdog()
+                    self.progress_aggregator.stop()
+                    self.config.flush()
                     self.root.destroy()
         else:
+            self._stop_install_job()
+            self._stop_peer_server()
+            self._stop_ui_watchdog()
+            self.progress_aggregator.stop()
+            self.config.flush()
             self.root.destroy()
     
+    def _game_output_callback(self, message):
+        """游戏输出：写入日志文件并显示在界面上"""
+        game_log = self.game_log
+        if game_log:
+            game_log.append(message)
+        self._safe_log_message(message)
+    
+    def _on_game_exit(self, return_code):
+        """游戏进程退出回调"""
+        self._close_game_log()
+        self._safe_log_message(f"游戏进程已退出，返回码: {return_code}")
+    
+    def _close_game_log(self):
+        """关闭当前游戏日志文件"""
+        game_log, self.game_log = self.game_log, None
+        if game_log:
+            game_log.close()
+    
     def _safe_log_message(self, message):
         """线程安全的日志消息添加"""
-        def update_log():
-            try:
-                self.log_text.insert(tk.END, f"{message}\n")
-                self.log_text.see(tk.END)
-                # 限制日志长度，避免内存占用过大
-                lines = int(self.log_text.index('end-1c').split('.')[0])
-                if lines > 1000:
-                    self.log_text.delete('1.0', f'{lines-500}.0')
-            except Exception:
-                pass  # 忽略日志更新错误
-        
-        # 在主线程中更新GUI
-        if self.root and self.root.winfo_exists():
-            self.root.after(0, update_log)
+        self.progress_aggregator.add_log(message)
     
     def launch_game(self):
         """启动Minecraft游戏 - 修复版本"""
@@ -545,8 +942,11 @@ class MinecraftLauncher:
         # 清空日志
         self.log_text.delete('1.0', tk.END)
         
+        # 从点击启动开始计时
+        timer = LaunchTimer(selected_version, self.launch_records, LAUNCHER_VERSION)
+        
         # 直接启动游戏，让_launch_game_thread统一处理所有检查
-        threading.Thread(target=self._launch_game_thread, daemon=True).start()
+        threading.Thread(target=self._launch_game_thread, args=(timer,), daemon=True).start()
     
     def download_missing_assets(self):
         """下载缺失的游戏资源"""
@@ -563,7 +963,7 @@ class MinecraftLauncher:
                     version_data = json.load(f)
                 
                 # 下载资源
-                self.asset_downloader.download_assets(version_data, self.progress_callback)
+                self.services.asset_downloader.download_assets(version_data, self.progress_callback)
                 self.log_message("游戏资源下载完成")
                 
             except Exception as e:
@@ -586,7 +986,7 @@ class MinecraftLauncher:
                     version_data = json.load(f)
                 
                 # 下载依赖库
-                self.library_manager.download_libraries(version_data, self.progress_callback)
+                self.services.library_manager.download_libraries(version_data, self.progress_callback)
                 self.log_message("依赖库下载完成")
                 
                 # 重新检查依赖
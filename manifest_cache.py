@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+版本清单缓存 - 所有版本管理器共享的清单缓存，使用条件请求重新验证
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from version_catalog import VersionCatalog
+from file_utils import atomic_write_bytes, sha1_bytes
+from mirrors import resolve_url
+from tracing import span
+
+# v2清单为每个版本提供了版本JSON的sha1，可用于校验
+MANIFEST_URL = "https://launchermeta.mojang.com/mc/game/version_manifest_v2.json"
+
+
+class ManifestCache:
+    """缓存清单原始字节及ETag/Last-Modified，重复查询只需一次304或直接命中内存"""
+
+    def __init__(self, cache_dir=None, url=MANIFEST_URL, min_revalidate_interval=60, timeout=10):
+        if cache_dir is None:
+            cache_dir = Path.home() / ".amcl_cache"
+        self.cache_dir = Path(cache_dir)
+        self.url = url
+        self.min_revalidate_interval = min_revalidate_interval
+        self.timeout = timeout
+        self.data_path = self.cache_dir / "version_manifest.json"
+        self.meta_path = self.cache_dir / "version_manifest.meta.json"
+        self.catalog_path = self.cache_dir / "version_catalog.json"
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+
+        self.raw = None
+        self.meta = {}
+        self.validated_at = 0
+        self.offline = False
+        self._parsed = None
+        self._parsed_revision = None
+        self._catalog = None
+
+    def _load_from_disk(self):
+        """从磁盘载入上次成功获取的清单"""
+        if self.raw is not None or not self.data_path.exists():
+            return
+        try:
+            self.raw = self.data_path.read_bytes()
+            if self.meta_path.exists():
+                with open(self.meta_path, 'r', encoding='utf-8') as f:
+                    self.meta = json.load(f)
+            if self.meta.get('url') != self.url:
+                # 清单地址已变化，旧的验证信息不再适用
+                self.meta = {}
+        except Exception as e:
+            print(f"读取清单缓存失败: {e}")
+            self.raw = None
+            self.meta = {}
+
+    def _save(self, raw, headers):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.meta = {
+            'url': self.url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'sha1': sha1_bytes(raw),
+            'fetched_at': time.time(),
+        }
+        try:
+            atomic_write_bytes(self.data_path, raw)
+            atomic_write_bytes(self.meta_path, json.dumps(self.meta).encode('utf-8'))
+        except Exception as e:
+            print(f"保存清单缓存失败: {e}")
+
+    def get_raw(self, force_refresh=False):
+        """获取清单原始字节，必要时用条件请求重新验证"""
+        with self.lock:
+            self._load_from_disk()
+            fresh = time.monotonic() - self.validated_at < self.min_revalidate_interval
+            if self.raw is not None and fresh and not force_refresh:
+                return self.raw
+
+            headers = {}
+            if self.raw is not None:
+                if self.meta.get('etag'):
+                    headers['If-None-Match'] = self.meta['etag']
+                if self.meta.get('last_modified'):
+                    headers['If-Modified-Since'] = self.meta['last_modified']
+
+            try:
+                with span('manifest_fetch', conditional=bool(headers)) as fetch_span:
+                    response = self.session.get(resolve_url(self.url), headers=headers, timeout=self.timeout)
+                    fetch_span.set('status', response.status_code)
+                if response.status_code == 304 and self.raw is not None:
+                    pass
+                else:
+                    response.raise_for_status()
+                    self.raw = response.content
+                    self._save(self.raw, response.headers)
+                self.validated_at = time.monotonic()
+                self.offline = False
+            except requests.exceptions.RequestException as e:
+                if self.raw is None:
+                    raise Exception(f"获取版本清单失败: {e}")
+                # 离线时返回上次成功获取的副本；失败时间同样记为验证时间，
+                # min_revalidate_interval 内不再重试，避免每次查询都等待连接超时
+                self.offline = True
+                self.validated_at = time.monotonic()
+                print(f"无法连接清单服务器，使用缓存的版本清单: {e}")
+            return self.raw
+
+    @property
+    def revision(self):
+        """当前清单内容的SHA1，清单内容变化时改变"""
+        if self.raw is None:
+            return None
+        return self.meta.get('sha1') or sha1_bytes(self.raw)
+
+    def get_manifest(self, force_refresh=False):
+        """获取解析后的清单，同一内容只解析一次"""
+        raw = self.get_raw(force_refresh)
+        revision = self.revision
+        if self._parsed is None or self._parsed_revision != revision:
+            self._parsed = json.loads(raw)
+            self._parsed_revision = revision
+        return self._parsed
+
+    def get_catalog(self, force_refresh=False):
+        """获取当前清单对应的版本目录，优先使用内存或磁盘上的同版本目录"""
+        self.get_raw(force_refresh)
+        revision = self.revision
+        if self._catalog is not None and self._catalog.revision == revision:
+            return self._catalog
+
+        catalog = VersionCatalog.load(self.catalog_path, revision)
+        if catalog is None:
+            catalog = VersionCatalog.from_manifest(self.get_manifest(), revision)
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                catalog.save(self.catalog_path)
+            except Exception as e:
+                print(f"保存版本目录缓存失败: {e}")
+        self._catalog = catalog
+        return catalog
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_manifest_cache():
+    """获取进程内共享的清单缓存"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ManifestCache()
+        return _shared_cache
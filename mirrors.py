@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载镜像 - 将官方下载地址改写到配置的镜像（如局域网内的缓存代理）
+"""
+
+# 镜像路径的第一段 -> 官方地址
+UPSTREAMS = {
+    'launchermeta': 'https://launchermeta.mojang.com',
+    'piston-meta': 'https://piston-meta.mojang.com',
+    'piston-data': 'https://piston-data.mojang.com',
+    'launcher': 'https://launcher.mojang.com',
+    'libraries': 'https://libraries.minecraft.net',
+    'resources': 'https://resources.download.minecraft.net',
+}
+
+_mirror_base = ''
+
+
+def set_mirror(base_url):
+    """设置镜像地址，例如 http://192.168.1.10:25590；空字符串表示直接访问官方地址"""
+    global _mirror_base
+    _mirror_base = (base_url or '').rstrip('/')
+
+
+def get_mirror():
+    return _mirror_base
+
+
+def resolve_url(url):
+    """官方地址在配置了镜像时改写为 <镜像>/<名称>/<路径>，其他地址原样返回"""
+    if not _mirror_base or not url:
+        return url
+    for name, upstream in UPSTREAMS.items():
+        if url.startswith(upstream + '/'):
+            return f"{_mirror_base}/{name}{url[len(upstream):]}"
+    return url
+
+
+def upstream_url(mirror_path):
+    """镜像路径（/<名称>/<路径>）对应的官方地址，无法识别时返回None"""
+    name, _, rest = mirror_path.lstrip('/').partition('/')
+    upstream = UPSTREAMS.get(name)
+    if upstream is None or not rest:
+        return None
+    return f"{upstream}/{rest}"
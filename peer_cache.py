@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+局域网共享缓存 - 向局域网内的其他启动器提供本机已下载的资源、依赖库和版本文件，并优先从它们获取
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote
+
+import requests
+
+from install_job import InstallCancelled
+
+DEFAULT_PORT = 25580
+DISCOVERY_PORT = 25581
+DISCOVERY_MAGIC = b"ECL_PEER_DISCOVER"
+# 重新广播发现同伴的最小间隔（秒）
+DISCOVERY_INTERVAL = 60
+# 同伴连续失败次数达到上限后不再使用
+MAX_PEER_FAILURES = 3
+
+
+def allowed_path(relative_path):
+    """只共享内容可以按SHA1校验的文件：资源对象、依赖库和版本JAR"""
+    parts = relative_path.split('/')
+    if any(part in ('', '.', '..') for part in parts):
+        return False
+    if parts[:2] == ['assets', 'objects'] and len(parts) == 4:
+        return True
+    if parts[0] == 'libraries' and len(parts) >= 2:
+        return True
+    if parts[0] == 'versions' and len(parts) == 3 and parts[2] == f"{parts[1]}.jar":
+        return True
+    return False
+
+
+class _PeerRequestHandler(BaseHTTPRequestHandler):
+    """GET /<游戏目录中的相对路径>"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _resolve(self):
+        relative_path = unquote(self.path.split('?', 1)[0]).lstrip('/')
+        if not allowed_path(relative_path):
+            return None
+        path = (self.server.minecraft_path / relative_path).resolve()
+        # 依赖库可能是指向共享存储的符号链接，目标在游戏目录或共享存储中均可
+        if not any(root in path.parents for root in self.server.allowed_roots) or not path.is_file():
+            return None
+        return path
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        size = path.stat().st_size
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        if not send_body:
+            return
+        with open(path, 'rb') as f:
+            self.server.bytes_served += size
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PeerCacheServer:
+    """HTTP共享服务和UDP发现应答"""
+
+    def __init__(self, minecraft_path, port=DEFAULT_PORT, discovery_port=DISCOVERY_PORT, host='',
+                 shared_roots=()):
+        """shared_roots: 游戏目录中的符号链接可以指向的其他目录（例如共享存储的对象目录）"""
+        self.minecraft_path = Path(minecraft_path)
+        self.discovery_port = discovery_port
+        self.httpd = ThreadingHTTPServer((host, port), _PeerRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.minecraft_path = self.minecraft_path
+        self.httpd.allowed_roots = [self.minecraft_path.resolve()] + [Path(root).resolve() for root in shared_roots]
+        self.httpd.bytes_served = 0
+        self.port = self.httpd.server_address[1]
+        self._udp = None
+        self._threads = []
+
+    def start(self, discoverable=True):
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        if discoverable and self.discovery_port:
+            try:
+                self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self._udp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self._udp.bind(('', self.discovery_port))
+            except OSError as e:
+                print(f"局域网发现端口不可用: {e}")
+                self._udp = None
+            else:
+                thread = threading.Thread(target=self._answer_discovery, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def _answer_discovery(self):
+        reply = json.dumps({'port': self.port}).encode('utf-8')
+        while self._udp is not None:
+            try:
+                data, address = self._udp.recvfrom(1024)
+            except OSError:
+                break
+            if data == DISCOVERY_MAGIC:
+                try:
+                    self._udp.sendto(reply, address)
+                except OSError:
+                    pass
+
+    @property
+    def bytes_served(self):
+        return self.httpd.bytes_served
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._udp is not None:
+            udp, self._udp = self._udp, None
+            udp.close()
+
+
+def discover_peers(discovery_port=DISCOVERY_PORT, timeout=0.5, own_port=None):
+    """广播发现请求，返回应答的同伴地址列表 ['host:port']"""
+    peers = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.settimeout(timeout)
+        sock.sendto(DISCOVERY_MAGIC, ('<broadcast>', discovery_port))
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                data, (host, _) = sock.recvfrom(1024)
+                port = int(json.loads(data)['port'])
+            except socket.timeout:
+                break
+            except (OSError, ValueError, KeyError):
+                continue
+            if own_port and port == own_port and host in _local_addresses():
+                continue  # 自己的应答
+            address = f"{host}:{port}"
+            if address not in peers:
+                peers.append(address)
+    except OSError as e:
+        print(f"局域网发现失败: {e}")
+    finally:
+        sock.close()
+    return peers
+
+
+def _local_addresses():
+    addresses = {'127.0.0.1'}
+    try:
+        addresses.update(info[4][0] for info in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET))
+    except OSError:
+        pass
+    return addresses
+
+
+class PeerFetcher:
+    """先向同伴请求文件，校验SHA1后才使用；同伴不可信，校验失败的内容直接丢弃"""
+
+    def __init__(self, static_peers=(), discovery=False, discovery_port=DISCOVERY_PORT,
+                 own_port=None, timeout=5):
+        self.static_peers = list(static_peers)
+        self.discovery = discovery
+        self.discovery_port = discovery_port
+        self.own_port = own_port
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.discovered = []
+        self.discovered_at = 0
+        self.failures = {}
+        self.stats = {'hits': 0, 'misses': 0, 'bytes': 0, 'rejected': 0}
+
+    def peers(self):
+        """可用的同伴列表（静态配置优先），按需重新广播发现"""
+        with self.lock:
+            refresh = self.discovery and time.monotonic() - self.discovered_at > DISCOVERY_INTERVAL
+            if refresh:
+                # 只由一个线程广播，其他下载线程继续使用现有列表而不是等待
+                self.discovered_at = time.monotonic()
+        if refresh:
+            discovered = discover_peers(self.discovery_port, own_port=self.own_port)
+            with self.lock:
+                self.discovered = discovered
+        with self.lock:
+            candidates = self.static_peers + [p for p in self.discovered if p not in self.static_peers]
+            return [p for p in candidates if self.failures.get(p, 0) < MAX_PEER_FAILURES]
+
+    def _record(self, peer, ok):
+        with self.lock:
+            if ok:
+                self.failures.pop(peer, None)
+            else:
+                self.failures[peer] = self.failures.get(peer, 0) + 1
+
+    def fetch(self, relative_path, sha1, dest, on_bytes=None, checkpoint=None):
+        """从同伴获取文件并写到dest，成功返回True；没有同伴拥有该文件时返回False
+
+        checkpoint 在每个数据块之后调用，用于暂停和取消安装任务；它抛出的 InstallCancelled 会继续向上抛出
+        """
+        if not sha1:
+            return False
+        dest = Path(dest)
+        for peer in self.peers():
+            temp_path = dest.with_name(f"{dest.name}.{threading.get_ident()}.peer")
+            hasher = hashlib.sha1()
+            received = 0
+            try:
+                with self.session.get(f"http://{peer}/{relative_path}", stream=True,
+                                      timeout=self.timeout) as response:
+                    if response.status_code == 404:
+                        continue  # 同伴没有该文件，不算失败
+                    response.raise_for_status()
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    with open(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            if chunk:
+                                f.write(chunk)
+                                hasher.update(chunk)
+                                received += len(chunk)
+                                if on_bytes:
+                                    on_bytes(len(chunk), dest.name)
+                                if checkpoint:
+                                    checkpoint()
+                if hasher.hexdigest() != sha1:
+                    with self.lock:
+                        self.stats['rejected'] += 1
+                    raise Exception(f"同伴 {peer} 返回的 {dest.name} 哈希值不匹配")
+                os.replace(temp_path, dest)
+                self._record(peer, True)
+                with self.lock:
+                    self.stats['hits'] += 1
+                    self.stats['bytes'] += received
+                return True
+            except Exception as e:
+                if on_bytes and received:
+                    on_bytes(-received, dest.name)
+                if isinstance(e, InstallCancelled):
+                    raise
+                self._record(peer, False)
+                print(f"从同伴获取失败: {e}")
+            finally:
+                if temp_path.exists():
+                    os.remove(temp_path)
+        with self.lock:
+            self.stats['misses'] += 1
+        return False
@@ -8,7 +8,29 @@ import subprocess
 import threading
 import time
 import os
-import psutil  # 需要安装: pip install psutil
+
+from lazy_loader import lazy_import
+from tracing import span
+
+psutil = lazy_import('psutil')  # 需要安装: pip install psutil，首次使用时才导入
+
+# 优先级名称 -> (Windows优先级类名称, POSIX nice值)
+PRIORITY_LEVELS = {
+    'idle': ('IDLE_PRIORITY_CLASS', 19),
+    'below_normal': ('BELOW_NORMAL_PRIORITY_CLASS', 10),
+    'normal': ('NORMAL_PRIORITY_CLASS', 0),
+    'above_normal': ('ABOVE_NORMAL_PRIORITY_CLASS', -5),
+    'high': ('HIGH_PRIORITY_CLASS', -10),
+}
+
+def _priority_value(priority):
+    """将优先级名称转换为当前平台psutil可用的值"""
+    if priority not in PRIORITY_LEVELS:
+        raise ValueError(f"未知的进程优先级: {priority}")
+    class_name, nice_value = PRIORITY_LEVELS[priority]
+    if os.name == 'nt':
+        return getattr(psutil, class_name)
+    return nice_value
 
 class ProcessManager:
     def __init__(self):
@@ -16,9 +38,20 @@ class ProcessManager:
         self.monitor_thread = None
         self.output_thread = None
         self.is_running = False
+        self.launch_timer = None
+        self.exit_callback = None
+        self.lower_launcher_priority = False
+        self._launcher_priority = None
     
-    def start_process(self, cmd, cwd=None, callback=None):
-        """启动进程"""
+    def start_process(self, cmd, cwd=None, callback=None, launch_timer=None,
+                      priority=None, affinity=None, exit_callback=None, detached=False):
+        """启动进程
+
+        detached: 调用方启动后即退出，输出不再通过管道读取（管道在父进程退出后会被写满或断开），
+                  直接丢弃；游戏自身仍会写入实例目录下的 logs/latest.log
+        """
+        self.launch_timer = launch_timer
+        self.exit_callback = exit_callback
         try:
             # 改进Windows进程启动
             if os.name == 'nt':  # Windows系统
@@ -28,26 +61,39 @@ class ProcessManager:
                 creationflags = 0
             
             # 创建进程 - 改进参数处理
-            self.process = subprocess.Popen(
-                cmd,
-                cwd=cwd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                shell=False,
-                creationflags=creationflags,
-                bufsize=1  # 行缓冲
-            )
+            spawn_start = time.monotonic()
+            with span('spawn', executable=cmd[0], args=len(cmd)):
+                self.process = subprocess.Popen(
+                    cmd,
+                    cwd=cwd,
+                    stdout=subprocess.DEVNULL if detached else subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    universal_newlines=True,
+                    shell=False,
+                    creationflags=creationflags,
+                    bufsize=1  # 行缓冲
+                )
             
             self.is_running = True
+            if launch_timer:
+                launch_timer.add_phase('spawn', spawn_start, time.monotonic())
+                launch_timer.mark('spawned')
+            
+            # 应用进程优先级和CPU亲和性
+            for message in self.apply_scheduling(self.process.pid, priority, affinity):
+                if callback:
+                    callback(message)
+            if self.lower_launcher_priority:
+                self.lower_own_priority()
             
             # 启动输出监控
-            self.output_thread = threading.Thread(
-                target=self._monitor_output, 
-                args=(callback,),
-                daemon=True
-            )
-            self.output_thread.start()
+            if not detached:
+                self.output_thread = threading.Thread(
+                    target=self._monitor_output, 
+                    args=(callback,),
+                    daemon=True
+                )
+                self.output_thread.start()
             
             # 启动进程监控
             self.monitor_thread = threading.Thread(
@@ -61,6 +107,8 @@ class ProcessManager:
         except Exception as e:
             if callback:
                 callback(f"启动进程失败: {e}")
+            if launch_timer:
+                launch_timer.finish('spawn_failed')
             return False
     
     def _monitor_output(self, callback):
@@ -75,6 +123,8 @@ class ProcessManager:
                     if line:
                         if callback:
                             callback(line.strip())
+                        if self.launch_timer:
+                            self._observe_milestone(line, callback)
                     else:
                         # 短暂休眠避免CPU占用过高
                         time.sleep(0.1)
@@ -84,6 +134,13 @@ class ProcessManager:
             if callback:
                 callback(f"输出监控错误: {e}")
     
+    def _observe_milestone(self, line, callback):
+        """根据游戏日志记录启动里程碑"""
+        timer = self.launch_timer
+        milestone = timer.observe_line(line)
+        if milestone and callback:
+            callback(f"[启动计时] {milestone}: {timer.milestone_ms(milestone):.0f} ms")
+    
     def _monitor_process(self):
         """监控进程状态"""
         if not self.process:
@@ -93,6 +150,15 @@ class ProcessManager:
             # 等待进程结束
             return_code = self.process.wait()
             self.is_running = False
+            if self.launch_timer:
+                self.launch_timer.finish('exited', return_code)
+            self.restore_own_priority()
+            
+            # 等待输出线程读完剩余日志后再通知进程退出
+            if self.output_thread:
+                self.output_thread.join(timeout=2)
+            if self.exit_callback:
+                self.exit_callback(return_code)
             
             # 可以在这里添加进程结束的回调
             print(f"进程已退出，返回码: {return_code}")
@@ -101,6 +167,62 @@ class ProcessManager:
             print(f"进程监控错误: {e}")
             self.is_running = False
     
+    def apply_scheduling(self, pid, priority=None, affinity=None):
+        """通过psutil设置指定进程的优先级和CPU亲和性，返回提示信息列表"""
+        messages = []
+        try:
+            proc = psutil.Process(pid)
+        except psutil.Error as e:
+            return [f"无法获取进程 {pid}: {e}"]
+        
+        if priority and priority != 'normal':
+            try:
+                proc.nice(_priority_value(priority))
+                messages.append(f"进程优先级已设置为: {priority}")
+            except (psutil.Error, ValueError, OSError) as e:
+                messages.append(f"设置进程优先级失败: {e}")
+        
+        if affinity:
+            if not hasattr(proc, 'cpu_affinity'):
+                messages.append("当前系统不支持设置CPU亲和性")
+            else:
+                try:
+                    cpu_count = psutil.cpu_count() or 1
+                    cpus = sorted({int(cpu) for cpu in affinity if 0 <= int(cpu) < cpu_count})
+                    if cpus:
+                        proc.cpu_affinity(cpus)
+                        messages.append(f"CPU亲和性已设置为: {cpus}")
+                except (psutil.Error, ValueError, OSError) as e:
+                    messages.append(f"设置CPU亲和性失败: {e}")
+        
+        return messages
+    
+    def lower_own_priority(self, priority='below_normal'):
+        """游戏运行期间降低启动器自身（含下载线程）的优先级（仅Windows）
+
+        Windows的优先级类可以随时恢复；Linux的nice值按线程生效，非特权进程无法再调回，
+        之后创建的线程也会继承，启动器会一直处于低优先级直到重启，因此其他系统上不做调整。
+        """
+        if self._launcher_priority is not None or os.name != 'nt':
+            return
+        try:
+            me = psutil.Process()
+            self._launcher_priority = me.nice()
+            me.nice(_priority_value(priority))
+        except (psutil.Error, OSError, AttributeError) as e:
+            self._launcher_priority = None
+            print(f"降低启动器优先级失败: {e}")
+    
+    def restore_own_priority(self):
+        """恢复启动器自身的优先级"""
+        if self._launcher_priority is None:
+            return
+        original, self._launcher_priority = self._launcher_priority, None
+        try:
+            psutil.Process().nice(original)
+        except (psutil.Error, OSError, AttributeError) as e:
+            print(f"恢复启动器优先级失败: {e}")
+    
     def terminate_process(self):
         """终止进程"""
         if self.process and self.process.poll() is None:
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进度聚合器 - 汇总各工作线程的进度和日志，由UI线程按固定频率统一渲染
+"""
+
+import threading
+
+
+class ProgressSnapshot:
+    """某一时刻的进度状态"""
+
+    def __init__(self, message, progress, logs, changed):
+        self.message = message
+        self.progress = progress
+        self.logs = logs
+        self.changed = changed
+
+
+class ProgressAggregator:
+    """工作线程只写入最新状态，不直接触碰Tk；UI线程定时取快照渲染"""
+
+    def __init__(self, root, render, interval_ms=100, max_pending_logs=2000):
+        self.root = root
+        self.render = render
+        self.interval_ms = interval_ms
+        self.max_pending_logs = max_pending_logs
+        self.lock = threading.Lock()
+        self.message = None
+        self.progress = 0
+        self.pending_logs = []
+        self.pending_calls = []
+        self.dropped_logs = 0
+        self.changed = False
+        self.running = False
+        self._after_id = None
+
+    def update_progress(self, message, progress):
+        """记录最新进度（任意线程可调用），旧状态直接被覆盖"""
+        with self.lock:
+            self.message = message
+            self.progress = progress
+            self.changed = True
+
+    def add_log(self, message):
+        """追加日志（任意线程可调用），积压过多时丢弃最旧的行"""
+        with self.lock:
+            self.pending_logs.append(message)
+            if len(self.pending_logs) > self.max_pending_logs:
+                overflow = len(self.pending_logs) - self.max_pending_logs
+                del self.pending_logs[:overflow]
+                self.dropped_logs += overflow
+
+    def post(self, callback, *args):
+        """将回调交给UI线程在下一次渲染时执行（任意线程可调用）"""
+        with self.lock:
+            self.pending_calls.append((callback, args))
+
+    def take_snapshot(self):
+        """取出当前状态并清空待渲染的日志"""
+        with self.lock:
+            logs = self.pending_logs
+            if self.dropped_logs:
+                logs.insert(0, f"...（已省略 {self.dropped_logs} 行日志）")
+                self.dropped_logs = 0
+            snapshot = ProgressSnapshot(self.message, self.progress, logs, self.changed)
+            self.pending_logs = []
+            self.changed = False
+        return snapshot
+
+    def start(self):
+        """开始定时渲染（需在UI线程调用）"""
+        if not self.running:
+            self.running = True
+            self._tick()
+
+    def stop(self):
+        """停止定时渲染"""
+        self.running = False
+        if self._after_id:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _tick(self):
+        if not self.running:
+            return
+        with self.lock:
+            calls, self.pending_calls = self.pending_calls, []
+        for callback, args in calls:
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"执行界面回调失败: {e}")
+        snapshot = self.take_snapshot()
+        if snapshot.changed or snapshot.logs:
+            try:
+                self.render(snapshot)
+            except Exception as e:
+                print(f"渲染进度失败: {e}")
+        self._after_id = self.root.after(self.interval_ms, self._tick)
@@ -6,22 +6,22 @@
 
 import sys
 import os
+import importlib.util
 
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(__file__))
 
-from main import MinecraftLauncher
-
 if __name__ == "__main__":
-    # 检查依赖
-    try:
-        import tkinter
-        import requests
-    except ImportError as e:
-        print(f"缺少依赖: {e}")
+    # 检查依赖（只查找模块，不导入，避免拖慢启动）
+    missing = [name for name in ('tkinter', 'requests', 'psutil')
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"缺少依赖: {', '.join(missing)}")
         print("请运行: pip install -r requirements.txt")
         sys.exit(1)
     
+    from main import MinecraftLauncher
+    
     # 启动启动器
     launcher = MinecraftLauncher()
-    launcher.run()
\ No newline at end of file
+    launcher.run()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源下载测试 - 在本机HTTP服务上下载单个资源，追踪开启和关闭时都应成功
+"""
+
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+import tracing
+from asset_downloader import AssetDownloader
+
+PAYLOAD = bytes(range(256)) * 100
+PAYLOAD_SHA1 = hashlib.sha1(PAYLOAD).hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def asset_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/{PAYLOAD_SHA1[:2]}/{PAYLOAD_SHA1}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('traced', [False, True])
+def test_download_single_asset(tmp_path, asset_url, traced):
+    if traced:
+        tracing.enable()
+    try:
+        downloader = AssetDownloader(tmp_path)
+        target = tmp_path / "assets" / "objects" / PAYLOAD_SHA1[:2] / PAYLOAD_SHA1
+        target.parent.mkdir(parents=True)
+        assert downloader._download_file_threaded(asset_url, target, PAYLOAD_SHA1)
+        assert target.read_bytes() == PAYLOAD
+        if traced:
+            downloads = [event for event in tracing.chrome_trace_events() if event['name'] == 'download']
+            assert downloads[-1]['args']['bytes'] == len(PAYLOAD)
+    finally:
+        tracing.disable()
+        tracing.clear()
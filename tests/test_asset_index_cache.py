@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源索引缓存测试 - 只有通过SHA1校验的索引才会生成缓存
+"""
+
+import json
+
+import pytest
+
+from asset_index_cache import AssetIndexCache, AssetIndexView
+from file_utils import sha1_bytes
+
+GOOD_HASH = "aa" + "0" * 38
+BAD_HASH = "bb" + "0" * 38
+
+
+def _index_bytes(object_hash):
+    return json.dumps({'objects': {'a': {'hash': object_hash, 'size': 1}}}).encode('utf-8')
+
+
+def test_tampered_index_is_not_cached(tmp_path):
+    cache = AssetIndexCache(tmp_path)
+    index_path = tmp_path / "indexes" / "x.json"
+    index_path.parent.mkdir(parents=True)
+    good = _index_bytes(GOOD_HASH)
+    index_sha1 = sha1_bytes(good)
+
+    index_path.write_bytes(_index_bytes(BAD_HASH))
+    with pytest.raises(ValueError):
+        cache.load(index_path, index_sha1)
+    assert cache.get(index_sha1) is None
+
+    index_path.write_bytes(good)
+    with cache.load(index_path, index_sha1) as view:
+        assert [digest for digest, _ in view.iter_unique_objects()] == [GOOD_HASH]
+
+
+def test_truncated_cache_is_closed_and_rebuilt(tmp_path, monkeypatch):
+    cache = AssetIndexCache(tmp_path)
+    index_path = tmp_path / "indexes" / "x.json"
+    index_path.parent.mkdir(parents=True)
+    data = _index_bytes(GOOD_HASH)
+    index_path.write_bytes(data)
+    index_sha1 = sha1_bytes(data)
+    cache.load(index_path, index_sha1).close()
+    cache_path = cache.cache_path(index_sha1)
+    cache_path.write_bytes(cache_path.read_bytes()[:10])
+
+    closed = []
+    original_close = AssetIndexView.close
+    monkeypatch.setattr(AssetIndexView, 'close', lambda self: closed.append(self) or original_close(self))
+    assert cache.get(index_sha1) is None
+    assert len(closed) == 1 and closed[0]._file.closed
+
+    with cache.load(index_path, index_sha1) as view:
+        assert [digest for digest, _ in view.iter_unique_objects()] == [GOOD_HASH]
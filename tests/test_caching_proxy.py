@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缓存代理测试 - 不完整或哈希值不匹配的上游响应不能进入缓存
+"""
+
+import hashlib
+
+import pytest
+
+pytest.importorskip("requests")
+
+from caching_proxy import CachingProxy
+
+DATA = b"asset object data"
+DATA_SHA1 = hashlib.sha1(DATA).hexdigest()
+ASSET_URL = f"https://resources.download.minecraft.net/{DATA_SHA1[:2]}/{DATA_SHA1}"
+LIBRARY_URL = "https://libraries.minecraft.net/a/b/1.0/b-1.0.jar"
+
+
+class _Response:
+    def __init__(self, body, headers=None):
+        self.status_code = 200
+        self.body = body
+        self.headers = headers if headers is not None else {'Content-Length': str(len(body))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        yield self.body
+
+
+class _Session:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def get(self, url, **kwargs):
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    proxy = CachingProxy(tmp_path / "cache", port=0, host='127.0.0.1')
+    yield proxy
+    proxy.httpd.server_close()
+
+
+def test_mismatched_asset_is_not_cached(proxy):
+    proxy.session = _Session(_Response(b"<html>captive portal</html>"), _Response(DATA))
+    with pytest.raises(Exception, match="哈希值不匹配"):
+        proxy.fetch(ASSET_URL)
+    assert proxy.cache.total_bytes == 0
+
+    path, size = proxy.fetch(ASSET_URL)
+    assert path.read_bytes() == DATA
+
+
+def test_truncated_response_is_not_cached(proxy):
+    proxy.session = _Session(_Response(DATA[:5], {'Content-Length': str(len(DATA))}))
+    with pytest.raises(Exception, match="不完整"):
+        proxy.fetch(LIBRARY_URL)
+    assert proxy.cache.total_bytes == 0
+
+
+def test_invalidate_drops_entry(proxy):
+    proxy.session = _Session(_Response(b"old"), _Response(b"new"))
+    proxy.fetch(LIBRARY_URL)
+    assert proxy.invalidate(LIBRARY_URL)
+    path, _ = proxy.fetch(LIBRARY_URL)
+    assert path.read_bytes() == b"new"
+    assert proxy.cache.total_bytes == 3
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏日志存储测试 - 停止输出时缓冲区按时写出，轮转时检查空间预算
+"""
+
+import os
+import time
+
+import game_log_store
+from game_log_store import GameLogReader, GameLogStore
+
+
+def test_idle_writer_flushes_buffer(tmp_path, monkeypatch):
+    monkeypatch.setattr(game_log_store, 'FLUSH_INTERVAL', 0.1)
+    writer = GameLogStore(tmp_path).open_session("inst")
+    try:
+        writer.append("first line")
+        writer.append("second line")
+        deadline = time.monotonic() + 2
+        while writer.buffer and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert GameLogReader(writer.log_path).tail(10) == ["first line", "second line"]
+    finally:
+        writer.close()
+
+
+def test_rotation_enforces_budget(tmp_path):
+    store = GameLogStore(tmp_path, max_total_bytes=64 * 1024)
+    old_dir = store.instance_dir("old")
+    old_dir.mkdir(parents=True)
+    old_log = old_dir / "20000101-000000.log.gz"
+    old_log.write_bytes(b"x" * 32 * 1024)
+    os.utime(old_log, (0, 0))
+
+    writer = store.open_session("inst")
+    writer.max_file_bytes = 16 * 1024
+    try:
+        for _ in range(8 * game_log_store.BLOCK_LINES):
+            writer.append(os.urandom(16).hex())
+        assert writer.part > 0
+        assert not old_log.exists()
+        assert writer.current_path.exists()
+    finally:
+        writer.close()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+垃圾回收测试 - 无法确定已安装版本引用的资源时必须中止，不能删除任何文件
+"""
+
+import json
+
+import pytest
+
+from file_utils import sha1_bytes
+from garbage_collector import GarbageCollector
+
+OBJECT_HASH = "ab" + "0" * 38
+
+
+def _install_version(game_dir, version_id, index_id, index_sha1=None):
+    version_dir = game_dir / "versions" / version_id
+    version_dir.mkdir(parents=True)
+    asset_index = {'id': index_id}
+    if index_sha1:
+        asset_index['sha1'] = index_sha1
+    (version_dir / f"{version_id}.json").write_text(json.dumps({
+        'id': version_id,
+        'type': 'release',
+        'assetIndex': asset_index,
+        'libraries': [],
+    }), encoding='utf-8')
+
+
+def _add_object(game_dir):
+    object_path = game_dir / "assets" / "objects" / OBJECT_HASH[:2] / OBJECT_HASH
+    object_path.parent.mkdir(parents=True)
+    object_path.write_bytes(b"data")
+    return object_path
+
+
+def test_missing_asset_index_aborts_collection(tmp_path):
+    _install_version(tmp_path, "1.0", "1.0")
+    object_path = _add_object(tmp_path)
+
+    with pytest.raises(Exception, match="资源索引"):
+        GarbageCollector(tmp_path).collect(dry_run=False)
+    assert object_path.exists()
+
+
+def test_mismatched_asset_index_aborts_collection(tmp_path):
+    expected = json.dumps({'objects': {'a': {'hash': OBJECT_HASH, 'size': 4}}}).encode('utf-8')
+    _install_version(tmp_path, "1.0", "1.0", index_sha1=sha1_bytes(expected))
+    (tmp_path / "assets" / "indexes").mkdir(parents=True)
+    (tmp_path / "assets" / "indexes" / "1.0.json").write_text(
+        json.dumps({'objects': {}}), encoding='utf-8')
+    object_path = _add_object(tmp_path)
+
+    with pytest.raises(Exception, match="哈希值不匹配"):
+        GarbageCollector(tmp_path).collect(dry_run=False)
+    assert object_path.exists()
+
+
+def test_unreadable_version_json_aborts_collection(tmp_path):
+    _install_version(tmp_path, "1.0", "1.0")
+    (tmp_path / "assets" / "indexes").mkdir(parents=True)
+    (tmp_path / "assets" / "indexes" / "1.0.json").write_text(
+        json.dumps({'objects': {'a': {'hash': OBJECT_HASH, 'size': 4}}}), encoding='utf-8')
+    broken = tmp_path / "versions" / "1.1"
+    broken.mkdir()
+    (broken / "1.1.json").write_text("{", encoding='utf-8')
+    object_path = _add_object(tmp_path)
+
+    with pytest.raises(Exception, match="1.1"):
+        GarbageCollector(tmp_path).collect(dry_run=False)
+    assert object_path.exists()
+
+
+def test_referenced_objects_are_kept(tmp_path):
+    _install_version(tmp_path, "1.0", "1.0")
+    (tmp_path / "assets" / "indexes").mkdir(parents=True)
+    (tmp_path / "assets" / "indexes" / "1.0.json").write_text(
+        json.dumps({'objects': {'a': {'hash': OBJECT_HASH, 'size': 4}}}), encoding='utf-8')
+    object_path = _add_object(tmp_path)
+
+    report = GarbageCollector(tmp_path).collect(dry_run=False)
+    assert object_path.exists()
+    assert report.files == []
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+追踪测试 - 已退出线程的缓冲区会被释放，不同线程的区间不会合并到同一个线程ID
+"""
+
+import threading
+
+import tracing
+
+
+def _work():
+    with tracing.span('work'):
+        pass
+
+
+def _record_in_thread():
+    thread = threading.Thread(target=_work)
+    thread.start()
+    thread.join()
+
+
+def test_finished_thread_buffers_are_bounded(monkeypatch):
+    monkeypatch.setattr(tracing, 'MAX_FINISHED_THREADS', 4)
+    tracing.enable()
+    try:
+        tracing.clear()
+        for _ in range(20):
+            _record_in_thread()
+        with tracing._buffers_lock:
+            tracing._prune_finished()
+            finished = [record for record in tracing._buffers if not record[1].is_alive()]
+        assert len(finished) == 4
+
+        events = [event for event in tracing.chrome_trace_events() if event['name'] == 'work']
+        assert len(events) == 4
+        assert len({event['tid'] for event in events}) == 4
+    finally:
+        tracing.disable()
+        tracing.clear()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能追踪 - 记录带属性的命名区间，可导出为Chrome trace格式（chrome://tracing、Perfetto）
+
+未启用时 span() 只返回一个共享的空对象，几乎没有开销。
+设置环境变量 ECL_TRACE=<输出文件> 可在进程启动时启用，并在退出时自动导出。
+"""
+
+import atexit
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# 每个线程最多保留的区间数，超出时丢弃最早的区间
+MAX_SPANS_PER_THREAD = 100000
+# 最多保留多少个已退出线程的缓冲区（供导出），超出时丢弃最早的
+MAX_FINISHED_THREADS = 64
+
+_enabled = False
+_local = threading.local()
+_buffers = []  # (追踪线程ID, 线程对象, 区间缓冲区)，按创建顺序
+_buffers_lock = threading.Lock()
+# 追踪线程ID按缓冲区创建顺序分配；get_ident() 在线程退出后会被复用，不能区分不同线程
+_next_tid = itertools.count(1)
+_pid = os.getpid()
+
+
+class _NoopSpan:
+    """未启用追踪时使用的空区间"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """一个已启用的区间，退出时写入当前线程的缓冲区"""
+
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        _thread_buffer().append((self.name, self.category, self.start, end - self.start, self.args))
+        return False
+
+    def set(self, key, value):
+        """补充区间属性（例如下载完成后的字节数）"""
+        self.args[key] = value
+
+
+def _thread_buffer():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = deque(maxlen=MAX_SPANS_PER_THREAD)
+        with _buffers_lock:
+            _prune_finished()
+            _buffers.append((next(_next_tid), threading.current_thread(), buffer))
+    return buffer
+
+
+def _prune_finished():
+    """在锁内调用：释放已退出线程的缓冲区，空的直接丢弃，其余最多保留 MAX_FINISHED_THREADS 个"""
+    finished = []
+    for record in list(_buffers):
+        if record[1].is_alive():
+            continue
+        if record[2]:
+            finished.append(record)
+        else:
+            _buffers.remove(record)
+    for record in finished[:max(len(finished) - MAX_FINISHED_THREADS, 0)]:
+        _buffers.remove(record)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, category='ecl', **args):
+    """with span('download', url=url) as s: ... ；未启用时返回空对象"""
+    if not _enabled:
+        return _NOOP
+    return Span(name, category, args)
+
+
+def traced(name=None, category='ecl'):
+    """装饰器：把整个函数调用记录为一个区间"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def clear():
+    """清空所有线程已记录的区间"""
+    with _buffers_lock:
+        for _, _, buffer in _buffers:
+            buffer.clear()
+        _prune_finished()
+
+
+def chrome_trace_events():
+    """生成Chrome trace事件列表（完整事件ph=X，时间单位为微秒）"""
+    with _buffers_lock:
+        buffers = [(tid, thread.name, list(buffer)) for tid, thread, buffer in _buffers]
+    events = []
+    for tid, thread_name, records in buffers:
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': _pid, 'tid': tid,
+                       'args': {'name': thread_name}})
+        for name, category, start, duration, args in records:
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': _pid, 'tid': tid,
+                           'ts': start / 1000, 'dur': duration / 1000, 'args': args})
+    return events
+
+
+def export_chrome_trace(path):
+    """导出为JSON文件，可直接用 chrome://tracing 或 ui.perfetto.dev 打开"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': chrome_trace_events(), 'displayTimeUnit': 'ms'}, f,
+                  ensure_ascii=False, default=str)
+    return path
+
+
+def _export_at_exit(path):
+    try:
+        export_chrome_trace(path)
+        print(f"追踪数据已导出: {path}")
+    except Exception as e:
+        print(f"导出追踪数据失败: {e}")
+
+
+def enable_with_export(path):
+    """启用追踪，并在进程退出时导出到path"""
+    enable()
+    atexit.register(_export_at_exit, path)
+
+
+if os.environ.get('ECL_TRACE'):
+    enable_with_export(os.environ['ECL_TRACE'])
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+界面卡顿监测 - 用 root.after 心跳测量Tk事件循环的延迟，卡顿时从后台线程采样主线程调用栈
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tkinter
+import traceback
+from collections import Counter
+from pathlib import Path
+
+from file_utils import atomic_write_bytes
+
+# 延迟直方图的桶上限（毫秒），最后一个桶收集所有更大的值
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# 每次卡顿报告保留的不同调用栈数
+MAX_STACKS_PER_STALL = 5
+# 定期写出直方图的间隔（秒）
+SAVE_INTERVAL = 60
+
+_TKINTER_DIR = os.path.dirname(tkinter.__file__)
+
+
+def describe_stack(frames):
+    """从主线程调用栈中找出正在执行的Tk回调，以及是否处于update()中"""
+    callback = None
+    in_update = False
+    for index, frame in enumerate(frames):
+        if os.path.dirname(frame.filename) != _TKINTER_DIR:
+            continue
+        if frame.name in ('update', 'update_idletasks'):
+            in_update = True
+        # tkinter通过CallWrapper.__call__调用after回调和事件处理函数，下一帧就是回调本身
+        if frame.name == '__call__' and index + 1 < len(frames):
+            following = frames[index + 1]
+            callback = f"{following.name} ({os.path.basename(following.filename)}:{following.lineno})"
+    return callback, in_update
+
+
+class UIWatchdog:
+    """心跳按interval_ms调度，实际延迟超过阈值时记录卡顿
+
+    后台线程发现心跳超过 interval + 阈值 仍未执行时开始采样主线程调用栈，
+    心跳恢复后在后台线程中把这次卡顿的时长和出现最多的调用栈写入 ui_stalls.jsonl，
+    主线程上只做计数，不做汇总和磁盘读写。
+    运行期间定期写出 ui_lag.json，停止时把本次运行的统计追加到 ui_lag_history.jsonl。
+    """
+
+    def __init__(self, root, report_dir, interval_ms=100, stall_threshold_ms=250, sample_interval=0.02):
+        self.root = root
+        self.report_dir = Path(report_dir)
+        self.interval = interval_ms / 1000
+        self.stall_threshold = stall_threshold_ms / 1000
+        self.sample_interval = sample_interval
+        self.main_thread_id = threading.main_thread().ident
+        self.lock = threading.Lock()
+        self._write_lock = threading.Lock()  # 多个卡顿报告线程追加同一文件
+
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.beats = 0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self.stall_count = 0
+
+        self._expected = None
+        self._last_beat = None
+        self._samples = []
+        self._stall_started = None
+        self._after_id = None
+        self._stop_event = threading.Event()
+        self._sampler = None
+        self._last_save = time.monotonic()
+
+    def start(self):
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        now = time.monotonic()
+        self._last_beat = now
+        self._expected = now + self.interval
+        self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+        self._sampler = threading.Thread(target=self._sample_loop, name='ui-watchdog', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        self.save()
+        try:
+            with open(self.report_dir / "ui_lag_history.jsonl", 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.summary(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"保存界面延迟历史失败: {e}")
+
+    def _beat(self):
+        now = time.monotonic()
+        lag_ms = max(0.0, (now - self._expected) * 1000)
+        bucket = next((i for i, limit in enumerate(LAG_BUCKETS_MS) if lag_ms <= limit), len(LAG_BUCKETS_MS))
+        with self.lock:
+            self.histogram[bucket] += 1
+            self.beats += 1
+            self.total_lag_ms += lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self._last_beat = now
+            stall = self._finish_stall(now) if self._stall_started is not None else None
+        if stall is not None:
+            threading.Thread(target=self._write_stall, args=stall, daemon=True).start()
+        if now - self._last_save > SAVE_INTERVAL:
+            self._last_save = now
+            threading.Thread(target=self.save, daemon=True).start()
+        if not self._stop_event.is_set():
+            self._expected = now + self.interval
+            self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.sample_interval):
+            with self.lock:
+                overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue < self.stall_threshold:
+                continue
+            frame = sys._current_frames().get(self.main_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            with self.lock:
+                if self._stall_started is None:
+                    self._stall_started = self._last_beat + self.interval
+                    self._samples = []
+                self._samples.append(stack)
+
+    def _finish_stall(self, now):
+        """在锁内调用：结束一次卡顿，返回(时长毫秒, 采样)，汇总留给后台线程"""
+        duration_ms = (now - self._stall_started) * 1000
+        samples, self._samples = self._samples, []
+        self._stall_started = None
+        self.stall_count += 1
+        return duration_ms, samples
+
+    @staticmethod
+    def _summarize_stall(duration_ms, samples):
+        """按调用栈汇总一次卡顿的采样"""
+        counts = Counter()
+        details = {}
+        for stack in samples:
+            key = tuple((f.filename, f.lineno, f.name) for f in stack)
+            counts[key] += 1
+            details.setdefault(key, stack)
+        stacks = []
+        for key, count in counts.most_common(MAX_STACKS_PER_STALL):
+            stack = details[key]
+            callback, in_update = describe_stack(stack)
+            stacks.append({
+                'samples': count,
+                'callback': callback,
+                'in_update': in_update,
+                'frames': [f"{f.filename}:{f.lineno} {f.name}" for f in stack],
+            })
+        return {
+            'time': time.time(),
+            'duration_ms': round(duration_ms, 1),
+            'samples': len(samples),
+            'stacks': stacks,
+        }
+
+    def _write_stall(self, duration_ms, samples):
+        """后台线程调用：汇总并追加一条卡顿报告"""
+        line = json.dumps(self._summarize_stall(duration_ms, samples), ensure_ascii=False) + "\n"
+        try:
+            with self._write_lock:
+                with open(self.report_dir / "ui_stalls.jsonl", 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except OSError as e:
+            print(f"写入卡顿报告失败: {e}")
+
+    def percentile_ms(self, fraction):
+        """按直方图估算延迟分位数（返回所在桶的上限）"""
+        with self.lock:
+            histogram = list(self.histogram)
+            total = self.beats
+        if not total:
+            return 0.0
+        target = fraction * total
+        running = 0
+        for index, count in enumerate(histogram):
+            running += count
+            if running >= target:
+                return float(LAG_BUCKETS_MS[index]) if index < len(LAG_BUCKETS_MS) else self.max_lag_ms
+        return self.max_lag_ms
+
+    def summary(self):
+        with self.lock:
+            beats = self.beats
+            result = {
+                'beats': beats,
+                'interval_ms': self.interval * 1000,
+                'mean_lag_ms': round(self.total_lag_ms / beats, 2) if beats else 0.0,
+                'max_lag_ms': round(self.max_lag_ms, 1),
+                'stalls': self.stall_count,
+                'buckets_ms': list(LAG_BUCKETS_MS) + ['inf'],
+                'histogram': list(self.histogram),
+            }
+        result['p50_ms'] = self.percentile_ms(0.5)
+        result['p95_ms'] = self.percentile_ms(0.95)
+        result['p99_ms'] = self.percentile_ms(0.99)
+        return result
+
+    def save(self):
+        """写出本次运行的延迟直方图（ui_lag.json）"""
+        data = self.summary()
+        data['updated'] = time.time()
+        try:
+            atomic_write_bytes(self.report_dir / "ui_lag.json",
+                               json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8'))
+        except OSError as e:
+            print(f"保存界面延迟统计失败: {e}")
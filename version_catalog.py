@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+版本目录 - 每个清单版本只构建一次的索引结构（ID查找、分类列表、预解析时间）
+"""
+
+import datetime
+import json
+import os
+from pathlib import Path
+
+CATALOG_FORMAT = 1
+
+# 特殊愚人节版本ID（发布日期不在4月1日）
+FOOL_VERSION_IDS = frozenset({
+    "15w14a", "1.RV-Pre1", "3d shareware v1.34", "20w14infinite", "22w13oneblockatatime",
+    "23w13a_or_b", "24w14potato", "25w14craftmine"
+})
+
+CATEGORIES = ('release', 'snapshot', 'fool', 'ancient')
+
+BEIJING_TZ = datetime.timezone(datetime.timedelta(hours=8))
+
+
+def _categorize(version_id, version_type, utc_time):
+    """根据版本类型和发布日期分类"""
+    # 4/1 自动视作愚人节版
+    if version_id in FOOL_VERSION_IDS or (utc_time.month == 4 and utc_time.day == 1):
+        return 'fool'
+    if version_type == 'release':
+        return 'release'
+    if version_type == 'snapshot':
+        return 'snapshot'
+    return 'ancient'
+
+
+class VersionCatalog:
+    """清单的索引视图：id -> 条目字典、分类列表、预解析的发布时间"""
+
+    def __init__(self, revision, entries):
+        self.revision = revision
+        self.entries = entries
+        self.by_id = {entry['id']: entry for entry in entries}
+        self.categories = {category: [] for category in CATEGORIES}
+        for entry in entries:
+            self.categories[entry['category']].append(entry)
+
+    @classmethod
+    def from_manifest(cls, manifest, revision=None):
+        """从清单构建目录（每个清单版本只需执行一次）"""
+        entries = []
+        for version in manifest['versions']:
+            utc_time = datetime.datetime.fromisoformat(version['releaseTime'])
+            beijing_time = utc_time.astimezone(BEIJING_TZ)
+            entries.append({
+                'id': version['id'],
+                'type': version['type'],
+                'url': version['url'],
+                'sha1': version.get('sha1'),
+                'category': _categorize(version['id'], version['type'], utc_time),
+                'release_timestamp': utc_time.timestamp(),
+                'release_time': beijing_time.strftime("%Y-%m-%d %H:%M"),
+                'original_data': version,
+            })
+        return cls(revision, entries)
+
+    def get(self, version_id):
+        """按ID查找版本，O(1)"""
+        return self.by_id.get(version_id)
+
+    def __contains__(self, version_id):
+        return version_id in self.by_id
+
+    def __len__(self):
+        return len(self.entries)
+
+    def versions(self, version_type=None):
+        """按清单顺序返回版本条目，可按原始类型过滤"""
+        if version_type is None:
+            return list(self.entries)
+        return [entry for entry in self.entries if entry['type'] == version_type]
+
+    def categorized(self):
+        """返回按分类组织的版本列表"""
+        return {category: list(entries) for category, entries in self.categories.items()}
+
+    def save(self, path):
+        """持久化目录，供下次启动直接载入"""
+        path = Path(path)
+        data = {'format': CATALOG_FORMAT, 'revision': self.revision, 'entries': self.entries}
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, revision):
+        """载入持久化的目录，清单版本不匹配时返回None"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"读取版本目录缓存失败: {e}")
+            return None
+        if data.get('format') != CATALOG_FORMAT or data.get('revision') != revision:
+            return None
+        return cls(revision, data['entries'])
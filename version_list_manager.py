@@ -4,7 +4,6 @@
 """
 
 import requests
-import datetime
 import time
 import json
 from pathlib import Path
@@ -12,6 +11,62 @@ import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
+from manifest_cache import get_manifest_cache
+from version_catalog import VersionCatalog, CATEGORIES as VERSION_CATEGORIES
+from file_utils import atomic_write_bytes, verify_bytes
+from mirrors import resolve_url
+
+
+class VersionSearchIndex:
+    """版本搜索索引，预先计算小写ID、类型和年份"""
+    
+    def __init__(self, categorized_versions):
+        self.entries = {}
+        for category, versions in categorized_versions.items():
+            self.entries[category] = [
+                (version['id'].lower(), version['type'], version['release_time'][:4], version)
+                for version in versions
+            ]
+    
+    @staticmethod
+    def parse_query(query):
+        """解析查询条件，返回(ID前缀列表, 类型, 年份)"""
+        prefixes = []
+        version_type = None
+        year = None
+        for token in query.lower().split():
+            if token.startswith('type:'):
+                version_type = token[5:]
+            elif token in ('release', 'snapshot', 'old_beta', 'old_alpha'):
+                version_type = token
+            elif len(token) == 4 and token.isdigit() and token.startswith('20'):
+                year = token
+            else:
+                prefixes.append(token)
+        return prefixes, version_type, year
+    
+    @classmethod
+    def is_refinement(cls, old_query, new_query):
+        """新查询是否只是在旧查询的ID前缀上追加了字符（此时可在旧结果中继续筛选）"""
+        old_prefixes, old_type, old_year = cls.parse_query(old_query)
+        new_prefixes, new_type, new_year = cls.parse_query(new_query)
+        return (old_type == new_type and old_year == new_year
+                and len(old_prefixes) == len(new_prefixes)
+                and all(new.startswith(old) for old, new in zip(old_prefixes, new_prefixes)))
+    
+    def filter(self, category, query, base=None):
+        """过滤指定分类的条目；base为上一次的结果时在其基础上继续筛选"""
+        entries = base if base is not None else self.entries.get(category, [])
+        if not query:
+            return entries
+        prefixes, version_type, year = self.parse_query(query)
+        return [
+            entry for entry in entries
+            if (version_type is None or entry[1] == version_type)
+            and (year is None or entry[2] == year)
+            and all(entry[0].startswith(prefix) for prefix in prefixes)
+        ]
+
 
 class VersionListManager:
     """版本列表管理器类"""
@@ -20,90 +75,21 @@ class VersionListManager:
         self.minecraft_path = Path(minecraft_path)
         self.progress_callback = progress_callback or self._default_progress_callback
         self.versions_cache = {}
-        self.cache_file = Path.home() / ".amcl_cache" / "version_cache.json"
         
     def _default_progress_callback(self, message, progress):
         """默认进度回调函数"""
         pass
     
-    def get_cache_path(self):
-        """获取缓存文件路径"""
-        cache_dir = Path.home() / ".amcl_cache"
-        cache_dir.mkdir(exist_ok=True)
-        return cache_dir / "version_cache.json"
-    
     def load_versions_from_api(self, force_refresh=False):
-        """从API加载版本数据"""
+        """从共享的清单缓存加载版本数据（离线时使用上次成功获取的清单）"""
         try:
-            # 尝试从缓存加载
-            cache_path = self.get_cache_path()
-            if not force_refresh and cache_path.exists():
-                cache_time = cache_path.stat().st_mtime
-                # 如果缓存时间在1小时内，使用缓存
-                if time.time() - cache_time < 3600:
-                    with open(cache_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        return self.process_versions_data(data)
-            
-            # 从API获取数据
-            response = requests.get('https://bmclapi2.bangbang93.com/mc/game/version_manifest.json', timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # 保存到缓存
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False)
-            
-            return self.process_versions_data(data)
-            
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"获取版本数据失败: {e}")
+            return get_manifest_cache().get_catalog(force_refresh).categorized()
         except Exception as e:
             raise Exception(f"处理版本数据失败: {e}")
     
     def process_versions_data(self, data):
         """处理版本数据"""
-        categorized_versions = {
-            'release': [],
-            'snapshot': [],
-            'fool': [],
-            'ancient': []
-        }
-        
-        for version_manifest in data['versions']:
-            release_time = version_manifest['releaseTime']
-            utc_time = datetime.datetime.strptime(release_time, "%Y-%m-%dT%H:%M:%S%z")
-            
-            # 判断是否为特殊愚人节版本ID
-            fool_version_ids = {
-                "15w14a", "1.RV-Pre1", "3d shareware v1.34", "20w14infinite", "22w13oneblockatatime", "23w13a_or_b", "24w14potato", "25w14craftmine"
-            }
-            is_special_fool_version = version_manifest['id'] in fool_version_ids
-            # 4/1 自动视作愚人节版
-            is_fool_version = utc_time.month == 4 and utc_time.day == 1
-            
-            # 根据版本类型分类
-            category = 'fool' if is_fool_version or is_special_fool_version else \
-                       'release' if version_manifest['type'] == 'release' else \
-                       'snapshot' if version_manifest['type'] == 'snapshot' else \
-                       'ancient'
-            
-            if category in categorized_versions:
-                # 将UTC时间转换为北京时间
-                beijing_time = utc_time.astimezone(datetime.timezone(datetime.timedelta(hours=8)))
-                formatted_time = beijing_time.strftime("%Y-%m-%d %H:%M")
-                
-                version_info = {
-                    'id': version_manifest['id'],
-                    'type': version_manifest['type'],
-                    'release_time': formatted_time,
-                    'url': version_manifest['url'],
-                    'original_data': version_manifest
-                }
-                
-                categorized_versions[category].append(version_info)
-        
-        return categorized_versions
+        return VersionCatalog.from_manifest(data).categorized()
     
     def get_category_label(self, category):
         """根据分类获取标签"""
@@ -123,9 +109,11 @@ class VersionListManager:
         try:
             # 获取版本详情
             version_url = version_info['url']
-            response = requests.get(version_url, timeout=10)
+            response = requests.get(resolve_url(version_url), timeout=10)
             response.raise_for_status()
-            version_details = response.json()
+            raw_json = response.content
+            verify_bytes(raw_json, version_info.get('sha1'), f"版本配置 {version_info['id']}")
+            version_details = json.loads(raw_json)
             
             # 获取下载链接
             download_url = version_details['downloads']['client']['url']
@@ -144,10 +132,9 @@ class VersionListManager:
             success = self._download_file(download_url, file_path, progress_callback)
             
             if success:
-                # 保存版本JSON文件
+                # 按原始字节保存版本JSON文件
                 json_file_path = download_dir / f"{version_info['id']}.json"
-                with open(json_file_path, 'w', encoding='utf-8') as f:
-                    json.dump(version_details, f, indent=4)
+                atomic_write_bytes(json_file_path, raw_json)
                 
                 if progress_callback:
                     progress_callback(f"版本 {version_info['id']} 下载完成", 100)
@@ -164,7 +151,7 @@ class VersionListManager:
         try:
             # 获取版本详情
             version_url = version_info['url']
-            response = requests.get(version_url, timeout=10)
+            response = requests.get(resolve_url(version_url), timeout=10)
             response.raise_for_status()
             version_details = response.json()
             
@@ -189,7 +176,7 @@ class VersionListManager:
     def _download_file(self, url, file_path, progress_callback=None):
         """下载文件的通用方法"""
         try:
-            with requests.get(url, stream=True, timeout=30) as r:
+            with requests.get(resolve_url(url), stream=True, timeout=30) as r:
                 r.raise_for_status()
                 total_size = int(r.headers.get('content-length', 0))
                 downloaded_size = 0
@@ -236,6 +223,13 @@ class VersionListDialog:
         self.dialog.transient(parent)
         self.dialog.grab_set()
         
+        self.search_index = None
+        self.visible_versions = {}
+        self._filter_cache = {}
+        self._loading = False
+        self._load_result = None
+        self._search_after_id = None
+        
         self.setup_ui()
         self.load_versions()
     
@@ -250,6 +244,18 @@ class VersionListDialog:
                                font=("Arial", 14, "bold"))
         title_label.pack(pady=10)
         
+        # 搜索框：支持版本号前缀、类型（如 type:snapshot）和年份（如 2019）
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X)
+        ttk.Label(search_frame, text="搜索:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        search_entry.focus_set()
+        self.search_var.trace('w', self._on_search_changed)
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(search_frame, textvariable=self.status_var).pack(side=tk.RIGHT)
+        
         # 创建标签页容器
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -258,8 +264,7 @@ class VersionListDialog:
         self.category_frames = {}
         self.category_lists = {}
         
-        categories = ['release', 'snapshot', 'fool', 'ancient']
-        for category in categories:
+        for category in VERSION_CATEGORIES:
             frame = ttk.Frame(self.notebook)
             self.notebook.add(frame, text=self.version_manager.get_category_label(category))
             
@@ -297,59 +302,97 @@ class VersionListDialog:
         ttk.Button(button_frame, text="关闭", 
                   command=self.dialog.destroy).pack(side=tk.RIGHT, padx=5)
     
-    def load_versions(self):
-        """加载版本数据"""
-        try:
-            categorized_versions = self.version_manager.load_versions_from_api()
-            
-            for category, versions in categorized_versions.items():
-                listbox = self.category_lists.get(category)
-                if listbox:
-                    listbox.delete(0, tk.END)
-                    for version in versions:
-                        display_text = f"{version['id']} - {version['release_time']}"
-                        listbox.insert(tk.END, display_text)
-                        # 存储版本信息
-                        listbox.version_data = getattr(listbox, 'version_data', {})
-                        listbox.version_data[display_text] = version
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"加载版本数据失败: {e}")
+    def load_versions(self, force_refresh=False):
+        """在后台线程加载版本数据，加载完成后由UI线程渲染"""
+        if self._loading:
+            return
+        self._loading = True
+        self._load_result = None
+        self.status_var.set("正在加载版本列表...")
+        
+        def load_thread():
+            try:
+                categorized_versions = self.version_manager.load_versions_from_api(force_refresh=force_refresh)
+                self._load_result = (True, VersionSearchIndex(categorized_versions), force_refresh)
+            except Exception as e:
+                self._load_result = (False, e, force_refresh)
+        
+        threading.Thread(target=load_thread, daemon=True).start()
+        self.dialog.after(50, self._poll_load_result)
+    
+    def _poll_load_result(self):
+        """轮询后台加载结果（避免在工作线程中操作Tk）"""
+        if not self.dialog.winfo_exists():
+            return
+        if self._load_result is None:
+            self.dialog.after(50, self._poll_load_result)
+            return
+        
+        success, result, force_refresh = self._load_result
+        self._loading = False
+        if not success:
+            self.status_var.set("加载失败")
+            messagebox.showerror("错误", f"加载版本数据失败: {result}", parent=self.dialog)
+            return
+        
+        self.search_index = result
+        self._filter_cache = {}
+        self.apply_filter()
+        if force_refresh:
+            messagebox.showinfo("成功", "版本列表已刷新", parent=self.dialog)
     
     def refresh_versions(self):
         """刷新版本列表"""
-        try:
-            categorized_versions = self.version_manager.load_versions_from_api(force_refresh=True)
-            
-            for category, versions in categorized_versions.items():
-                listbox = self.category_lists.get(category)
-                if listbox:
-                    listbox.delete(0, tk.END)
-                    for version in versions:
-                        display_text = f"{version['id']} - {version['release_time']}"
-                        listbox.insert(tk.END, display_text)
-                        # 存储版本信息
-                        listbox.version_data = getattr(listbox, 'version_data', {})
-                        listbox.version_data[display_text] = version
-            
-            messagebox.showinfo("成功", "版本列表已刷新")
+        self.load_versions(force_refresh=True)
+    
+    def _on_search_changed(self, *args):
+        """搜索框输入变化，延迟过滤避免每个按键都重绘"""
+        if self._search_after_id:
+            self.dialog.after_cancel(self._search_after_id)
+        self._search_after_id = self.dialog.after(150, self.apply_filter)
+    
+    def apply_filter(self):
+        """按搜索条件过滤并一次性渲染各分类列表"""
+        self._search_after_id = None
+        if not self.search_index:
+            return
+        
+        query = self.search_var.get().strip().lower()
+        total = 0
+        for category, listbox in self.category_lists.items():
+            # 输入在上一次查询基础上追加字符时，只在上次结果中继续筛选
+            previous = self._filter_cache.get(category)
+            base = None
+            if previous and VersionSearchIndex.is_refinement(previous[0], query):
+                base = previous[1]
+            entries = self.search_index.filter(category, query, base)
+            self._filter_cache[category] = (query, entries)
             
-        except Exception as e:
-            messagebox.showerror("错误", f"刷新版本列表失败: {e}")
+            versions = [entry[-1] for entry in entries]
+            self.visible_versions[category] = versions
+            listbox.delete(0, tk.END)
+            if versions:
+                listbox.insert(tk.END, *[f"{v['id']} - {v['release_time']}" for v in versions])
+            total += len(versions)
+        
+        self.status_var.set(f"共 {total} 个版本")
+    
+    def _get_listbox_version(self, category):
+        """获取指定分类列表中选中的版本"""
+        listbox = self.category_lists.get(category)
+        if listbox and listbox.curselection():
+            selected_index = listbox.curselection()[0]
+            versions = self.visible_versions.get(category, [])
+            if selected_index < len(versions):
+                return versions[selected_index]
+        return None
     
     def get_selected_version(self):
         """获取选中的版本"""
         current_tab = self.notebook.index(self.notebook.select())
-        categories = ['release', 'snapshot', 'fool', 'ancient']
         
-        if 0 <= current_tab < len(categories):
-            category = categories[current_tab]
-            listbox = self.category_lists.get(category)
-            
-            if listbox and listbox.curselection():
-                selected_index = listbox.curselection()[0]
-                display_text = listbox.get(selected_index)
-                return listbox.version_data.get(display_text)
+        if 0 <= current_tab < len(VERSION_CATEGORIES):
+            return self._get_listbox_version(VERSION_CATEGORIES[current_tab])
         
         return None
     
@@ -363,14 +406,9 @@ class VersionListDialog:
     
     def show_version_detail(self, category):
         """显示版本详情（双击事件）"""
-        listbox = self.category_lists.get(category)
-        if listbox and listbox.curselection():
-            selected_index = listbox.curselection()[0]
-            display_text = listbox.get(selected_index)
-            version_info = listbox.version_data.get(display_text)
-            
-            if version_info:
-                self.show_version_detail_dialog(version_info)
+        version_info = self._get_listbox_version(category)
+        if version_info:
+            self.show_version_detail_dialog(version_info)
     
     def show_version_detail_dialog(self, version_info):
         """显示版本详情对话框"""
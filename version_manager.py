@@ -9,39 +9,26 @@ import os
 import requests
 from pathlib import Path
 
+from manifest_cache import get_manifest_cache
+from mirrors import resolve_url
+from local_version_catalog import LocalVersionCatalog
+
 class VersionManager:
     def __init__(self, minecraft_path):
         self.minecraft_path = Path(minecraft_path)
         self.versions_path = self.minecraft_path / "versions"
         self.versions_path.mkdir(parents=True, exist_ok=True)
+        self.local_catalog = LocalVersionCatalog(self.versions_path)
     
     def get_available_versions(self):
         """获取本地可用的版本列表"""
-        versions = []
-        for version_dir in self.versions_path.iterdir():
-            if version_dir.is_dir():
-                json_file = version_dir / f"{version_dir.name}.json"
-                if json_file.exists():
-                    try:
-                        with open(json_file, 'r', encoding='utf-8') as f:
-                            version_data = json.load(f)
-                            versions.append({
-                                'id': version_data.get('id', version_dir.name),
-                                'type': version_data.get('type', 'release'),
-                                'release_time': version_data.get('releaseTime', ''),
-                                'path': str(version_dir)
-                            })
-                    except Exception as e:
-                        print(f"读取版本 {version_dir.name} 信息失败: {e}")
-        return versions
+        return self.local_catalog.refresh()
     
     def download_version(self, version_id):
         """下载指定版本的Minecraft"""
         try:
             # 获取版本清单
-            manifest_url = "https://launchermeta.mojang.com/mc/game/version_manifest.json"
-            response = requests.get(manifest_url)
-            manifest = response.json()
+            manifest = get_manifest_cache().get_manifest()
             
             # 查找指定版本
             version_info = None
@@ -54,7 +41,7 @@ class VersionManager:
                 raise Exception(f"未找到版本 {version_id}")
             
             # 下载版本JSON文件
-            version_response = requests.get(version_info['url'])
+            version_response = requests.get(resolve_url(version_info['url']))
             version_data = version_response.json()
             
             # 创建版本目录
@@ -79,7 +66,7 @@ class VersionManager:
     
     def _download_file(self, url, file_path):
         """下载文件"""
-        response = requests.get(url, stream=True)
+        response = requests.get(resolve_url(url), stream=True)
         total_size = int(response.headers.get('content-length', 0))
         
         with open(file_path, 'wb') as f: